@@ -0,0 +1,54 @@
+"""Times generating instructions with logging at each level the converter can be run at.
+
+"per part" adds back the message the converter used to log for every part, at the --verbose
+level it used to run at, to show what that cost.  Logs go to /dev/null, so this measures
+formatting and handling rather than the terminal.
+
+    python benchmarks/bench_logging.py [number of placements]
+"""
+import logging
+import os
+import sys
+import timeit
+
+# Run from a checkout, the tm2x0 package is one directory up.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from suite import synthetic_pos, synthetic_reel_map
+from tm2x0.kicad import KicadPartPositions
+from tm2x0.placement import Placement
+
+
+def generate(placement):
+    return list(placement.iter_instructions())
+
+
+def generate_logging_each_part(placement):
+    out = []
+    for instruction in placement.iter_instructions():
+        if getattr(instruction, "part_number", None):
+            logging.info("Processing Part {0}".format(placement.generated_parts[instruction.part_number - 1].reference))
+        out.append(instruction)
+    return out
+
+
+def main():
+    placements = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    placement = Placement()
+    synthetic_reel_map().assign(placement, KicadPartPositions.from_string(synthetic_pos(placements)).instructions["Front"])
+
+    devnull = open(os.devnull, 'w')
+    logging.basicConfig(stream=devnull, format='(%(levelname)s): %(message)s')
+    root = logging.getLogger()
+    for name, level, function in (("per part", logging.DEBUG, generate_logging_each_part),
+                                  ("--verbose", logging.DEBUG, generate),
+                                  ("default", logging.INFO, generate),
+                                  ("--quiet", logging.WARNING, generate)):
+        root.setLevel(level)
+        seconds = min(timeit.repeat(lambda: function(placement), number=1, repeat=3))
+        print "{0:>10}: {1:.3f} s, {2:,.0f} parts/s".format(name, seconds, placements / seconds)
+    devnull.close()
+
+
+if __name__ == "__main__":
+    main()
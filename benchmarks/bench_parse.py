@@ -0,0 +1,71 @@
+"""Times parsing of a synthetic machine CSV file.
+
+Compares PlacementInstructions.add_from_line, which dispatches on the leading flag
+fields, against asking every instruction type to try each line in turn.
+
+    python benchmarks/bench_parse.py [number of placement rows]
+"""
+import os
+import sys
+import timeit
+
+# Run from a checkout, the tm2x0 package is one directory up.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from tm2x0.instructions import PlacementInstructions, Comment, Blank, SpeedInstruction, \
+    OriginOffsetInstruction, StackOffsetInstruction, FeedSpacingInstruction, PanelizedBoardInstruction, \
+    PartPlacementInstruction
+
+
+def sequential_parse(lines):
+    """The pre-dispatch parser: every instruction type gets a shot at every line."""
+    out = []
+    for line in lines:
+        tokens = line.split(",")
+        for instruction in [Comment,
+                            Blank,
+                            SpeedInstruction,
+                            OriginOffsetInstruction,
+                            StackOffsetInstruction,
+                            FeedSpacingInstruction,
+                            PanelizedBoardInstruction,
+                            PartPlacementInstruction]:
+            val = instruction.from_tokens(tokens)
+            if val:
+                out.append(val)
+                break
+    return out
+
+
+def dispatched_parse(lines):
+    p = PlacementInstructions()
+    for line in lines:
+        p.add_from_line(line)
+    return p.instructions
+
+
+def synthetic_lines(placements):
+    lines = ["%,OriginOffsetCommand,X,Y,,",
+             "65535,0,0,0,,",
+             "0,100,0,0,0,0,0,0,"]
+    for stack in range(1, 21):
+        lines.append("65535,1,{0},0.05,0,0805".format(stack))
+        lines.append("65535,2,{0},4,".format(stack))
+    lines.append("")
+    for n in range(1, placements + 1):
+        lines.append("{0},1,{1},{2}.{3},-{4}.5,-90,0.5,0,R{0},".format(n, n % 20 + 1, n % 200, n % 100, n % 150))
+    return lines
+
+
+def main():
+    placements = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    lines = synthetic_lines(placements)
+    assert [i.to_csv() for i in sequential_parse(lines)] == [i.to_csv() for i in dispatched_parse(lines)]
+
+    for name, parse in (("sequential", sequential_parse), ("dispatched", dispatched_parse)):
+        seconds = min(timeit.repeat(lambda: parse(lines), number=1, repeat=3))
+        print "{0:>10}: {1:.3f} s, {2:,.0f} rows/s".format(name, seconds, len(lines) / seconds)
+
+
+if __name__ == "__main__":
+    main()
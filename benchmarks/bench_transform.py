@@ -0,0 +1,49 @@
+"""Times transforming a panel of KiCad boards into PartPlacements.
+
+Compares BoardTransform against VectorizedBoardTransform on a synthetic board, mirrored and
+moved to a new origin, repeated for every copy on the panel.  "arrays" is the vectorized
+transform on its own, without building a PartPlacement for every part.
+
+    python benchmarks/bench_transform.py [parts per board] [copies]
+"""
+import os
+import sys
+import timeit
+
+# Run from a checkout, the tm2x0 package is one directory up.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from tm2x0.transform import BoardTransform
+from tm2x0.vectorized import VectorizedBoardTransform, numpy
+
+
+def synthetic_rows(parts):
+    return [["R{0}".format(n), "1K", "SM0805", "{0}.{1:04d}".format(n % 200, n % 9973),
+             "-{0}.{1:04d}".format(n % 150, n % 7919), "{0}.0".format(n % 4 * 90), "Back"]
+            for n in range(parts)]
+
+
+def main():
+    parts = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    copies = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    rows = synthetic_rows(parts)
+    settings = dict(units="mm", origin=("100", "-50"), mirror=True,
+                    copies=[(column * 60, row * 60) for column in range(5) for row in range((copies + 4) // 5)][:copies])
+
+    transforms = [("scalar", BoardTransform(**settings))]
+    if numpy is None:
+        print "NumPy isn't installed, so only timing the scalar path."
+    else:
+        vectorized = VectorizedBoardTransform(**settings)
+        transforms.append(("vectorized", vectorized))
+
+    timings = [(name, transform.parts) for name, transform in transforms]
+    if numpy is not None:
+        timings.append(("arrays", vectorized.arrays))
+    for name, transform in timings:
+        seconds = min(timeit.repeat(lambda: transform(rows), number=1, repeat=3))
+        print "{0:>10}: {1:.1f} ms, {2:,.0f} parts/s".format(name, seconds * 1000, parts * copies / seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""Benchmarks for the parse, convert, generate and serialize paths, on synthetic boards.
+
+Each case is a board of some number of placements on a panel of some number of copies.  A case
+runs in its own process, so its peak memory can be measured, and goes through these stages:
+
+    kicad_parse     KicadPartPositions.from_string on a .pos file for the board
+    assign          putting the parts on reels
+    generate        Placement.generate_instructions
+    to_csv          PlacementInstructions.to_csv
+    parse           PlacementInstructions.from_file on that CSV
+    from_instructions  Placement.from_instructions
+    expand          PanelLayout.expand, for cases small enough to expand
+
+Results are written as JSON, and can be compared with an earlier run:
+
+    python benchmarks/suite.py --output results.json
+    python benchmarks/suite.py --parts 100 1000 --copies 1 10 --compare results.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+from StringIO import StringIO
+
+# Run from a checkout, the tm2x0 package is one directory up.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from tm2x0 import __version__
+from tm2x0.batch import ReelMap
+from tm2x0.instructions import PlacementInstructions
+from tm2x0.kicad import KicadPartPositions
+from tm2x0.panel import PanelLayout
+from tm2x0.placement import Placement
+
+FOOTPRINTS = ("SM0402", "SM0603", "SM0805", "SM1206", "SOT23", "SO8")
+VALUES = ("100n", "1u", "10K", "1K", "4K7", "LED")
+DEFAULT_PARTS = (100, 1000, 10000, 100000)
+DEFAULT_COPIES = (1, 10, 100)
+# Cases with more rows than this skip the expand stage.
+MAX_EXPANDED_ROWS = 1000000
+
+
+def synthetic_pos(parts, seed=1):
+    """A KiCad .pos file with parts placements on a 200 by 150 mm board."""
+    generator = random.Random(seed)
+    lines = ["### Module positions - synthetic ###",
+             "## Unit = mm, Angle = deg.",
+             "## Side : Front",
+             "# Ref    Val                  Package         PosX       PosY        Rot     Side"]
+    for n in range(parts):
+        lines.append("R{0} {1} {2} {3:.4f} {4:.4f} {5:.1f} Front".format(
+            n + 1,
+            VALUES[n % len(VALUES)],
+            FOOTPRINTS[(n // len(VALUES)) % len(FOOTPRINTS)],
+            generator.uniform(0, 200),
+            -generator.uniform(0, 150),
+            generator.choice((0, 90, 180, 270))))
+    lines.append("## End")
+    return "\n".join(lines)
+
+
+def synthetic_reel_map():
+    reel_map = ReelMap()
+    reel_number = 1
+    for footprint in FOOTPRINTS:
+        for value in VALUES:
+            reel_map.add(reel_number, footprint, value, feed_spacing="4", stack_x_offset="0", stack_y_offset="0",
+                         comment="{0} {1}".format(value, footprint))
+            reel_number += 1
+    return reel_map
+
+
+def synthetic_panel(copies):
+    columns = min(copies, 10)
+    rows = (copies + columns - 1) // columns
+    skip = [(rows - 1, column) for column in range(columns) if (rows - 1) * columns + column >= copies]
+    return PanelLayout(rows, columns, 210, 160, skip=skip)
+
+
+def timed(stages, name, rows, function, *args):
+    start = time.time()
+    out = function(*args)
+    seconds = time.time() - start
+    stages[name] = {"seconds": seconds, "rows": rows, "rows_per_second": rows / seconds if seconds else None}
+    return out
+
+
+def run_case(parts, copies):
+    """Runs every stage of one case in this process and returns its results."""
+    stages = {}
+    pos = synthetic_pos(parts)
+    kicad_parts = timed(stages, "kicad_parse", parts, KicadPartPositions.from_string, pos)
+
+    placement = Placement(panel=synthetic_panel(copies))
+    timed(stages, "assign", parts, synthetic_reel_map().assign, placement, kicad_parts.instructions["Front"])
+    instructions = timed(stages, "generate", parts, placement.generate_instructions)
+    rows = len(instructions.instructions)
+    csv = timed(stages, "to_csv", rows, instructions.to_csv)
+    parsed = timed(stages, "parse", rows, PlacementInstructions.from_file, StringIO(csv))
+    timed(stages, "from_instructions", rows, Placement.from_instructions, parsed)
+    if parts * copies <= MAX_EXPANDED_ROWS:
+        board = [part for reel_parts in placement.parts.values() for part in reel_parts]
+        timed(stages, "expand", parts * len(placement.panel.good_copies()), placement.panel.expand, board)
+
+    return {"parts": parts,
+            "copies": copies,
+            "csv_bytes": len(csv),
+            "stages": stages,
+            "total_seconds": sum(stage["seconds"] for stage in stages.values()),
+            # Kilobytes on Linux.
+            "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+
+
+def run_case_in_subprocess(parts, copies):
+    process = subprocess.Popen([sys.executable, __file__, "--case", str(parts), str(copies)],
+                               stdout=subprocess.PIPE)
+    output, _ = process.communicate()
+    if process.returncode:
+        raise RuntimeError("Case with {0} parts and {1} copies failed".format(parts, copies))
+    return json.loads(output)
+
+
+def describe(result, previous=None):
+    out = ["{0} parts x {1} copies: {2:.3f} s, peak {3:,} KB".format(
+        result["parts"], result["copies"], result["total_seconds"], result["peak_rss_kb"])]
+    for name in sorted(result["stages"], key=lambda name: -result["stages"][name]["seconds"]):
+        stage = result["stages"][name]
+        line = "\t{0:<18} {1:8.3f} s {2:>14,.0f} rows/s".format(name, stage["seconds"],
+                                                                 stage["rows_per_second"] or 0)
+        if previous is not None and name in previous["stages"] and previous["stages"][name]["seconds"]:
+            line += "  {0:+.0%}".format(stage["seconds"] / previous["stages"][name]["seconds"] - 1)
+        out.append(line)
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks tm2x0 on synthetic boards")
+    parser.add_argument("--parts", type=int, nargs="+", default=DEFAULT_PARTS,
+                        help="Placements per board.  Defaults to 100 1000 10000 100000.")
+    parser.add_argument("--copies", type=int, nargs="+", default=DEFAULT_COPIES,
+                        help="Copies on the panel.  Defaults to 1 10 100.")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON results from an earlier run to compare against")
+    parser.add_argument("--case", type=int, nargs=2, metavar=("PARTS", "COPIES"), help=argparse.SUPPRESS)
+    arguments = parser.parse_args(argv)
+
+    if arguments.case:
+        json.dump(run_case(*arguments.case), sys.stdout)
+        return
+
+    previous = {}
+    if arguments.compare:
+        with open(arguments.compare) as f:
+            for result in json.load(f)["results"]:
+                previous[(result["parts"], result["copies"])] = result
+
+    results = []
+    for parts in arguments.parts:
+        for copies in arguments.copies:
+            result = run_case_in_subprocess(parts, copies)
+            results.append(result)
+            print "\n".join(describe(result, previous.get((parts, copies))))
+
+    report = {"version": __version__,
+              "python": platform.python_version(),
+              "platform": platform.platform(),
+              "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+              "results": results}
+    if arguments.output:
+        with open(arguments.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main()
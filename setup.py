@@ -27,12 +27,16 @@ setup(
     version="0.1",
     packages=find_packages(),
     install_requires=[],
+    extras_require={'numpy': ['numpy']},
     tests_require=tests_require,
     cmdclass={'test': NoseTestCommand},
     entry_points={
         'console_scripts': [
             'tm2x0-kicad-import = tm2x0.kicad_import:main',
             'tm2x0-describe = tm2x0.describe_cli:main',
+            'tm2x0-plan-changeover = tm2x0.changeover_cli:main',
+            'tm2x0-split = tm2x0.partition_cli:main',
+            'tm2x0-verify = tm2x0.verify_cli:main',
         ],
     }
 )
@@ -0,0 +1,124 @@
+"""Assigning parts to reels without asking about every part.
+
+Parts with the same footprint and value share a reel.  Footprints too big for the tape
+feeders go to the front tray, Reel 0.  Reels that are already configured, for example from
+a CSV file given with --reels-from, are reused for the parts they held before, or for the
+group named in their comment.  The rest are handed out most-used group first, in order of
+preference, which is nearest first unless you say otherwise."""
+
+import logging
+
+# Footprints containing any of these (ignoring case) go on the front tray.
+TRAY_FOOTPRINTS = ("QFP", "QFN", "BGA", "PLCC", "LGA")
+
+
+def group_key(part):
+    return part.footprint, part.value
+
+
+def describe_group(key):
+    """The reel comment used for a group of parts, so the reel can be recognised next time."""
+    footprint, value = key
+    if value:
+        return "{0} {1}".format(value, footprint)
+    return str(footprint)
+
+
+def reel_numbers_by_reference(placement):
+    """Maps each part reference in placement to its reel number."""
+    out = {}
+    for reel_number, parts in placement.parts.items():
+        for part in parts:
+            if part.reference:
+                out[part.reference] = reel_number
+    return out
+
+
+class ReelAssigner():
+    """Assigns parts to reels in a Placement.
+
+    reel_numbers lists the tape reels to hand out, in order of preference; by default any reel
+    number from 1 up is fair game.  previous maps part references to the reels they were on last
+    time, as from reel_numbers_by_reference.  Footprints matching tray_footprints go to Reel 0.
+    reserved reels, like the ones a reel map sets aside for other parts, are never handed out,
+    even when they aren't in the placement."""
+
+    def __init__(self, reel_numbers=None, previous=None, tray_footprints=TRAY_FOOTPRINTS, reserved=()):
+        self.reel_numbers = reel_numbers
+        self.reserved = set(reserved)
+        if previous is None:
+            previous = {}
+        self.previous = previous
+        self.tray_footprints = [pattern.upper() for pattern in tray_footprints]
+
+    def is_oversize(self, footprint):
+        footprint = str(footprint).upper()
+        for pattern in self.tray_footprints:
+            if pattern in footprint:
+                return True
+        return False
+
+    def assign(self, placement, parts):
+        """Assigns parts to reels in placement, and returns the parts that didn't fit on any reel."""
+        groups = {}
+        for part in parts:
+            groups.setdefault(group_key(part), []).append(part)
+
+        by_comment = {}
+        for reel_number, reel in placement.reels.items():
+            if reel.comment and reel_number not in self.reserved:
+                by_comment.setdefault(str(reel.comment).strip().lower(), reel_number)
+
+        # Existing reels first: by where the parts went before, then by the reel comment.
+        reel_for_group = {}
+        claimed = set()
+        for key in sorted(groups, key=describe_group):
+            if self.is_oversize(key[0]):
+                reel_for_group[key] = 0
+                continue
+            candidates = [self.previous[part.reference] for part in groups[key] if part.reference in self.previous]
+            candidates.extend(by_comment[str(comment).lower()] for comment in (describe_group(key), key[1], key[0])
+                              if comment and str(comment).lower() in by_comment)
+            for reel_number in candidates:
+                if reel_number not in claimed and reel_number != 0 and reel_number not in self.reserved:
+                    reel_for_group[key] = reel_number
+                    claimed.add(reel_number)
+                    break
+
+        tray_groups = [key for key, reel_number in reel_for_group.items() if reel_number == 0]
+        if len(tray_groups) > 1:
+            logging.warning("{0} different parts are assigned to the front tray.".format(len(tray_groups)))
+
+        # Configured reels that didn't match anything are left alone.
+        free = self._free_reels(claimed | set(placement.reels.keys()) | set(placement.parts.keys()) | self.reserved)
+
+        # The most used groups get the most preferred reels.
+        unassigned = []
+        remaining = [key for key in groups if key not in reel_for_group]
+        remaining.sort(key=lambda key: (-len(groups[key]), describe_group(key)))
+        for key in remaining:
+            reel_number = next(free, None)
+            if reel_number is None:
+                unassigned.extend(groups[key])
+            else:
+                reel_for_group[key] = reel_number
+
+        for key in sorted(reel_for_group, key=describe_group):
+            reel_number = reel_for_group[key]
+            for part in groups[key]:
+                placement.assign_part_to_reel(part, reel_number)
+            if not placement.reels[reel_number].comment:
+                placement.reels[reel_number].comment = describe_group(key)
+        return unassigned
+
+    def _free_reels(self, taken):
+        if self.reel_numbers is not None:
+            for reel_number in self.reel_numbers:
+                if reel_number not in taken:
+                    yield reel_number
+        else:
+            reel_number = 1
+            while True:
+                if reel_number not in taken:
+                    yield reel_number
+                reel_number += 1
@@ -0,0 +1,332 @@
+"""Converting KiCad .pos files to machine CSV files without the menus.
+
+Parts are put on reels by a reel map, a CSV file with a header row and one line per reel:
+
+    reel,footprint,value,feed_spacing,stack_x_offset,stack_y_offset,height,rotation,comment,head
+    1,SM0805,1K,4,0.05,0,0,0,1K 0805,
+    2,SM0805,,4,0.05,0,0,0,0805,
+
+A blank value matches any part with that footprint that isn't matched more exactly.  Only the
+reel and footprint columns are required; the same reel can be listed more than once to hold
+several footprints or values, and its settings can be given on any of those lines.  Reels
+without offsets get 0, and reels without a feed spacing get 4 mm, or 18 mm for the tray."""
+
+from copy import copy
+import csv
+import logging
+import multiprocessing
+import os
+
+from tm2x0 import profiling
+from tm2x0.assignment import ReelAssigner
+from tm2x0.cache import file_digest
+from tm2x0.heads import DualHeadScheduler
+from tm2x0.instructions import write_csv, replace_file
+from tm2x0.kicad import KicadPartPositions
+from tm2x0.library import ReelLibrary
+from tm2x0.machine import MachineProfile
+from tm2x0.optimize import PlacementOrderOptimizer
+from tm2x0.placement import Placement
+from tm2x0.reel import Reel
+from tm2x0.transform import BoardTransform
+
+REEL_SETTINGS = ("feed_spacing", "stack_x_offset", "stack_y_offset", "height", "rotation", "comment", "head")
+DEFAULT_FEED_SPACING = "4"
+TRAY_FEED_SPACING = "18"
+
+
+class ReelMap():
+    def __init__(self):
+        self.reels = {}
+        # (footprint, value) to reel number, with a value of '' matching any value.
+        self.groups = {}
+
+    @classmethod
+    def from_file(cls, f):
+        out = cls()
+        for line_number, row in enumerate(csv.DictReader(f), 2):
+            try:
+                reel_number = int(row["reel"])
+                footprint = row["footprint"].strip()
+            except (KeyError, TypeError, ValueError):
+                raise ValueError("Line {0} of the reel map needs a reel number and a footprint".format(line_number))
+            settings = dict((attr, row[attr].strip()) for attr in REEL_SETTINGS if (row.get(attr) or '').strip())
+            if "rotation" in settings:
+                settings["rotation"] = int(settings["rotation"])
+            out.add(reel_number, footprint, (row.get("value") or '').strip(), **settings)
+        return out
+
+    def add(self, reel_number, footprint, value='', **settings):
+        if reel_number not in self.reels:
+            self.reels[reel_number] = Reel(reel_number)
+        reel = self.reels[reel_number]
+        for attr, setting in settings.items():
+            setattr(reel, attr, setting)
+        self.groups[(footprint, value or '')] = reel_number
+
+    def signature(self):
+        """Text that changes whenever the map does, for cache keys."""
+        return repr((sorted(self.groups.items()),
+                     [(reel_number, [(attr, str(getattr(reel, attr))) for attr in REEL_SETTINGS])
+                      for reel_number, reel in sorted(self.reels.items())]))
+
+    def reel_for(self, part):
+        """The reel number for a part, or None if the map doesn't cover it."""
+        reel_number = self.groups.get((part.footprint, part.value or ''))
+        if reel_number is None:
+            reel_number = self.groups.get((part.footprint, ''))
+        return reel_number
+
+    def assign(self, placement, parts):
+        """Assigns parts to reels in placement, with the reel settings from the map, and returns the parts
+        the map doesn't cover."""
+        unassigned = []
+        for part in parts:
+            reel_number = self.reel_for(part)
+            if reel_number is None:
+                unassigned.append(part)
+                continue
+            if reel_number not in placement.reels:
+                placement.reels[reel_number] = copy(self.reels[reel_number])
+            placement.assign_part_to_reel(part, reel_number)
+        return unassigned
+
+
+def fill_reel_defaults(placement):
+    for reel in placement.reels.values():
+        if reel.stack_x_offset is None:
+            reel.stack_x_offset = "0"
+        if reel.stack_y_offset is None:
+            reel.stack_y_offset = "0"
+        if reel.feed_spacing is None:
+            reel.feed_spacing = TRAY_FEED_SPACING if reel.reel_number == 0 else DEFAULT_FEED_SPACING
+            logging.warning("No feed spacing for Reel {0}, using {1} mm".format(reel.reel_number, reel.feed_spacing))
+
+
+def output_filename(kicad_filename, side, output_directory=None):
+    stem = os.path.splitext(os.path.basename(kicad_filename))[0]
+    if output_directory is None:
+        output_directory = os.path.dirname(kicad_filename)
+    return os.path.join(output_directory, "{0}-{1}.csv".format(stem, side.lower()))
+
+
+def _cache_key(cache, kicad_filename, reel_map, library, panel, options, *sides):
+    return cache.key(file_digest(kicad_filename),
+                     *(sides + (reel_map.signature(),
+                                file_digest(library) if library is not None and os.path.exists(library) else "",
+                                panel.signature() if panel is not None else "",
+                                repr(options))))
+
+
+def _parse(kicad_filename, **kwargs):
+    with profiling.stage("kicad_parse"):
+        with open(kicad_filename, 'rU') as f:
+            return KicadPartPositions.from_file(f, keep_lines=False, **kwargs)
+
+
+def _build_placement(kicad_filename, parts, reel_map, auto_assign, panel, expand_panel, library, reels=None):
+    """Puts parts on reels by the map, and by ReelAssigner if auto_assign is set.  reels are
+    Reels to start from, which are only kept if some part goes on them."""
+    profiling.count("parts", len(parts))
+    with profiling.stage("assign"):
+        placement = Placement(panel=panel, expand_panel=expand_panel)
+        for reel in reels or ():
+            placement.reels[reel.reel_number] = copy(reel)
+        unassigned = reel_map.assign(placement, parts)
+        if unassigned and auto_assign:
+            # Reels the map sets aside stay free for their own parts, even on boards without them.
+            unassigned = ReelAssigner(reserved=reel_map.reels.keys()).assign(placement, unassigned)
+        for reel_number in placement.reels.keys():
+            if reel_number not in placement.parts:
+                del placement.reels[reel_number]
+    if unassigned:
+        raise ValueError("No reel for parts in {0}: {1}".format(
+            kicad_filename, ", ".join("{0} {1}".format(part.reference, part) for part in unassigned)))
+    if library is not None:
+        with profiling.stage("library"):
+            reel_library = ReelLibrary(library)
+            try:
+                placement.apply_library(reel_library)
+            finally:
+                reel_library.close()
+    fill_reel_defaults(placement)
+    return placement
+
+
+def _write(placement, output_filename, optimize_seconds, dual_head):
+    optimizer = None
+    if optimize_seconds is not None:
+        optimizer = PlacementOrderOptimizer(time_budget=optimize_seconds, profile=MachineProfile())
+    scheduler = DualHeadScheduler() if dual_head else None
+
+    def write(f):
+        write_csv(f, profiling.iterate("generate",
+                                       placement.iter_instructions(optimizer=optimizer, scheduler=scheduler)))
+        return True
+
+    # Generation can fail partway, so the CSV only replaces the output once it's all written.
+    with profiling.stage("csv_export"):
+        replace_file(output_filename, write)
+
+
+def _write_cached(output_filename, csv):
+    def write(f):
+        f.write(csv)
+        return True
+    replace_file(output_filename, write)
+
+
+def convert(kicad_filename, reel_map, side="Front", output_filename=None, auto_assign=False,
+            optimize_seconds=None, dual_head=False, panel=None, expand_panel=False, library=None, cache=None,
+            board_width=None):
+    """Converts one .pos file to a machine CSV file, optionally step-and-repeated on panel,
+    a PanelLayout.  Reel settings the map doesn't give are filled in from library, the path of
+    a ReelLibrary, if there is one.
+
+    Parts the reel map doesn't cover are assigned to free reels if auto_assign is set, and
+    are an error otherwise.  With board_width, the back is turned over across a board that
+    wide, panel and all, the way convert_both does it; without it, the back is converted as
+    KiCad gives it.  Returns the placement that was written, or None if the CSV came from
+    cache, a JobCache."""
+    back_transform = None
+    if side == "Back" and board_width is not None:
+        back_transform = BoardTransform().turned_over(board_width)
+        if panel is not None:
+            panel = panel.turned_over()
+    key = None
+    if cache is not None:
+        key = _cache_key(cache, kicad_filename, reel_map, library, panel,
+                         (auto_assign, optimize_seconds, dual_head, expand_panel,
+                          str(board_width) if back_transform is not None else None), side)
+        csv = cache.get(key)
+        if csv is not None:
+            profiling.count("cache hits")
+            _write_cached(output_filename, csv)
+            return None
+
+    kicad_parts = _parse(kicad_filename, back_transform=back_transform)
+    placement = _build_placement(kicad_filename, kicad_parts.instructions.get(side, []), reel_map,
+                                 auto_assign, panel, expand_panel, library)
+    _write(placement, output_filename, optimize_seconds, dual_head)
+    if cache is not None:
+        with open(output_filename, 'rb') as f:
+            cache.put(key, f.read())
+    return placement
+
+
+def convert_both(kicad_filename, reel_map, board_width, output_filenames=None, auto_assign=False,
+                 optimize_seconds=None, dual_head=False, panel=None, expand_panel=False, library=None,
+                 cache=None, processes=None):
+    """Converts the front and back of one .pos file, reading it only once, to the CSV files
+    output_filenames gives for each side, by default named like convert_many's.
+
+    The back is turned over left to right, so its parts are mirrored across a board
+    board_width mm wide and their rotations flipped to match, and panel's columns are turned
+    over with it, so a skipped copy is skipped on both sides.  Parts on the back go on the
+    front's reels wherever they have the same footprint and value, including reels auto_assign
+    handed out, so one set of reels does both sides.  The two files are written at the same
+    time, in separate processes, unless processes is 1.  The other options are as for convert.
+    Returns the placement written for each side, with None for a side that came from cache."""
+    sides = ("Front", "Back")
+    back_panel = panel.turned_over() if panel is not None else None
+    if output_filenames is None:
+        output_filenames = dict((side, output_filename(kicad_filename, side)) for side in sides)
+    options = (auto_assign, optimize_seconds, dual_head, expand_panel, str(board_width))
+    keys = {}
+    if cache is not None:
+        keys = dict((side, _cache_key(cache, kicad_filename, reel_map, library, panel, options, "Both", side))
+                    for side in sides)
+        cached = dict((side, cache.get(keys[side])) for side in sides)
+        if all(csv is not None for csv in cached.values()):
+            for side in sides:
+                profiling.count("cache hits")
+                _write_cached(output_filenames[side], cached[side])
+            return dict((side, None) for side in sides)
+
+    transform = BoardTransform()
+    kicad_parts = _parse(kicad_filename, transform=transform, back_transform=transform.turned_over(board_width))
+    front = _build_placement(kicad_filename, kicad_parts.instructions.get("Front", []), reel_map,
+                             auto_assign, panel, expand_panel, library)
+    back = _build_placement(kicad_filename, kicad_parts.instructions.get("Back", []), reel_map,
+                            auto_assign, back_panel, expand_panel, library, reels=front.reels.values())
+    placements = {"Front": front, "Back": back}
+
+    jobs = [(placements[side], output_filenames[side], optimize_seconds, dual_head) for side in sides]
+    profiler = profiling.current()
+    if processes == 1:
+        for job in jobs:
+            _write_job(job)
+    else:
+        pool = multiprocessing.Pool(min(processes or len(jobs), len(jobs)))
+        try:
+            if profiler is None:
+                pool.map(_write_job, jobs)
+            else:
+                for data in pool.map(_profiled_write_job, jobs):
+                    profiler.merge(data)
+        finally:
+            pool.close()
+            pool.join()
+
+    if cache is not None:
+        for side in sides:
+            with open(output_filenames[side], 'rb') as f:
+                cache.put(keys[side], f.read())
+    return placements
+
+
+def _write_job(job):
+    placement, output, optimize_seconds, dual_head = job
+    _write(placement, output, optimize_seconds, dual_head)
+
+
+def _profiled_write_job(job):
+    profiler = profiling.enable()
+    _write_job(job)
+    return profiler.data()
+
+
+def _convert_job(job):
+    """Runs one conversion in a worker process, and returns (output filename, error message or None)."""
+    kicad_filename, reel_map, side, output, options = job
+    try:
+        convert(kicad_filename, reel_map, side=side, output_filename=output, **options)
+    except Exception, e:
+        logging.exception("Error converting {0}".format(kicad_filename))
+        return output, str(e)
+    return output, None
+
+
+def _profiled_convert_job(job):
+    """Runs _convert_job with a profiler of its own, and returns its result and the profiler's data."""
+    profiler = profiling.enable()
+    return _convert_job(job), profiler.data()
+
+
+def convert_many(kicad_filenames, reel_map, side="Front", output_directory=None, processes=None, **options):
+    """Converts several .pos files, in parallel, to CSV files named after them.
+
+    A failure on one board doesn't stop the rest.  Returns a list of (output filename, error
+    message or None), one for each input file."""
+    jobs = [(kicad_filename, reel_map, side, output_filename(kicad_filename, side, output_directory), options)
+            for kicad_filename in kicad_filenames]
+    if processes == 1 or len(jobs) < 2:
+        return [_convert_job(job) for job in jobs]
+    profiler = profiling.current()
+    pool = multiprocessing.Pool(processes)
+    try:
+        if profiler is None:
+            return pool.map(_convert_job, jobs)
+        results = []
+        for result, data in pool.map(_profiled_convert_job, jobs):
+            profiler.merge(data)
+            results.append(result)
+        return results
+    finally:
+        pool.close()
+        pool.join()
+
+
+def find_kicad_files(directory):
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if name.lower().endswith(".pos"))
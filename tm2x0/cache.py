@@ -0,0 +1,136 @@
+"""An on-disk cache of finished jobs.
+
+Each entry is the machine CSV for one job, stored under a hash of everything that went into
+it: the .pos file, the side, the reel configuration, the options, the tm2x0 version and the
+version of the CSV it writes.  Running the same job again just reads the CSV back.  The cache
+is kept under max_bytes by deleting the least recently used entries."""
+
+import hashlib
+import logging
+import os
+import tempfile
+
+from tm2x0 import __version__
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Bump this whenever the CSV written for the same job changes, so old entries aren't read back.
+# 2: part rows carry their references.
+FORMAT_VERSION = 2
+
+
+def default_directory():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "tm2x0")
+
+
+def file_digest(filename):
+    """The SHA-1 of a file's contents, read in blocks."""
+    digest = hashlib.sha1()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(65536), ''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def reel_signature(reel):
+    return repr((reel.reel_number, str(reel.stack_x_offset), str(reel.stack_y_offset), str(reel.feed_spacing),
+                 str(reel.height), str(reel.comment), str(reel.rotation), str(reel.head)))
+
+
+def placement_signature(placement):
+    """Text that changes whenever anything that goes into a placement's instructions does."""
+    out = [repr((str(placement.offset_x), str(placement.offset_y))),
+           repr([(str(x), str(y)) for x, y in placement.copies]),
+           placement.panel.signature() if placement.panel is not None else "",
+           repr(placement.expand_panel)]
+    for reel_number in sorted(placement.reels.keys()):
+        out.append(reel_signature(placement.reels[reel_number]))
+    for reel_number in sorted(placement.parts.keys()):
+        for part in placement.parts[reel_number]:
+            out.append(repr((reel_number, part.reference, part.x_hundredths, part.y_hundredths, part.rotation,
+                             part.head)))
+    return "\n".join(out)
+
+
+class JobCache():
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        if directory is None:
+            directory = default_directory()
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def key(self, *parts):
+        """Hashes parts, which are strings, along with the tm2x0 and CSV format versions."""
+        digest = hashlib.sha1("{0}:{1}:".format(__version__, FORMAT_VERSION))
+        for part in parts:
+            part = str(part)
+            # The length keeps ("ab", "c") and ("a", "bc") apart.
+            digest.update("{0}:".format(len(part)))
+            digest.update(part)
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".csv")
+
+    def get(self, key):
+        """Returns the CSV stored under key, or None."""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                out = f.read()
+        except IOError:
+            return None
+        try:
+            # Reading an entry makes it the most recently used.
+            os.utime(path, None)
+        except OSError:
+            pass
+        logging.info("Using cached job {0}".format(key))
+        return out
+
+    def put(self, key, csv):
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        # Write to a temporary file and rename it, so other processes never see half an entry.
+        handle, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(handle, 'wb') as f:
+                f.write(csv)
+            os.rename(temporary, self._path(key))
+        except:
+            os.remove(temporary)
+            raise
+        self.evict()
+
+    def entries(self):
+        """(modification time, size, path) of every entry, oldest first."""
+        out = []
+        if not os.path.isdir(self.directory):
+            return out
+        for name in os.listdir(self.directory):
+            if name.endswith(".csv"):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                out.append((stat.st_mtime, stat.st_size, path))
+        return sorted(out)
+
+    def evict(self):
+        """Deletes the least recently used entries until the cache fits in max_bytes."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def clear(self):
+        for _, _, path in self.entries():
+            os.remove(path)
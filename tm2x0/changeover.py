@@ -0,0 +1,269 @@
+"""Planning a run of several boards so the reels change as little as possible between them.
+
+Each board needs some reels, each of which is known by what's on it: the value and footprint
+of its parts when they're known, like the comments ReelAssigner writes, and otherwise the reel's
+comment, if it names both too.  A footprint alone doesn't tell a 1K reel from a 10K one, so reels
+known only by their footprint, or by a comment another reel on the same board also has, are
+only ever used by their own board.  Boards needing the same reel get it on the same stack, so
+it can stay loaded from one board to the next.
+
+The planner picks an order for the boards, starting with nearest neighbour tours where the
+next board is the one needing the fewest reels that aren't loaded yet, and then moving boards
+around the order while that saves changes.  For an order, stacks are handed out board by
+board: reels already loaded stay where they are, and a new reel goes on an empty stack if
+there is one, or else replaces the loaded reel that won't be needed again for longest.  Loading
+reels before the first board isn't counted as a change.
+
+The front tray, Reel 0, isn't planned; whatever is on it stays on it."""
+
+from time import time
+import logging
+
+from tm2x0.assignment import describe_group, group_key
+
+
+def _parts_identity(placement, reel_number):
+    """The value and footprint of a reel's parts, or None unless they all have the same ones."""
+    groups = set(group_key(part) for part in placement.parts.get(reel_number, ()))
+    if len(groups) != 1:
+        return None
+    footprint, value = groups.pop()
+    if not footprint or not value:
+        return None
+    return describe_group((footprint, value))
+
+
+def _comment_identity(placement, reel_number):
+    """A reel's comment, or None unless it has a value and a footprint in it."""
+    reel = placement.reels.get(reel_number)
+    if reel is None or not reel.comment:
+        return None
+    comment = " ".join(str(reel.comment).split())
+    if len(comment.split(" ")) < 2:
+        return None
+    return comment
+
+
+def reel_identity(placement, reel_number):
+    """What's on a reel, as a string that's the same for the same reel on every board, or None if
+    there's no telling."""
+    identity = _parts_identity(placement, reel_number)
+    if identity is None:
+        identity = _comment_identity(placement, reel_number)
+    return identity
+
+
+def board_reels(placement, board, name=None):
+    """(identity, reel number) for each tape reel on a board.  A board with two reels of the same
+    parts needs two stacks for them, so the second is told apart by a number.  Reels with no
+    identity, or known by a comment that isn't theirs alone, are only ever shared with
+    themselves."""
+    reel_numbers = [reel_number for reel_number in sorted(set(placement.reels.keys()) | set(placement.parts.keys()))
+                    if reel_number != 0]
+    from_parts = {}
+    from_comments = {}
+    for reel_number in reel_numbers:
+        identity = _parts_identity(placement, reel_number)
+        if identity is not None:
+            from_parts[reel_number] = identity
+        else:
+            identity = _comment_identity(placement, reel_number)
+            if identity is not None:
+                from_comments[reel_number] = identity
+    counts = {}
+    for identity in from_parts.values() + from_comments.values():
+        counts[identity] = counts.get(identity, 0) + 1
+    by_comment = [reel_number for reel_number in sorted(from_comments)
+                  if counts[from_comments[reel_number]] == 1]
+    if by_comment:
+        logging.warning("{0}: {1} matched to other boards by {2} only".format(
+            name or "Board {0}".format(board + 1),
+            "Reel {0} is".format(by_comment[0]) if len(by_comment) == 1 else
+            "Reels {0} are".format(", ".join(str(reel_number) for reel_number in by_comment)),
+            "its comment" if len(by_comment) == 1 else "their comments"))
+
+    out = []
+    seen = {}
+    for reel_number in reel_numbers:
+        if reel_number in from_parts:
+            identity = from_parts[reel_number]
+            seen[identity] = seen.get(identity, 0) + 1
+            identity = (identity, seen[identity])
+        elif reel_number in by_comment:
+            identity = (from_comments[reel_number], 1)
+        else:
+            identity = ("board", board, reel_number)
+        out.append((identity, reel_number))
+    return out
+
+
+class ChangeoverPlan():
+    """order is the boards' indices in the order to run them.  stacks[board] maps each of that
+    board's old reel numbers to the stack its reel goes on, and loads[board] lists the (stack,
+    identity) of the reels loaded before running it.  changes counts the loads after the first board."""
+
+    def __init__(self, order, stacks, loads, names=None):
+        self.order = order
+        self.stacks = stacks
+        self.loads = loads
+        self.names = names
+        self.changes = sum(len(loads[board]) for board in order[1:])
+
+    def name(self, board):
+        if self.names is not None:
+            return self.names[board]
+        return "Board {0}".format(board + 1)
+
+    def apply(self, placements):
+        """Renumbers every placement's reels to the planned stacks."""
+        for board, placement in enumerate(placements):
+            placement.renumber_reels(self.stacks[board])
+
+    def apply_to_instructions(self, instructions):
+        """Renumbers the stacks in every board's PlacementInstructions, the ones the placements
+        were read from, leaving every other row as it was."""
+        for board, board_instructions in enumerate(instructions):
+            board_instructions.renumber_stacks(self.stacks[board])
+
+    def describe(self):
+        out = []
+        for position, board in enumerate(self.order):
+            loads = self.loads[board]
+            if position == 0:
+                out.append("{0}: load {1}".format(self.name(board), _reels(len(loads))))
+            elif loads:
+                out.append("{0}: change {1}".format(self.name(board), _reels(len(loads))))
+            else:
+                out.append("{0}: no changes".format(self.name(board)))
+            for stack, identity in sorted(loads):
+                out.append("\tReel {0}: {1}".format(stack, _describe_identity(identity)))
+        out.append("{0} in all".format(_reels(self.changes)))
+        return out
+
+
+def _reels(count):
+    return "{0} reel{1}".format(count, "" if count == 1 else "s")
+
+
+def _describe_identity(identity):
+    if identity[0] == "board":
+        return "reel {0} from the board's own file".format(identity[2])
+    name, count = identity
+    if count > 1:
+        return "{0} (#{1})".format(name, count)
+    return name
+
+
+class ChangeoverPlanner():
+    """Plans a run of boards on stacks, the tape stack numbers that can be used.  Improving the
+    order stops after time_budget seconds."""
+
+    def __init__(self, stacks, time_budget=1.0):
+        self.stacks = sorted(set(stacks) - set([0]))
+        self.time_budget = time_budget
+
+    def plan(self, placements, names=None):
+        boards = [board_reels(placement, board, names[board] if names is not None else None)
+                  for board, placement in enumerate(placements)]
+        needs = [set(identity for identity, _ in reels) for reels in boards]
+        for board, need in enumerate(needs):
+            if len(need) > len(self.stacks):
+                raise ValueError("{0} needs {1} reels, but there are only {2} stacks".format(
+                    names[board] if names is not None else "Board {0}".format(board + 1),
+                    len(need), len(self.stacks)))
+        if not placements:
+            return ChangeoverPlan([], [], [], names)
+
+        deadline = time() + self.time_budget
+        best = None
+        for start in range(len(needs)):
+            order = self._nearest_neighbour(needs, start)
+            changes = self._count_changes(needs, order)
+            if best is None or changes < best[0]:
+                best = (changes, order)
+            if time() >= deadline:
+                break
+        order = self._improve(needs, best[1], best[0], deadline)
+
+        assignments, loads = self._assign(needs, order)
+        stacks = []
+        for board, reels in enumerate(boards):
+            stacks.append(dict((reel_number, assignments[board][identity]) for identity, reel_number in reels))
+        return ChangeoverPlan(order, stacks, loads, names)
+
+    def _nearest_neighbour(self, needs, start):
+        order = [start]
+        remaining = set(range(len(needs))) - set([start])
+        loaded = set(needs[start])
+        while remaining:
+            board = min(remaining, key=lambda b: (len(needs[b] - loaded), b))
+            order.append(board)
+            remaining.remove(board)
+            # Only an estimate of what's loaded, as it doesn't account for the stacks running out.
+            loaded |= needs[board]
+        return order
+
+    def _improve(self, needs, order, changes, deadline):
+        """Moves single boards to other places in the order while that cuts the changes."""
+        improved = True
+        while improved and time() < deadline:
+            improved = False
+            for i in range(len(order)):
+                for j in range(len(order)):
+                    if i == j:
+                        continue
+                    candidate = order[:i] + order[i + 1:]
+                    candidate.insert(j, order[i])
+                    candidate_changes = self._count_changes(needs, candidate)
+                    if candidate_changes < changes:
+                        order, changes = candidate, candidate_changes
+                        improved = True
+                        break
+                if improved or time() >= deadline:
+                    break
+        return order
+
+    def _count_changes(self, needs, order):
+        _, loads = self._assign(needs, order)
+        return sum(len(loads[board]) for board in order[1:])
+
+    def _assign(self, needs, order):
+        """Hands out stacks for the boards in order.  Returns, for each board, a dict of identity to
+        stack, and the (stack, identity) loaded before running it."""
+        # Where in the order each identity is needed, so the one needed furthest ahead can be replaced.
+        uses = {}
+        for position, board in enumerate(order):
+            for identity in needs[board]:
+                uses.setdefault(identity, []).append(position)
+        next_use = dict((identity, 0) for identity in uses)
+
+        def upcoming(identity):
+            index = next_use[identity]
+            if index < len(uses[identity]):
+                return uses[identity][index]
+            return len(order)
+
+        on_stack = {}
+        where = {}
+        free = list(reversed(self.stacks))
+        assignments = [None] * len(needs)
+        loads = [None] * len(needs)
+        for position, board in enumerate(order):
+            for identity in needs[board]:
+                positions = uses[identity]
+                while next_use[identity] < len(positions) and positions[next_use[identity]] <= position:
+                    next_use[identity] += 1
+            board_loads = []
+            for identity in sorted(needs[board] - set(where), key=repr):
+                if free:
+                    stack = free.pop()
+                else:
+                    candidates = [stack for stack, loaded in on_stack.items() if loaded not in needs[board]]
+                    stack = max(candidates, key=lambda stack: (upcoming(on_stack[stack]), -stack))
+                    del where[on_stack[stack]]
+                on_stack[stack] = identity
+                where[identity] = stack
+                board_loads.append((stack, identity))
+            assignments[board] = dict((identity, where[identity]) for identity in needs[board])
+            loads[board] = board_loads
+        return assignments, loads
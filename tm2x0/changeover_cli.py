@@ -0,0 +1,77 @@
+from tm2x0.changeover import ChangeoverPlanner
+from tm2x0.instructions import PlacementInstructions, write_csv
+from tm2x0.machine import MACHINE_MODELS
+from tm2x0.placement import Placement
+
+import sys
+import argparse
+import logging
+import os
+
+
+def parse_command_line(argv):
+    parser = argparse.ArgumentParser(description="Plans a run of boards so reels change as little as possible, "
+                                                 "and writes each board's CSV file with the planned reel numbers")
+    parser.add_argument("placement_files",
+                        nargs="+",
+                        help="Machine CSV files for the boards")
+    stacks = parser.add_mutually_exclusive_group(required=True)
+    stacks.add_argument("--stacks",
+                        type=int,
+                        help="How many tape stacks the machine has, numbered from 1")
+    stacks.add_argument("--machine",
+                        choices=sorted(MACHINE_MODELS.keys()),
+                        help="Use all the tape stacks of this machine")
+    parser.add_argument("--output-dir",
+                        required=True,
+                        help="Where to write the renumbered CSV files, named after the input files")
+    parser.add_argument("--seconds",
+                        type=float,
+                        default=1.0,
+                        help="How long to spend improving the order.  Defaults to 1 second.")
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument("--quiet",
+                           dest="log_level",
+                           action="store_const",
+                           const=logging.WARNING,
+                           default=logging.INFO,
+                           help="Only log warnings and errors")
+    verbosity.add_argument("--verbose",
+                           dest="log_level",
+                           action="store_const",
+                           const=logging.DEBUG,
+                           help="Log debugging details too")
+    return parser.parse_args(argv[1:])
+
+
+def main():
+    logging.basicConfig(stream=sys.stderr, level=logging.DEBUG,
+                        format='(%(levelname)s): %(message)s')
+    try:
+        arguments = parse_command_line(sys.argv)
+        logging.getLogger().setLevel(arguments.log_level)
+        stack_count = arguments.stacks if arguments.stacks else MACHINE_MODELS[arguments.machine].stacks
+
+        instructions = []
+        for filename in arguments.placement_files:
+            with open(filename) as f:
+                instructions.append(PlacementInstructions.from_file(f))
+        # The placements are only for planning.  Each board's own rows are written back with new
+        # stack numbers, so their order, heights, skips and speed stay as they were.
+        placements = [Placement.from_instructions(board_instructions) for board_instructions in instructions]
+        names = [os.path.basename(filename) for filename in arguments.placement_files]
+
+        plan = ChangeoverPlanner(range(1, stack_count + 1), time_budget=arguments.seconds).plan(placements, names)
+        plan.apply_to_instructions(instructions)
+        if not os.path.isdir(arguments.output_dir):
+            os.makedirs(arguments.output_dir)
+        for board in plan.order:
+            with open(os.path.join(arguments.output_dir, names[board]), 'w') as f:
+                write_csv(f, instructions[board].instructions)
+        print "\n".join(plan.describe())
+    finally:
+        logging.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""A compact, column-oriented store for machine instructions.
+
+Big panelized files are almost entirely PartPlacementInstruction rows.  Instead of a Python
+object per row, CompactPlacementInstructions keeps those rows in parallel arrays, with
+coordinates as integer hundredths of a millimetre, and only keeps objects around for the
+other instructions.  Writing it back out gives exactly the same CSV as PlacementInstructions."""
+
+from array import array
+from os import linesep as platform_linesep
+import logging
+
+from tm2x0.fixedpoint import to_hundredths, format_hundredths
+from tm2x0.instructions import PlacementInstructions, PartPlacementInstruction, parse_line
+
+
+class PartPlacementColumns():
+    """Part placement rows stored as parallel arrays.
+
+    x, y and height are integer hundredths of a millimetre.  References and comments are
+    interned, since the same few comments tend to repeat on every row."""
+
+    def __init__(self):
+        self.part_number = array('l')
+        self.pickup_head = array('l')
+        self.stack = array('l')
+        self.x = array('l')
+        self.y = array('l')
+        self.rotation = array('l')
+        self.height = array('l')
+        self.skip = array('b')
+        self.reference = []
+        self.comment = []
+        self._strings = {}
+
+    def __len__(self):
+        return len(self.part_number)
+
+    def _intern(self, s):
+        if not s:
+            return ''
+        return self._strings.setdefault(s, s)
+
+    def append(self, part_number, pickup_head, stack, x, y, rotation, height, skip=False, reference=None,
+               comment=None):
+        """Adds a row and returns its index.  x, y and height are in hundredths of a millimetre."""
+        self.part_number.append(part_number)
+        self.pickup_head.append(pickup_head)
+        self.stack.append(stack)
+        self.x.append(x)
+        self.y.append(y)
+        self.rotation.append(rotation)
+        self.height.append(height)
+        self.skip.append(1 if skip else 0)
+        self.reference.append(self._intern(reference))
+        self.comment.append(self._intern(comment))
+        return len(self.part_number) - 1
+
+    def append_tokens(self, tokens):
+        """Adds a row straight from the tokens of a part placement line, without building an instruction."""
+        return self.append(int(tokens[0]),
+                           int(tokens[1]),
+                           int(tokens[2]),
+                           to_hundredths(tokens[3]),
+                           to_hundredths(tokens[4]),
+                           int(tokens[5]),
+                           to_hundredths(tokens[6]),
+                           int(tokens[7]),
+                           tokens[8],
+                           tokens[9])
+
+    def append_instruction(self, instruction):
+        return self.append(instruction.part_number,
+                           instruction.pickup_head,
+                           instruction.stack,
+                           instruction.x_hundredths,
+                           instruction.y_hundredths,
+                           instruction.rotation,
+                           instruction.height_hundredths,
+                           instruction.skip,
+                           instruction.reference,
+                           instruction.comment)
+
+    def instruction(self, index):
+        """Builds a PartPlacementInstruction for a single row."""
+        return PartPlacementInstruction.from_hundredths(part_number=self.part_number[index],
+                                                        pickup_head=self.pickup_head[index],
+                                                        stack=self.stack[index],
+                                                        x=self.x[index],
+                                                        y=self.y[index],
+                                                        rotation=self.rotation[index],
+                                                        height=self.height[index],
+                                                        skip=bool(self.skip[index]),
+                                                        reference=self.reference[index],
+                                                        comment=self.comment[index])
+
+    def to_csv(self, index):
+        return ','.join((str(self.part_number[index]),
+                         str(self.pickup_head[index]),
+                         str(self.stack[index]),
+                         format_hundredths(self.x[index]),
+                         format_hundredths(self.y[index]),
+                         str(self.rotation[index]),
+                         format_hundredths(self.height[index]),
+                         '1' if self.skip[index] else '0',
+                         self.reference[index],
+                         self.comment[index]))
+
+    def indices(self, stack=None, skip=None):
+        """Returns the indices of the rows picked from stack, and/or with the given skip flag."""
+        out = range(len(self))
+        if stack is not None:
+            out = [index for index in out if self.stack[index] == stack]
+        if skip is not None:
+            skip = 1 if skip else 0
+            out = [index for index in out if self.skip[index] == skip]
+        return out
+
+
+class CompactPlacementInstructions():
+    """Holds the same rows as a PlacementInstructions, with the part placements kept in columns."""
+
+    def __init__(self):
+        self.placements = PartPlacementColumns()
+        # Every other kind of instruction, kept as objects.
+        self.instructions = []
+        # File order.  Non-negative entries index self.placements, negative entries are
+        # ~index into self.instructions.
+        self.rows = array('l')
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        for row in self.rows:
+            if row >= 0:
+                yield self.placements.instruction(row)
+            else:
+                yield self.instructions[~row]
+
+    def add_instruction(self, instruction):
+        if isinstance(instruction, PartPlacementInstruction):
+            self.rows.append(self.placements.append_instruction(instruction))
+        else:
+            self.instructions.append(instruction)
+            self.rows.append(~(len(self.instructions) - 1))
+
+    def add_from_line(self, line):
+        if line and line[0] != '%':
+            tokens = line.split(",")
+            if 0 < int(tokens[0]) < 65535:
+                self.rows.append(self.placements.append_tokens(tokens))
+                return
+        self.add_instruction(parse_line(line))
+
+    @classmethod
+    def from_file(cls, f):
+        out = cls()
+        for line in f:
+            line = line.strip()
+            try:
+                out.add_from_line(line)
+            except:
+                logging.error("Error parsing line: {0}".format(line))
+                raise
+        return out
+
+    @classmethod
+    def from_string(cls, s):
+        out = cls()
+        for line in s.split(platform_linesep):
+            line = line.strip()
+            out.add_from_line(line)
+        return out
+
+    @classmethod
+    def from_instructions(cls, placement_instructions):
+        out = cls()
+        for instruction in placement_instructions:
+            out.add_instruction(instruction)
+        return out
+
+    def to_instructions(self):
+        out = PlacementInstructions()
+        out.instructions.extend(self)
+        return out
+
+    def iter_csv(self):
+        """Yields each row's CSV text, without building instruction objects for part placements."""
+        for row in self.rows:
+            if row >= 0:
+                yield self.placements.to_csv(row)
+            else:
+                yield self.instructions[~row].to_csv()
+
+    def to_csv(self, line_ending=None):
+        if line_ending is None:
+            line_ending = "\n"
+        return line_ending.join(self.iter_csv())
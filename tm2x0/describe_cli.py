@@ -1,4 +1,7 @@
-from tm2x0.placement import PlacementInstructions
+from tm2x0.instructions import iter_instructions, PlacementInstructions
+from tm2x0.machine import MACHINE_MODELS
+from tm2x0.simulate import simulate
+from tm2x0.validate import validate
 
 import sys
 import argparse
@@ -10,6 +13,28 @@ def parse_command_line(argv):
     parser.add_argument("--placement-file",
                         required=True,
                         help="Placement file")
+    parser.add_argument("--estimate",
+                        action="store_true",
+                        help="Estimate how long the job will take, instead of describing each line")
+    parser.add_argument("--validate",
+                        action="store_true",
+                        help="Check for parts on top of each other, missing reel settings and other mistakes, "
+                             "instead of describing each line")
+    parser.add_argument("--machine",
+                        choices=sorted(MACHINE_MODELS.keys()),
+                        help="With --validate, also check stack numbers and positions against this machine")
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument("--quiet",
+                           dest="log_level",
+                           action="store_const",
+                           const=logging.WARNING,
+                           default=logging.INFO,
+                           help="Only log warnings and errors")
+    verbosity.add_argument("--verbose",
+                           dest="log_level",
+                           action="store_const",
+                           const=logging.DEBUG,
+                           help="Log debugging details too")
     arguments = parser.parse_args(argv[1:])
     return arguments
 
@@ -19,9 +44,25 @@ def main():
                         format='%(name)s (%(levelname)s): %(message)s')
     try:
         arguments = parse_command_line(sys.argv)
+        logging.getLogger().setLevel(arguments.log_level)
         with open(arguments.placement_file) as f:
-            placement_instructions = PlacementInstructions.from_file(f)
-        print placement_instructions.describe()
+            if arguments.validate:
+                problems = validate(PlacementInstructions.from_file(f),
+                                    MACHINE_MODELS[arguments.machine] if arguments.machine else None)
+                for problem in problems:
+                    print problem
+                if problems:
+                    sys.exit(1)
+                print "No problems found."
+            elif arguments.estimate:
+                try:
+                    print "\n".join(simulate(PlacementInstructions.from_file(f)).describe())
+                except ValueError, e:
+                    logging.error(str(e))
+                    sys.exit(1)
+            else:
+                for instruction in iter_instructions(f):
+                    print instruction.describe()
     finally:
         logging.shutdown()
 
@@ -0,0 +1,147 @@
+"""Choosing which stack each reel goes on.
+
+Every part is picked up at its reel's feeder and carried to the board, so a reel with a lot
+of parts on a feeder far from where they go costs a lot of travel.  The optimizer works out,
+once, what each reel would cost on each stack: the distance from that stack's feeder to each
+of the reel's parts on every copy of the board.  With that table, trying a layout is just
+adding up numbers, and swapping two reels only changes four of them, so it can try a great
+many layouts quickly.  It starts from the better of the current layout and a greedy one, where
+the busiest reels pick their stacks first, and swaps reels between stacks, or moves them to
+free stacks, until no swap helps.
+
+The front tray, Reel 0, is never moved."""
+
+from math import hypot
+from time import time
+
+from tm2x0.machine import MachineProfile
+
+
+class FeederLayoutOptimizer():
+    """Picks reel numbers to cut down the travel from feeders to the board.
+
+    profile is the MachineProfile saying where each stack's feeder is.  stacks are the stack
+    numbers reels can be put on; by default, the numbers the tape reels already have, so they
+    just swap places.  Give more stacks, like range(1, model.stacks + 1) for a MachineModel,
+    to spread them out over the machine.
+
+    After optimize(), initial_travel and final_travel hold the feeder to board travel in mm for
+    the old and new layouts, and evaluated is how many layouts were tried."""
+
+    def __init__(self, profile=None, stacks=None, time_budget=1.0):
+        if profile is None:
+            profile = MachineProfile()
+        self.profile = profile
+        self.stacks = stacks
+        self.time_budget = time_budget
+        self.initial_travel = None
+        self.final_travel = None
+        self.evaluated = 0
+
+    def _board_copies(self, placement):
+        """Functions taking a board position in hundredths of a millimetre to where it's placed,
+        one for each copy of the board."""
+        if placement.panel is not None:
+            return [copy.place for copy in placement.panel.good_copies()]
+        if placement.copies:
+            out = []
+            for x, y in placement.copies:
+                x, y = int(round(float(x) * 100)), int(round(float(y) * 100))
+                out.append(lambda px, py, x=x, y=y: (px + x, py + y))
+            return out
+        return [lambda px, py: (px, py)]
+
+    def travel_table(self, placement, reel_numbers, stacks):
+        """travel[r][s] is the feeder to board travel in mm for reel_numbers[r] on stacks[s]."""
+        copies = self._board_copies(placement)
+        feeders = [self.profile.feeder_position(stack) for stack in stacks]
+        out = []
+        for reel_number in reel_numbers:
+            points = []
+            for part in placement.parts.get(reel_number, ()):
+                for place in copies:
+                    x, y = place(part.x_hundredths, part.y_hundredths)
+                    points.append((x / 100.0, y / 100.0))
+            row = []
+            for feeder_x, feeder_y in feeders:
+                row.append(sum(hypot(x - feeder_x, y - feeder_y) for x, y in points))
+            out.append(row)
+        return out
+
+    def optimize(self, placement):
+        """Returns a dict of old reel number to new, for every reel that moves."""
+        reel_numbers = sorted(number for number in set(placement.reels.keys()) | set(placement.parts.keys())
+                              if number != 0)
+        stacks = sorted(set(self.stacks if self.stacks is not None else reel_numbers) - set([0]))
+        if len(stacks) < len(reel_numbers):
+            raise ValueError("{0} reels won't fit on {1} stacks".format(len(reel_numbers), len(stacks)))
+        self.evaluated = 0
+        if not reel_numbers:
+            self.initial_travel = self.final_travel = 0.0
+            return {}
+        travel = self.travel_table(placement, reel_numbers, stacks)
+        counts = [len(placement.parts.get(reel_number, ())) for reel_number in reel_numbers]
+
+        # slot[r] is the index of the stack reel r is on, and occupant[s] the reel on stack s, or None.
+        current = None
+        if all(reel_number in stacks for reel_number in reel_numbers):
+            current = [stacks.index(reel_number) for reel_number in reel_numbers]
+            self.initial_travel = sum(travel[r][current[r]] for r in range(len(reel_numbers)))
+        slot = self._greedy(travel, counts, len(stacks))
+        if current is not None and self.initial_travel <= sum(travel[r][slot[r]] for r in range(len(slot))):
+            slot = current
+        occupant = [None] * len(stacks)
+        for r, s in enumerate(slot):
+            occupant[s] = r
+
+        self._swap(travel, slot, occupant, time() + self.time_budget)
+        self.final_travel = sum(travel[r][slot[r]] for r in range(len(slot)))
+        if self.initial_travel is None:
+            self.initial_travel = self.final_travel
+
+        out = {}
+        for r, reel_number in enumerate(reel_numbers):
+            if stacks[slot[r]] != reel_number:
+                out[reel_number] = stacks[slot[r]]
+        return out
+
+    def _greedy(self, travel, counts, stack_count):
+        slot = [None] * len(counts)
+        free = set(range(stack_count))
+        for r in sorted(range(len(counts)), key=lambda r: -counts[r]):
+            best = min(free, key=lambda s: travel[r][s])
+            slot[r] = best
+            free.remove(best)
+            self.evaluated += len(free) + 1
+        return slot
+
+    def _swap(self, travel, slot, occupant, deadline):
+        """Swaps reels between stacks, or moves them to free ones, while that cuts the travel."""
+        improved = True
+        while improved and time() < deadline:
+            improved = False
+            for a in range(len(slot)):
+                row = travel[a]
+                for s in range(len(occupant)):
+                    here = slot[a]
+                    if s == here:
+                        continue
+                    b = occupant[s]
+                    delta = row[s] - row[here]
+                    if b is not None:
+                        delta += travel[b][here] - travel[b][s]
+                    self.evaluated += 1
+                    if delta < -1e-9:
+                        slot[a] = s
+                        occupant[s] = a
+                        occupant[here] = b
+                        if b is not None:
+                            slot[b] = here
+                        improved = True
+
+    def arrange(self, placement):
+        """Renumbers the reels in placement to the optimized layout, and returns the renumbering."""
+        mapping = self.optimize(placement)
+        if mapping:
+            placement.renumber_reels(mapping)
+        return mapping
@@ -0,0 +1,58 @@
+"""Coordinates as integer hundredths of a millimetre, the resolution of the Neoden machines.
+
+These give the same rounding and text as quantizing a Decimal to two places and normalizing it,
+without doing any Decimal arithmetic in the common cases."""
+
+from decimal import Decimal
+
+TWOPLACES = Decimal(10) ** -2  # same as Decimal('0.01')
+
+
+def to_hundredths(value):
+    """Converts millimetres (a string, int, float or Decimal) to integer hundredths of a millimetre,
+    rounding half to even like Decimal.quantize."""
+    if isinstance(value, (int, long)):
+        return value * 100
+    if isinstance(value, Decimal):
+        return int(value.quantize(TWOPLACES).scaleb(2))
+    s = str(value)
+    whole, _, fraction = s.partition('.')
+    digits = whole[1:] if whole[:1] in ('-', '+') else whole
+    if digits.isdigit() and (fraction.isdigit() or not fraction):
+        # Plain decimal notation, so round with integers instead of Decimal.
+        out = int(digits + fraction)
+        places = len(fraction)
+        if places <= 2:
+            out *= 10 ** (2 - places)
+        else:
+            out, remainder = divmod(out, 10 ** (places - 2))
+            half = 5 * 10 ** (places - 3)
+            if remainder > half or (remainder == half and out % 2):
+                out += 1
+        if whole[0] == '-':
+            return -out
+        return out
+    return int(Decimal(s).quantize(TWOPLACES).scaleb(2))
+
+
+def hundredths_to_decimal(h):
+    """The normalized Decimal number of millimetres, as represent_decimal would give it."""
+    return Decimal(h).scaleb(-2).normalize()
+
+
+def format_hundredths(h):
+    """Formats integer hundredths of a millimetre exactly like str(represent_decimal(...)).
+
+    That includes normalize()'s habit of writing whole multiples of ten in scientific notation,
+    so 10000 hundredths is '1E+2'.  Negative zero can't be represented and comes out as '0'."""
+    sign = '-' if h < 0 else ''
+    whole, fraction = divmod(abs(h), 100)
+    if fraction:
+        return "{0}{1}.{2:02d}".format(sign, whole, fraction).rstrip('0')
+    whole_digits = str(whole)
+    digits = whole_digits.rstrip('0')
+    if not whole or len(digits) == len(whole_digits):
+        return sign + whole_digits
+    if len(digits) > 1:
+        digits = digits[0] + '.' + digits[1:]
+    return "{0}{1}E+{2}".format(sign, digits, len(whole_digits) - 1)
@@ -0,0 +1,96 @@
+"""Scheduling parts onto the two pickup heads of the TM2x0 machines.
+
+The machine picks up with each head that has a part coming before it goes to place them, so a
+head 1 row followed by a head 2 row costs one trip to the feeders instead of two."""
+
+from tm2x0.fixedpoint import to_hundredths
+
+HEADS = (1, 2)
+
+
+def allowed_heads(reel):
+    """The heads that can pick parts from reel.  Reel.head pins a reel to one head, when only
+    one nozzle suits its parts; otherwise either head will do."""
+    if reel is None or reel.head is None or reel.head == '':
+        return HEADS
+    return (int(reel.head),)
+
+
+def count_trips(heads):
+    """The number of trips to the feeders needed to place parts on the given heads, in order."""
+    trips = 0
+    index = 0
+    while index < len(heads):
+        if index + 1 < len(heads) and heads[index] != heads[index + 1]:
+            index += 2
+        else:
+            index += 1
+        trips += 1
+    return trips
+
+
+class DualHeadScheduler():
+    """Assigns pickup heads so consecutive parts are picked up together.
+
+    Each part is paired with the next part that can go on the other head.  If that isn't the
+    very next part, the partner is pulled forward from up to lookahead parts later, as long as
+    it isn't taller than any part it jumps ahead of, so parts still go down shortest first.
+
+    After schedule(), trips_before and trips hold the number of trips to the feeders with the
+    heads the parts came with and with the scheduled heads, and saved_trips the difference."""
+
+    def __init__(self, lookahead=8):
+        self.lookahead = lookahead
+        self.trips_before = None
+        self.trips = None
+        self.saved_trips = None
+
+    def schedule(self, parts, reels):
+        """Returns a list of (part, head) in the order they should be placed."""
+        remaining = list(parts)
+        self.trips_before = count_trips([part.head for part in remaining])
+
+        heights = {}
+        allowed = {}
+        for reel_number, reel in reels.items():
+            heights[reel_number] = to_hundredths(reel.height)
+            allowed[reel_number] = allowed_heads(reel)
+
+        out = []
+        self.trips = 0
+        index = 0
+        while index < len(remaining):
+            part = remaining[index]
+            partner = None
+            shortest_skipped = None
+            for later in range(index + 1, min(index + 1 + self.lookahead, len(remaining))):
+                candidate = remaining[later]
+                if shortest_skipped is None or heights[candidate.reel] <= shortest_skipped:
+                    pair = self._pair_heads(allowed[part.reel], allowed[candidate.reel])
+                    if pair is not None:
+                        partner = later
+                        break
+                if shortest_skipped is None or heights[candidate.reel] < shortest_skipped:
+                    shortest_skipped = heights[candidate.reel]
+
+            self.trips += 1
+            if partner is None:
+                out.append((part, allowed[part.reel][0]))
+                index += 1
+            else:
+                if partner != index + 1:
+                    remaining.insert(index + 1, remaining.pop(partner))
+                out.append((part, pair[0]))
+                out.append((remaining[index + 1], pair[1]))
+                index += 2
+
+        self.saved_trips = self.trips_before - self.trips
+        return out
+
+    def _pair_heads(self, first, second):
+        """Heads for two parts that go on different heads, preferring head 1 first, or None."""
+        for head in first:
+            for other in second:
+                if head != other:
+                    return head, other
+        return None
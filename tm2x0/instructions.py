@@ -1,16 +1,14 @@
 """Most of this file is extremely Neoden TM-220A or TM-240A specific."""
 
-from operator import attrgetter
-from tm2x0.partplacement import PartPlacement
-from tm2x0.reel import Reel
+from tm2x0.fixedpoint import TWOPLACES, to_hundredths, hundredths_to_decimal, format_hundredths
 from os import linesep as platform_linesep
 from decimal import Decimal
 import logging
+import os
+import tempfile
 
 logger = logging.getLogger()
 
-TWOPLACES = Decimal(10) ** -2  # same as Decimal('0.01')
-
 
 def represent_decimal(d):
     return d.quantize(TWOPLACES).normalize()
@@ -25,7 +23,9 @@ def describe_stack(stack_number, capitalize_tray=True):
         return "Reel {0}".format(stack_number)
 
 
-class Instruction():
+class Instruction(object):
+    __slots__ = ()
+
     @classmethod
     def from_string(cls, line):
         pass
@@ -44,6 +44,7 @@ class Instruction():
 
 class Blank(Instruction):
     """Blank is an instruction that maintains blank lines in your input files."""
+    __slots__ = ()
 
     @classmethod
     def from_tokens(cls, tokens):
@@ -58,6 +59,8 @@ class Blank(Instruction):
 
 
 class Comment(Instruction):
+    __slots__ = ('comment',)
+
     def __init__(self, comment=None):
         Instruction.__init__(self)
         if not comment:
@@ -79,11 +82,13 @@ class Comment(Instruction):
 
 
 class OriginOffsetInstruction(Instruction):
+    __slots__ = ('x_hundredths', 'y_hundredths')
+
     def __init__(self,
                  x,
                  y):
-        self._x = Decimal(str(x))
-        self._y = Decimal(str(y))
+        self.x_hundredths = to_hundredths(x)
+        self.y_hundredths = to_hundredths(y)
         Instruction.__init__(self)
 
 
@@ -91,25 +96,28 @@ class OriginOffsetInstruction(Instruction):
     def from_tokens(cls, tokens):
         flags = int(tokens[0]), int(tokens[1])
         if flags[0] == 65535 and flags[1] == 0:
-            return cls(x=tokens[2],
-                       y=tokens[3])
+            return cls._build(tokens)
+
+    @classmethod
+    def _build(cls, tokens):
+        return cls(x=tokens[2],
+                   y=tokens[3])
 
     @property
     def x(self):
-        return represent_decimal(self._x)
+        return hundredths_to_decimal(self.x_hundredths)
 
     @property
     def y(self):
-        return represent_decimal(self._y)
+        return hundredths_to_decimal(self.y_hundredths)
 
     def _get_csv_tokens(self):
-        return [str(token) for token in (65535,
-                                         0,
-                                         self.x,
-                                         self.y,
-                                         '',
-                                         '',
-        )
+        return ['65535',
+                '0',
+                format_hundredths(self.x_hundredths),
+                format_hundredths(self.y_hundredths),
+                '',
+                '',
         ]
 
     def describe(self):
@@ -117,6 +125,8 @@ class OriginOffsetInstruction(Instruction):
 
 
 class StackOffsetInstruction(Instruction):
+    __slots__ = ('stack', 'comment', 'x_hundredths', 'y_hundredths')
+
     def __init__(self, stack, x, y, comment=None):
         Instruction.__init__(self)
         self.stack = int(stack)
@@ -124,36 +134,39 @@ class StackOffsetInstruction(Instruction):
             self.comment = ''
         else:
             self.comment = comment
-        self._x = Decimal(str(x))
-        self._y = Decimal(str(y))
+        self.x_hundredths = to_hundredths(x)
+        self.y_hundredths = to_hundredths(y)
 
     @classmethod
     def from_tokens(cls, tokens):
         flags = int(tokens[0]), int(tokens[1])
         if flags[0] == 65535 and flags[1] == 1:
-            out = cls(stack=int(tokens[2]),
-                      x=tokens[3],
-                      y=tokens[4])
-            if len(tokens) > 5:
-                out.comment = tokens[5]
-            return out
+            return cls._build(tokens)
+
+    @classmethod
+    def _build(cls, tokens):
+        out = cls(stack=int(tokens[2]),
+                  x=tokens[3],
+                  y=tokens[4])
+        if len(tokens) > 5:
+            out.comment = tokens[5]
+        return out
 
     @property
     def x(self):
-        return represent_decimal(self._x)
+        return hundredths_to_decimal(self.x_hundredths)
 
     @property
     def y(self):
-        return represent_decimal(self._y)
+        return hundredths_to_decimal(self.y_hundredths)
 
     def _get_csv_tokens(self):
-        return [str(token) for token in (65535,
-                                         1,
-                                         self.stack,
-                                         self.x,
-                                         self.y,
-                                         self.comment,
-        )
+        return ['65535',
+                '1',
+                str(self.stack),
+                format_hundredths(self.x_hundredths),
+                format_hundredths(self.y_hundredths),
+                self.comment,
         ]
 
     def describe(self):
@@ -168,29 +181,34 @@ class StackOffsetInstruction(Instruction):
 
 
 class FeedSpacingInstruction(Instruction):
+    __slots__ = ('stack', 'feed_spacing_hundredths')
+
     def __init__(self, stack, feed_spacing):
         Instruction.__init__(self)
         self.stack = int(stack)
-        self._feed_spacing = Decimal(str(feed_spacing))
+        self.feed_spacing_hundredths = to_hundredths(feed_spacing)
 
     @classmethod
     def from_tokens(cls, tokens):
         flags = int(tokens[0]), int(tokens[1])
         if flags[0] == 65535 and flags[1] == 2:
-            return cls(stack=tokens[2],
-                       feed_spacing=tokens[3])
+            return cls._build(tokens)
+
+    @classmethod
+    def _build(cls, tokens):
+        return cls(stack=tokens[2],
+                   feed_spacing=tokens[3])
 
     @property
     def feed_spacing(self):
-        return represent_decimal(self._feed_spacing)
+        return hundredths_to_decimal(self.feed_spacing_hundredths)
 
     def _get_csv_tokens(self):
-        return [str(token) for token in (65535,
-                                         2,
-                                         self.stack,
-                                         self.feed_spacing,
-                                         '',
-        )
+        return ['65535',
+                '2',
+                str(self.stack),
+                format_hundredths(self.feed_spacing_hundredths),
+                '',
         ]
 
     def describe(self):
@@ -199,39 +217,44 @@ class FeedSpacingInstruction(Instruction):
 
 
 class PanelizedBoardInstruction(Instruction):
+    __slots__ = ('x_hundredths', 'y_hundredths', 'skip')
+
     def __init__(self, x, y, skip=False):
         Instruction.__init__(self)
-        self._x = Decimal(str(x))
-        self._y = Decimal(str(y))
+        self.x_hundredths = to_hundredths(x)
+        self.y_hundredths = to_hundredths(y)
         self.skip = skip
 
     @classmethod
     def from_tokens(cls, tokens):
         flags = int(tokens[0]), int(tokens[1])
         if flags[0] == 65535 and flags[1] == 3:
-            return cls(x=tokens[2],
-                       y=tokens[3],
-                       skip=int(tokens[4]))
+            return cls._build(tokens)
+
+    @classmethod
+    def _build(cls, tokens):
+        return cls(x=tokens[2],
+                   y=tokens[3],
+                   skip=int(tokens[4]))
 
     @property
     def x(self):
-        return represent_decimal(self._x)
+        return hundredths_to_decimal(self.x_hundredths)
 
     @property
     def y(self):
-        return represent_decimal(self._y)
+        return hundredths_to_decimal(self.y_hundredths)
 
     def _get_csv_tokens(self):
-        return [str(token) for token in (65535,
-                                         3,
-                                         self.x,
-                                         self.y,
-                                         1 if self.skip else 0,
-                                         0,
-                                         0,
-                                         0,
-                                         ''
-        )
+        return ['65535',
+                '3',
+                format_hundredths(self.x_hundredths),
+                format_hundredths(self.y_hundredths),
+                '1' if self.skip else '0',
+                '0',
+                '0',
+                '0',
+                ''
         ]
 
     def describe(self):
@@ -240,11 +263,13 @@ class PanelizedBoardInstruction(Instruction):
         else:
             out = ""
 
-        out += "Another copy of the board will be placed at ({0} mm, {1} mm)".format(self.x(), self.y())
+        out += "Another copy of the board will be placed at ({0} mm, {1} mm)".format(self.x, self.y)
         return out
 
 
 class SpeedInstruction(Instruction):
+    __slots__ = ('speed',)
+
     def __init__(self, speed):
         Instruction.__init__(self)
         self.speed = speed
@@ -252,7 +277,11 @@ class SpeedInstruction(Instruction):
     @classmethod
     def from_tokens(cls, tokens):
         if int(tokens[0]) == 0:
-            return cls(speed=int(tokens[1]))
+            return cls._build(tokens)
+
+    @classmethod
+    def _build(cls, tokens):
+        return cls(speed=int(tokens[1]))
 
     def _get_csv_tokens(self):
         return [str(token) for token in (0,
@@ -272,6 +301,9 @@ class SpeedInstruction(Instruction):
 
 
 class PartPlacementInstruction(Instruction):
+    __slots__ = ('part_number', 'pickup_head', 'stack', 'x_hundredths', 'y_hundredths', 'rotation',
+                 'height_hundredths', 'skip', 'reference', 'comment')
+
     def __init__(self,
                  part_number,
                  pickup_head,
@@ -287,10 +319,10 @@ class PartPlacementInstruction(Instruction):
         self.part_number = int(part_number)
         self.pickup_head = int(pickup_head)
         self.stack = int(stack)
-        self._x = Decimal(str(x))
-        self._y = Decimal(str(y))
+        self.x_hundredths = to_hundredths(x)
+        self.y_hundredths = to_hundredths(y)
         self.rotation = int(rotation)
-        self._height = Decimal(str(height))
+        self.height_hundredths = to_hundredths(height)
         self.skip = skip
         if not reference:
             self.reference = ''
@@ -305,41 +337,53 @@ class PartPlacementInstruction(Instruction):
     def from_tokens(cls, tokens):
         flag = int(tokens[0])
         if 0 < flag < 65535:
-            return cls(part_number=tokens[0],
-                       pickup_head=tokens[1],
-                       stack=tokens[2],
-                       x=tokens[3],
-                       y=tokens[4],
-                       rotation=tokens[5],
-                       height=tokens[6],
-                       skip=int(tokens[7]),
-                       reference=tokens[8],
-                       comment=tokens[9])
+            return cls._build(tokens)
+
+    @classmethod
+    def _build(cls, tokens):
+        return cls(part_number=tokens[0],
+                   pickup_head=tokens[1],
+                   stack=tokens[2],
+                   x=tokens[3],
+                   y=tokens[4],
+                   rotation=tokens[5],
+                   height=tokens[6],
+                   skip=int(tokens[7]),
+                   reference=tokens[8],
+                   comment=tokens[9])
 
     @property
     def x(self):
-        return represent_decimal(self._x)
+        return hundredths_to_decimal(self.x_hundredths)
 
     @property
     def y(self):
-        return represent_decimal(self._y)
+        return hundredths_to_decimal(self.y_hundredths)
 
     @property
     def height(self):
-        return represent_decimal(self._height)
+        return hundredths_to_decimal(self.height_hundredths)
+
+    @classmethod
+    def from_hundredths(cls, part_number, pickup_head, stack, x, y, rotation, height, **kwargs):
+        """Like the constructor, but x, y and height are already integer hundredths of a millimetre."""
+        out = cls(part_number, pickup_head, stack, 0, 0, rotation, 0, **kwargs)
+        out.x_hundredths = x
+        out.y_hundredths = y
+        out.height_hundredths = height
+        return out
 
     def _get_csv_tokens(self):
-        return [str(token) for token in (self.part_number,
-                                         self.pickup_head,
-                                         self.stack,
-                                         self.x,
-                                         self.y,
-                                         self.rotation,
-                                         self.height,
-                                         1 if self.skip else 0,
-                                         self.reference,
-                                         self.comment,
-        )
+        return [str(self.part_number),
+                str(self.pickup_head),
+                str(self.stack),
+                format_hundredths(self.x_hundredths),
+                format_hundredths(self.y_hundredths),
+                str(self.rotation),
+                format_hundredths(self.height_hundredths),
+                '1' if self.skip else '0',
+                self.reference,
+                self.comment,
         ]
 
     def describe(self):
@@ -367,10 +411,98 @@ class PartPlacementInstruction(Instruction):
         return " ".join(out)
 
 
+# Instructions flagged with 65535 in the first field, keyed by the second field.
+CONFIGURATION_INSTRUCTIONS = {0: OriginOffsetInstruction,
+                              1: StackOffsetInstruction,
+                              2: FeedSpacingInstruction,
+                              3: PanelizedBoardInstruction,
+}
+
+
+def parse_line(line):
+    """Parses a single stripped line of a machine CSV file into an Instruction.
+
+    The leading flag fields are read once and used to pick the instruction type
+    directly, rather than asking every instruction type to try the line in turn."""
+    if not line:
+        return Blank()
+    if line[0] == '%':
+        return Comment(line[1:])
+
+    tokens = line.split(",")
+    flag = int(tokens[0])
+    if 0 < flag < 65535:
+        return PartPlacementInstruction._build(tokens)
+    elif flag == 0:
+        return SpeedInstruction._build(tokens)
+    elif flag == 65535:
+        instruction = CONFIGURATION_INSTRUCTIONS.get(int(tokens[1]))
+        if instruction is not None:
+            return instruction._build(tokens)
+    raise NotImplementedError("Unrecognized instruction type in line: {0}".format(line))
+
+
+def iter_instructions(f):
+    """Yields an Instruction for each line of a machine CSV file as it is read, so
+    callers don't have to hold the whole file in memory."""
+    for line in f:
+        line = line.strip()
+        try:
+            instruction = parse_line(line)
+        except:
+            logging.error("Error parsing line: {0}".format(line))
+            raise
+        yield instruction
+
+
+def write_csv(f, instructions, line_ending=None):
+    """Writes instructions to a file one row at a time, as they are produced.
+
+    The output is the same as PlacementInstructions.to_csv, so there is no trailing line ending."""
+    if line_ending is None:
+        line_ending = "\n"
+    separator = ''
+    for instruction in instructions:
+        f.write(separator + instruction.to_csv())
+        separator = line_ending
+
+
+def replace_file(filename, write):
+    """Calls write with a temporary file next to filename, and moves it over filename if write
+    returns something true.  If write returns something false or raises an exception, filename
+    is left as it was.  Returns what write returned."""
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, temporary = tempfile.mkstemp(dir=directory, prefix=".{0}.".format(os.path.basename(filename)),
+                                     suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w') as f:
+            result = write(f)
+        if result:
+            # mkstemp only lets the owner read the file, unlike open.
+            if os.path.exists(filename):
+                mode = os.stat(filename).st_mode & 0777
+            else:
+                umask = os.umask(0)
+                os.umask(umask)
+                mode = 0666 & ~umask
+            os.chmod(temporary, mode)
+            if os.name == "nt" and os.path.exists(filename):
+                # Windows won't rename over an existing file.
+                os.remove(filename)
+            os.rename(temporary, filename)
+        return result
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
 class PlacementInstructions():
     def __init__(self):
         self.instructions = []
 
+    def __iter__(self):
+        return iter(self.instructions)
+
     def get_copies(self):
         panelized_boards = []
         for instruction in self.instructions:
@@ -385,40 +517,26 @@ class PlacementInstructions():
         offsets = [instruction for instruction in self.instructions if isinstance(instruction, OriginOffsetInstruction)]
         if len(offsets) > 1:
             raise Exception("Multiple global offsets specified")
-        elif len(offsets) == 0:
+        elif len(offsets) == 1:
             offset_x = offsets[0].x
             offset_y = offsets[0].y
 
         return offset_x, offset_y
 
     def add_from_line(self, line):
-        tokens = line.split(",")
-        instructions = [Comment,
-                        Blank,
-                        SpeedInstruction,
-                        OriginOffsetInstruction,
-                        StackOffsetInstruction,
-                        FeedSpacingInstruction,
-                        PanelizedBoardInstruction,
-                        PartPlacementInstruction,
-        ]
-        for instruction in instructions:
-            val = instruction.from_tokens(tokens)
-            if val:
-                self.instructions.append(val)
-                return
-        raise NotImplementedError("Unrecognized instruction type in line: {0}".format(line))
+        self.instructions.append(parse_line(line))
+
+    def renumber_stacks(self, mapping):
+        """Moves stacks to new numbers, given a dict of old stack number to new, in the stack
+        offset, feed spacing and part placement rows alike."""
+        for instruction in self.instructions:
+            if isinstance(instruction, (StackOffsetInstruction, FeedSpacingInstruction, PartPlacementInstruction)):
+                instruction.stack = mapping.get(instruction.stack, instruction.stack)
 
     @classmethod
     def from_file(cls, f):
         out = cls()
-        for line in f:
-            line = line.strip()
-            try:
-                out.add_from_line(line)
-            except:
-                logging.error("Error parsing line: {0}".format(line))
-                raise
+        out.instructions.extend(iter_instructions(f))
         return out
 
     @classmethod
@@ -1,40 +1,96 @@
-from decimal import Decimal
-from tm2x0.partplacement import PartPlacement
-from os import linesep as platform_linesep
+from tm2x0.transform import BoardTransform
+from tm2x0.vectorized import VectorizedBoardTransform
+
+
+def units_from_header(line):
+    """Returns "mm" or "in" for a "## Unit = " header line, or None for any other line."""
+    if line.startswith("## Unit = "):
+        if line.startswith("## Unit = mm"):
+            return "mm"
+        elif line.startswith("## Unit = inches"):
+            return "in"
+        else:
+            raise ValueError("Unexpected units specified: {0}".format(line))
+    return None
 
 
 def detect_units(s):
-    for line in s.split('\n'):
-        if line.startswith("## Unit = "):
-            if line.startswith("## Unit = mm"):
-                return "mm"
-            elif line.startswith("## Unit = inches"):
-                return "in"
-            else:
-                raise ValueError("Unexpected units specified: {0}".format(line))
+    for line in s.splitlines():
+        units = units_from_header(line)
+        if units is not None:
+            return units
+
 
+class KicadPartPositions(object):
+    """Part positions from a KiCad .pos file, by side.
+
+    Files are read a line at a time, and the units are picked up from the header as it goes by,
+    so nothing but the parts needs to stay in memory.  The original lines are kept in lines
+    unless keep_lines is turned off.
+
+    Each part goes through transform, a BoardTransform, as it's read.  With vectorize, or when
+    the transform has panel copies, the rows are collected instead and each side is transformed
+    in one go when the file has been read, so the parts come out copy by copy.  vectorize does
+    that with tm2x0.vectorized.
+
+    Back side parts go through back_transform instead, if it's given, so one pass over the file
+    can mirror the back while leaving the front alone."""
 
-class KicadPartPositions():
     def __init__(self,
-                 units):
+                 units=None,
+                 keep_lines=True,
+                 transform=None,
+                 vectorize=False,
+                 back_transform=None):
         self.instructions = {}
         self.lines = []
-        self.units = units
+        self.keep_lines = keep_lines
+        if transform is None:
+            transform = BoardTransform()
+        if back_transform is None:
+            back_transform = transform
+        if vectorize:
+            if back_transform is transform:
+                transform = back_transform = VectorizedBoardTransform.from_transform(transform)
+            else:
+                transform = VectorizedBoardTransform.from_transform(transform)
+                back_transform = VectorizedBoardTransform.from_transform(back_transform)
+        self.rows = {} if vectorize or transform.copies or back_transform.copies else None
+        self.transform = transform
+        self.back_transform = back_transform
+        if units is not None:
+            self.units = units
+
+    @property
+    def units(self):
+        return self.transform.units
+
+    @units.setter
+    def units(self, units):
+        self.transform.units = units
+        self.back_transform.units = units
+
+    def transform_for(self, side):
+        if side == "Back":
+            return self.back_transform
+        return self.transform
 
     @classmethod
-    def from_string(cls, s):
-        units = detect_units(s)
-        out = cls(units=units)
-        for line in s.split(platform_linesep):
-            line = line.strip()
-            out.add_from_line(line)
+    def from_lines(cls, lines, keep_lines=True, transform=None, vectorize=False, back_transform=None):
+        out = cls(keep_lines=keep_lines, transform=transform, vectorize=vectorize, back_transform=back_transform)
+        for line in lines:
+            out.add_from_line(line.strip())
+        out.finish()
         return out
 
     @classmethod
-    def from_file(cls, fp):
-        # ugh, all this just for autodetecting units?
-        s = fp.read()
-        return cls.from_string(s)
+    def from_string(cls, s, **kwargs):
+        # splitlines copes with \n, \r\n and \r, whatever platform we're on.
+        return cls.from_lines(s.splitlines(), **kwargs)
+
+    @classmethod
+    def from_file(cls, fp, **kwargs):
+        return cls.from_lines(fp, **kwargs)
 
     def add(self, part, side):
         if side not in self.instructions:
@@ -42,39 +98,31 @@ class KicadPartPositions():
         self.instructions[side].append(part)
 
     def add_from_line(self, line):
-        self.lines.append(line)
-        if line.startswith("#") or not line:
+        if self.keep_lines:
+            self.lines.append(line)
+        if not line:
+            return
+        elif line.startswith("#"):
+            units = units_from_header(line)
+            if units is not None:
+                self.units = units
             return
         else:
             tokens = line.split()
             try:
                 side = tokens[6]
-
-                reference = tokens[0]
-                value = tokens[1]
-                footprint = tokens[2]
-
-                if self.units == "in":
-                    conversion = Decimal("25.4")
+                if self.rows is not None:
+                    self.rows.setdefault(side, []).append(tokens)
                 else:
-                    conversion = 1
-                x = Decimal(tokens[3]) * conversion
-                y = Decimal(tokens[4]) * conversion
-
-                # KiCad rotation is clockwise, from 0 to 360.
-                #PartPlacement rotation is counterclockwise, from -180 to 180.
-                #Kicad rotation is from "normal orientation"
-                #PartPlacement rotation is from how it comes on the reel!
-                #We're going to assume that Kicad rotation refers to rotation from reel norm.
-
-                rotation = int(-1 * (Decimal(tokens[5]) - 180))
-
-                self.add(PartPlacement(reference=tokens[0],
-                                       value=tokens[1],
-                                       footprint=tokens[2],
-                                       x=tokens[3],
-                                       y=tokens[4],
-                                       rotation=rotation), side)
+                    for part in self.transform_for(side).parts([tokens]):
+                        self.add(part, side)
             except IndexError, e:
                 print "Unable to parse line {0}".format(line)
                 raise e
+
+    def finish(self):
+        """Transforms any rows collected for vectorizing.  from_lines calls this once every line is in."""
+        if self.rows:
+            for side, rows in self.rows.items():
+                self.instructions.setdefault(side, []).extend(self.transform_for(side).parts(rows))
+            self.rows = {}
@@ -1,35 +1,122 @@
+from tm2x0 import profiling
+from tm2x0.assignment import ReelAssigner, reel_numbers_by_reference
+from tm2x0.cache import JobCache, file_digest
+from tm2x0.batch import ReelMap, convert, convert_both, convert_many, find_kicad_files, output_filename
 from tm2x0.instructions import PlacementInstructions
 from tm2x0.kicad import KicadPartPositions
+from tm2x0.library import ReelLibrary
+from tm2x0.machine import MachineProfile
+from tm2x0.heads import DualHeadScheduler
+from tm2x0.optimize import PlacementOrderOptimizer
+from tm2x0.panel import PanelLayout
 from tm2x0.placement import Placement
 from tm2x0.placementcli import PlacementCLI
+from tm2x0.transform import BoardTransform
 
 import sys
 import argparse
+import cProfile
 import logging
+import os
 
 
 def parse_command_line(argv):
     parser = argparse.ArgumentParser()
     parser.add_argument("--kicad-file",
                         required=True,
-                        help=".pos file from KiCad to convert")
+                        help=".pos file from KiCad to convert, or with --reel-map, a directory of them")
     parser.add_argument("--side",
                         default="front",
-                        help="Set the side to convert.  Defaults to front.  Can be either front or back.")
+                        help="Set the side to convert.  Defaults to front.  Can be front, back or both.  "
+                             "both writes a CSV file for each side without the menu, with the back turned over.  "
+                             "back only turns the back over if --board-width is given.")
+    parser.add_argument("--board-width",
+                        help="With --side back or both, the width of the board in mm, so the back can be turned over")
     parser.add_argument("--reels-from",
                         dest="csv_file",
                         help="Load reel configurations from CSV file")
     parser.add_argument("--output-file",
                         dest="output_filename",
                         help="File to store the CSV output")
+    parser.add_argument("--optimize-order",
+                        action="store_true",
+                        help="Reorder placements to reduce head travel, instead of placing reel by reel")
+    parser.add_argument("--optimize-seconds",
+                        type=float,
+                        default=1.0,
+                        help="How long to spend improving the placement order.  Defaults to 1 second.")
+    parser.add_argument("--auto-assign",
+                        action="store_true",
+                        help="Assign parts to reels by footprint and value before showing the menu")
+    parser.add_argument("--dual-head",
+                        action="store_true",
+                        help="Assign parts to both pickup heads so they're picked up in pairs")
+    parser.add_argument("--panel",
+                        help="Step and repeat the board on a panel of ROWSxCOLUMNS copies")
+    parser.add_argument("--panel-pitch",
+                        help="X,Y distance in mm between copies on the panel")
+    parser.add_argument("--panel-skip",
+                        action="append",
+                        default=[],
+                        help="ROW,COLUMN of a bad board to skip, counting from 1.  Can be given more than once.")
+    parser.add_argument("--panel-rotate",
+                        action="append",
+                        default=[],
+                        help="ROW,COLUMN,DEGREES to turn one copy counterclockwise by a multiple of 90 degrees.  "
+                             "Can be given more than once.")
+    parser.add_argument("--expand-panel",
+                        action="store_true",
+                        help="Write a placement for every part on every copy, instead of leaving the copies "
+                             "to the machine")
+    parser.add_argument("--library",
+                        help="SQLite reel library to fill in reel settings from, created if it doesn't exist")
+    parser.add_argument("--no-cache",
+                        action="store_true",
+                        help="Don't read or store finished jobs in the cache")
+    parser.add_argument("--cache-dir",
+                        help="Where to keep the cache of finished jobs.  Defaults to ~/.cache/tm2x0.")
+    parser.add_argument("--reel-map",
+                        help="Convert without the menu, putting parts on reels according to this CSV file")
+    parser.add_argument("--output-dir",
+                        help="With --reel-map and a directory of .pos files, where to write the CSV files.  "
+                             "Defaults to the directory of .pos files.")
+    parser.add_argument("--jobs",
+                        type=int,
+                        help="With --reel-map and a directory of .pos files, how many boards to convert at once.  "
+                             "Defaults to the number of CPUs.")
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument("--quiet",
+                           dest="log_level",
+                           action="store_const",
+                           const=logging.WARNING,
+                           default=logging.INFO,
+                           help="Only log warnings and errors")
+    verbosity.add_argument("--verbose",
+                           dest="log_level",
+                           action="store_const",
+                           const=logging.DEBUG,
+                           help="Log details, like how many parts are on each reel")
+    parser.add_argument("--profile",
+                        action="store_true",
+                        help="Print how long each stage of the conversion took")
+    parser.add_argument("--profile-stats",
+                        help="Profile the conversion with cProfile and save the stats to this file, "
+                             "for reading with pstats.  Implies --profile.")
     arguments = parser.parse_args(argv[1:])
 
-    if arguments.side not in ["front", "back"]:
-        raise argparse.ArgumentError('Side must be either "front" or "back"')
+    if arguments.side not in ["front", "back", "both"]:
+        raise argparse.ArgumentError('Side must be "front", "back" or "both"')
+    if arguments.side == "both":
+        if not arguments.board_width:
+            parser.error("--side both needs --board-width")
+        if not (arguments.reel_map or arguments.auto_assign):
+            parser.error("--side both needs --reel-map or --auto-assign, since there's no menu")
+    elif arguments.board_width and arguments.side != "back":
+        parser.error("--board-width is only for --side back or both")
 
     # check input files
-    for attribute in ("kicad_file", "csv_file"):
-        if arguments.__dict__[attribute]:
+    for attribute in ("kicad_file", "csv_file", "reel_map"):
+        if arguments.__dict__[attribute] and not os.path.isdir(arguments.__dict__[attribute]):
             try:
                 with open(arguments.__dict__[attribute]) as fh:
                     pass
@@ -37,41 +124,209 @@ def parse_command_line(argv):
                 logging.error("Issue opening input file {0}".format(arguments.__dict__[attribute]))
                 raise
 
+    if os.path.isdir(arguments.kicad_file) and not arguments.reel_map:
+        parser.error("A directory of .pos files can only be converted with --reel-map")
+
+    arguments.panel_layout = panel_layout(parser, arguments)
+    if arguments.board_width and arguments.panel_layout is not None:
+        try:
+            arguments.panel_layout.turned_over()
+        except ValueError, e:
+            parser.error(str(e))
+    arguments.cache = None if arguments.no_cache else JobCache(arguments.cache_dir)
+
     return arguments
 
-def main():
-    logging.basicConfig(stream=sys.stderr, level=logging.DEBUG,
-                        format='(%(levelname)s): %(message)s')
+
+def panel_layout(parser, arguments):
+    """Builds the PanelLayout the --panel options describe, or returns None without --panel."""
+    if not arguments.panel:
+        if arguments.panel_pitch or arguments.panel_skip or arguments.panel_rotate or arguments.expand_panel:
+            parser.error("The other panel options need --panel")
+        return None
     try:
-        arguments = parse_command_line(sys.argv)
-        with open(arguments.kicad_file) as kicad_handle:
-            if arguments.csv_file:
-                try:
+        rows, columns = [int(n) for n in arguments.panel.lower().split("x")]
+    except ValueError:
+        parser.error("--panel should be ROWSxCOLUMNS, like 2x3")
+    if not arguments.panel_pitch:
+        parser.error("--panel needs --panel-pitch")
+    try:
+        pitch_x, pitch_y = [s.strip() for s in arguments.panel_pitch.split(",")]
+        skip = []
+        for spec in arguments.panel_skip:
+            row, column = [int(n) for n in spec.split(",")]
+            skip.append((row - 1, column - 1))
+        rotations = {}
+        for spec in arguments.panel_rotate:
+            row, column, degrees = [int(n) for n in spec.split(",")]
+            rotations[(row - 1, column - 1)] = degrees
+        return PanelLayout(rows, columns, pitch_x, pitch_y, rotations=rotations, skip=skip)
+    except ValueError, e:
+        parser.error("Bad panel options: {0}".format(e))
+
+
+def run_batch(arguments, side):
+    """Converts without any prompts.  Returns whether every board converted."""
+    with profiling.stage("reel_csv_parse"):
+        with open(arguments.reel_map) as f:
+            reel_map = ReelMap.from_file(f)
+    options = dict(auto_assign=arguments.auto_assign,
+                   optimize_seconds=arguments.optimize_seconds if arguments.optimize_order else None,
+                   dual_head=arguments.dual_head,
+                   panel=arguments.panel_layout,
+                   expand_panel=arguments.expand_panel,
+                   library=arguments.library,
+                   cache=arguments.cache,
+                   board_width=arguments.board_width)
+
+    if not os.path.isdir(arguments.kicad_file):
+        output_filename = arguments.output_filename
+        if output_filename is None:
+            output_filename = os.path.splitext(arguments.kicad_file)[0] + ".csv"
+        convert(arguments.kicad_file, reel_map, side=side, output_filename=output_filename, **options)
+        logging.info("Wrote {0}".format(output_filename))
+        return True
+
+    kicad_files = find_kicad_files(arguments.kicad_file)
+    if arguments.output_dir and not os.path.isdir(arguments.output_dir):
+        os.makedirs(arguments.output_dir)
+    results = convert_many(kicad_files, reel_map, side=side, output_directory=arguments.output_dir,
+                           processes=arguments.jobs, **options)
+    failed = 0
+    for output_filename, error in results:
+        if error is None:
+            logging.info("Wrote {0}".format(output_filename))
+        else:
+            logging.error("Failed to write {0}: {1}".format(output_filename, error))
+            failed += 1
+    logging.info("Converted {0} of {1} boards".format(len(results) - failed, len(results)))
+    return not failed
+
+
+def run_both(arguments):
+    """Converts both sides of each board without any prompts.  Returns whether every board converted."""
+    if arguments.reel_map:
+        with profiling.stage("reel_csv_parse"):
+            with open(arguments.reel_map) as f:
+                reel_map = ReelMap.from_file(f)
+    else:
+        reel_map = ReelMap()
+    options = dict(auto_assign=arguments.auto_assign,
+                   optimize_seconds=arguments.optimize_seconds if arguments.optimize_order else None,
+                   dual_head=arguments.dual_head,
+                   panel=arguments.panel_layout,
+                   expand_panel=arguments.expand_panel,
+                   library=arguments.library,
+                   cache=arguments.cache,
+                   processes=arguments.jobs)
+
+    if os.path.isdir(arguments.kicad_file):
+        kicad_files = find_kicad_files(arguments.kicad_file)
+    else:
+        kicad_files = [arguments.kicad_file]
+    if arguments.output_dir and not os.path.isdir(arguments.output_dir):
+        os.makedirs(arguments.output_dir)
+    failed = 0
+    for kicad_file in kicad_files:
+        output_filenames = dict((side, output_filename(kicad_file, side, arguments.output_dir))
+                                for side in ("Front", "Back"))
+        try:
+            convert_both(kicad_file, reel_map, arguments.board_width, output_filenames, **options)
+        except Exception, e:
+            logging.error("Failed to convert {0}: {1}".format(kicad_file, e))
+            failed += 1
+            continue
+        for side in ("Front", "Back"):
+            logging.info("Wrote {0}".format(output_filenames[side]))
+    if len(kicad_files) > 1:
+        logging.info("Converted {0} of {1} boards".format(len(kicad_files) - failed, len(kicad_files)))
+    return not failed
+
+
+def run(arguments):
+    """Runs the conversion the arguments describe.  Returns whether it succeeded."""
+    if arguments.side == "both":
+        return run_both(arguments)
+    if arguments.reel_map:
+        return run_batch(arguments, arguments.side.capitalize())
+    with open(arguments.kicad_file, 'rU') as kicad_handle:
+        if arguments.csv_file:
+            try:
+                with profiling.stage("reel_csv_parse"):
                     csv_handle = open(arguments.csv_file)
                     instructions = PlacementInstructions.from_file(csv_handle)
                     p = Placement.from_instructions(instructions)
                     csv_handle.close()
-                except IOError:
-                    raise
-            else:
-                p = Placement()
+            except IOError:
+                raise
+        else:
+            p = Placement()
+
+        back_transform = None
+        if arguments.board_width:
+            back_transform = BoardTransform().turned_over(arguments.board_width)
+        with profiling.stage("kicad_parse"):
+            kicad_parts = KicadPartPositions.from_file(kicad_handle, keep_lines=False, back_transform=back_transform)
 
-            kicad_parts = KicadPartPositions.from_file(kicad_handle)
+        if arguments.side == "front":
+            side = "Front"
+        elif arguments.side == "back":
+            side = "Back"
+        else:
+            raise Exception("Unknown side")
 
-            if arguments.side == "front":
-                side = "Front"
-            elif arguments.side == "back":
-                side = "Back"
-            else:
-                raise Exception("Unknown side")
+        assigner = ReelAssigner(previous=reel_numbers_by_reference(p))
+        p.clear_parts()
+        if arguments.panel_layout is not None:
+            p.panel = arguments.panel_layout.turned_over() if back_transform is not None else arguments.panel_layout
+            p.expand_panel = arguments.expand_panel
 
-            p.clear_parts()
+        optimizer = None
+        if arguments.optimize_order:
+            optimizer = PlacementOrderOptimizer(time_budget=arguments.optimize_seconds, profile=MachineProfile())
 
-            cli = PlacementCLI(placement=p,
-                               unassigned_parts=kicad_parts.instructions[side],
-                               output_filename=arguments.output_filename)
-            cli.run()
+        cli = PlacementCLI(placement=p,
+                           unassigned_parts=kicad_parts.instructions[side],
+                           output_filename=arguments.output_filename,
+                           optimizer=optimizer,
+                           scheduler=DualHeadScheduler() if arguments.dual_head else None,
+                           assigner=assigner,
+                           library=ReelLibrary(arguments.library) if arguments.library else None,
+                           cache=arguments.cache,
+                           cache_context=(file_digest(arguments.kicad_file),
+                                          side,
+                                          repr((arguments.optimize_seconds if arguments.optimize_order else None,
+                                                arguments.dual_head, arguments.board_width))))
+        if arguments.auto_assign:
+            with profiling.stage("assign"):
+                cli.auto_assign_parts_to_reels()
+        cli.run()
+        return True
 
+
+def main():
+    logging.basicConfig(stream=sys.stderr, level=logging.DEBUG,
+                        format='(%(levelname)s): %(message)s')
+    try:
+        arguments = parse_command_line(sys.argv)
+        logging.getLogger().setLevel(arguments.log_level)
+        profiler = None
+        if arguments.profile or arguments.profile_stats:
+            profiler = profiling.enable()
+        stats = None
+        if arguments.profile_stats:
+            stats = cProfile.Profile()
+            stats.enable()
+        try:
+            succeeded = run(arguments)
+        finally:
+            if stats is not None:
+                stats.disable()
+                stats.dump_stats(arguments.profile_stats)
+            if profiler is not None:
+                sys.stderr.write(profiler.report() + "\n")
+        if not succeeded:
+            sys.exit(1)
     finally:
         logging.shutdown()
 
@@ -0,0 +1,121 @@
+"""A library of reel settings that lasts from one job to the next.
+
+The library is an SQLite file with one row per footprint, value and manufacturer part number.
+Looking a part up tries its part number first, then its footprint and value, then just its
+footprint, and each of those is a lookup on an index, so big libraries stay quick."""
+
+import sqlite3
+
+SETTINGS = ("feed_spacing", "stack_x_offset", "stack_y_offset", "height", "rotation", "comment", "head")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reels (
+    footprint TEXT NOT NULL,
+    value TEXT NOT NULL DEFAULT '',
+    mpn TEXT NOT NULL DEFAULT '',
+    feed_spacing TEXT,
+    stack_x_offset TEXT,
+    stack_y_offset TEXT,
+    height TEXT,
+    rotation INTEGER,
+    comment TEXT,
+    head TEXT,
+    PRIMARY KEY (footprint, value, mpn)
+);
+CREATE INDEX IF NOT EXISTS reels_by_mpn ON reels (mpn);
+"""
+
+
+def is_unset(value):
+    return value is None or value == '' or value == 0
+
+
+def to_column(setting, value):
+    """Reel settings can be strings, Decimals or ints; the library keeps rotation as an int and
+    everything else as text."""
+    if value is None:
+        return None
+    if setting == "rotation":
+        return int(value)
+    return str(value)
+
+
+class ReelLibrary():
+    """Reel settings by footprint, value and manufacturer part number (mpn), kept in an SQLite
+    file at path.  The default path keeps the library in memory."""
+
+    def __init__(self, path=":memory:"):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM reels").fetchone()[0]
+
+    def add(self, footprint, value=None, mpn=None, **settings):
+        """Stores settings (feed_spacing, stack_x_offset and so on) for parts with this footprint,
+        value and part number, replacing anything already there."""
+        unknown = set(settings) - set(SETTINGS)
+        if unknown:
+            raise ValueError("Unknown reel settings: {0}".format(", ".join(sorted(unknown))))
+        columns = ("footprint", "value", "mpn") + SETTINGS
+        row = (footprint, value or '', mpn or '') + \
+            tuple(to_column(setting, settings.get(setting)) for setting in SETTINGS)
+        with self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO reels ({0}) VALUES ({1})".format(
+                ", ".join(columns), ", ".join("?" * len(columns))), row)
+
+    def lookup(self, footprint=None, value=None, mpn=None):
+        """Returns a dict of the settings that best match a part, or None if nothing does."""
+        row = None
+        if mpn:
+            row = self.connection.execute("SELECT * FROM reels WHERE mpn = ? LIMIT 1", (mpn,)).fetchone()
+        if row is None and footprint and value:
+            # Rows learned with a part number still fit other parts with the same footprint and value.
+            row = self.connection.execute("SELECT * FROM reels WHERE footprint = ? AND value = ? "
+                                          "ORDER BY mpn != '' LIMIT 1", (footprint, value)).fetchone()
+        if row is None and footprint:
+            row = self.connection.execute("SELECT * FROM reels WHERE footprint = ? AND value = '' "
+                                          "ORDER BY mpn != '' LIMIT 1", (footprint,)).fetchone()
+        if row is None:
+            return None
+        return dict((setting, row[setting]) for setting in SETTINGS if row[setting] is not None)
+
+    def lookup_part(self, part):
+        return self.lookup(part.footprint, part.value, part.mpn)
+
+    def configure(self, reel, part, overwrite=False):
+        """Fills in reel's settings from the library entry for part.  Settings that are already set
+        are left alone unless overwrite is set.  Returns whether the library had an entry."""
+        settings = self.lookup_part(part)
+        if settings is None:
+            return False
+        for setting, value in settings.items():
+            if overwrite or is_unset(getattr(reel, setting)):
+                setattr(reel, setting, value)
+        return True
+
+    def learn(self, placement):
+        """Stores the settings of every configured reel in placement that has parts with a footprint.
+        A reel holding parts with different values is stored under its footprint alone.  Returns
+        the number of reels stored."""
+        learned = 0
+        for reel_number, parts in placement.parts.items():
+            reel = placement.reels.get(reel_number)
+            if reel is None or not parts or reel.feed_spacing is None:
+                continue
+            footprints = set(part.footprint for part in parts)
+            if len(footprints) != 1 or None in footprints:
+                continue
+            values = set(part.value for part in parts)
+            mpns = set(part.mpn for part in parts)
+            self.add(footprints.pop(),
+                     value=values.pop() if len(values) == 1 else None,
+                     mpn=mpns.pop() if len(mpns) == 1 else None,
+                     **dict((setting, getattr(reel, setting)) for setting in SETTINGS))
+            learned += 1
+        return learned
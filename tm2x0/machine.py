@@ -0,0 +1,70 @@
+"""Descriptions of the machine itself: where the feeders are and how fast it moves.
+
+None of these numbers come from Neoden.  The defaults are rough guesses for a TM2x0; measure
+your own machine and pass in a MachineProfile if the answers matter."""
+
+
+class MachineProfile():
+    """How a pick and place machine moves.
+
+    Positions are (x, y) in mm, in the same coordinates as the placement file.  A stack's
+    feeder is at feeder_positions[stack] if it's there, and otherwise at
+    feeder_origin + stack * feeder_pitch, with stack 0 being the front tray.
+    speed is the top speed of each axis in mm/s and acceleration is in mm/s^2, both at 100%
+    speed.  rotation_speed is in degrees per second, and pick_time and place_time are how many
+    seconds the nozzle spends going down and back up."""
+
+    def __init__(self,
+                 feeder_positions=None,
+                 feeder_origin=(-20.0, 0.0),
+                 feeder_pitch=(0.0, 10.0),
+                 home=(0.0, 0.0),
+                 speed=500.0,
+                 acceleration=5000.0,
+                 rotation_speed=360.0,
+                 pick_time=0.3,
+                 place_time=0.3):
+        if feeder_positions is None:
+            feeder_positions = {}
+        self.feeder_positions = feeder_positions
+        self.feeder_origin = feeder_origin
+        self.feeder_pitch = feeder_pitch
+        self.home = home
+        self.speed = speed
+        self.acceleration = acceleration
+        self.rotation_speed = rotation_speed
+        self.pick_time = pick_time
+        self.place_time = place_time
+
+    def feeder_position(self, stack):
+        if stack in self.feeder_positions:
+            x, y = self.feeder_positions[stack]
+            return float(x), float(y)
+        return (self.feeder_origin[0] + stack * self.feeder_pitch[0],
+                self.feeder_origin[1] + stack * self.feeder_pitch[1])
+
+    def all_feeder_positions(self, stacks):
+        """A dict of feeder positions for the given stacks, as PlacementOrderOptimizer wants them."""
+        return dict((stack, self.feeder_position(stack)) for stack in stacks)
+
+
+class MachineModel():
+    """What a model of machine can hold and reach.
+
+    stacks is the highest stack number, with 0 being the front tray.  bed is (min_x, min_y,
+    max_x, max_y), in mm, of the area parts can be placed in, in the coordinates of the
+    placement file once the origin and panel offsets are added in.  Like KiCad, y goes negative
+    towards the front of the machine."""
+
+    def __init__(self, name, stacks, bed):
+        self.name = name
+        self.stacks = stacks
+        self.bed = bed
+
+    def has_stack(self, stack):
+        return 0 <= stack <= self.stacks
+
+
+MACHINE_MODELS = {"TM220A": MachineModel("TM220A", stacks=20, bed=(0, -280, 300, 0)),
+                  "TM240A": MachineModel("TM240A", stacks=26, bed=(0, -320, 300, 0)),
+}
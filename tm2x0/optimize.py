@@ -0,0 +1,237 @@
+"""Reordering part placements to cut down on gantry travel.
+
+Every placement is a trip from the part's feeder to its spot on the board, so placing part b
+right after part a costs the distance from a to b's feeder, plus the distance from b's feeder
+to b.  The second half doesn't depend on the order, so the optimizer works on the first half:
+a nearest neighbour tour, improved with 2-opt and Or-opt moves until it runs out of ideas or time.
+Without feeder positions, the cost is just the distance from a to b."""
+
+from math import hypot
+from time import time
+
+from tm2x0.fixedpoint import to_hundredths
+from tm2x0.spatial import GridIndex
+
+
+class PlacementOrderOptimizer():
+    """Reorders parts to minimise the distance the head travels.
+
+    feeder_positions maps stack numbers to the (x, y) in mm, in board coordinates, where parts
+    are picked up.  profile, a MachineProfile, gives the position of any stack that isn't in
+    feeder_positions.  Without either, a stack's parts are treated as if they were picked up
+    where they're placed.  If respect_height is set, parts are placed in order of increasing
+    reel height, so the nozzle never has to come down next to a taller part, and only the
+    order within each height is changed.  The improvement phase stops after time_budget seconds.
+
+    After optimize(), initial_distance and final_distance hold the total travel in mm before
+    and after reordering."""
+
+    def __init__(self, feeder_positions=None, time_budget=1.0, respect_height=True, start=None, profile=None):
+        if feeder_positions is None:
+            feeder_positions = {}
+        self.feeder_positions = feeder_positions
+        self.profile = profile
+        self.time_budget = time_budget
+        self.respect_height = respect_height
+        self.start = start
+        self.initial_distance = None
+        self.final_distance = None
+
+    def _load(self, parts):
+        self.px = [part.x_hundredths / 100.0 for part in parts]
+        self.py = [part.y_hundredths / 100.0 for part in parts]
+        self.fx = []
+        self.fy = []
+        for index, part in enumerate(parts):
+            feeder = self.feeder_positions.get(part.reel)
+            if feeder is None and self.profile is not None:
+                feeder = self.profile.feeder_position(part.reel)
+            if feeder is None:
+                self.fx.append(self.px[index])
+                self.fy.append(self.py[index])
+            else:
+                self.fx.append(float(feeder[0]))
+                self.fy.append(float(feeder[1]))
+
+    def _cost(self, a, b):
+        """The order-dependent part of placing b after a."""
+        return hypot(self.px[a] - self.fx[b], self.py[a] - self.fy[b])
+
+    def _start_cost(self, start, b):
+        if start is None:
+            return 0.0
+        return hypot(start[0] - self.fx[b], start[1] - self.fy[b])
+
+    def _distance(self, order):
+        """Total travel in mm for an order of indices, including the trips from feeders to the board."""
+        if not order:
+            return 0.0
+        total = self._start_cost(self.start, order[0])
+        for previous, current in zip(order, order[1:]):
+            total += self._cost(previous, current)
+        for index in order:
+            total += hypot(self.fx[index] - self.px[index], self.fy[index] - self.py[index])
+        return total
+
+    def distance(self, parts):
+        """Total travel in mm for placing parts in the given order."""
+        self._load(parts)
+        return self._distance(range(len(parts)))
+
+    def optimize(self, parts, reels):
+        """Returns parts in a new order, grouped by reel height if respect_height is set."""
+        parts = list(parts)
+        self._load(parts)
+        self.initial_distance = self._distance(range(len(parts)))
+
+        if self.respect_height:
+            layers = {}
+            for index, part in enumerate(parts):
+                layers.setdefault(to_hundredths(reels[part.reel].height), []).append(index)
+            layers = [layers[height] for height in sorted(layers)]
+        else:
+            layers = [range(len(parts))]
+
+        deadline = time() + self.time_budget
+        order = []
+        start = self.start
+        for layer in layers:
+            tour = self._nearest_neighbour(layer, start)
+            self._improve(tour, start, deadline)
+            order.extend(tour)
+            start = (self.px[tour[-1]], self.py[tour[-1]])
+
+        self.final_distance = self._distance(order)
+        if self.final_distance > self.initial_distance and not self.respect_height:
+            # Without height layers to respect, never hand back something worse than we were given.
+            order = range(len(parts))
+            self.final_distance = self.initial_distance
+        return [parts[index] for index in order]
+
+    def _nearest_neighbour(self, indices, start):
+        # Parts from a stack with a known feeder all cost the same to reach, apart from the trip from the
+        # feeder to the board, so the best part from such a stack is always its closest remaining one.
+        by_stack = {}
+        loose = []
+        for index in indices:
+            if self.fx[index] == self.px[index] and self.fy[index] == self.py[index]:
+                loose.append(index)
+            else:
+                by_stack.setdefault((self.fx[index], self.fy[index]), []).append(index)
+        for members in by_stack.values():
+            members.sort(key=lambda i: hypot(self.fx[i] - self.px[i], self.fy[i] - self.py[i]), reverse=True)
+        grid = GridIndex(self.px, self.py, loose) if loose else None
+
+        tour = []
+        if start is None:
+            x, y = (self.px[indices[0]], self.py[indices[0]])
+        else:
+            x, y = start
+        while len(tour) < len(indices):
+            best = None
+            for (feeder_x, feeder_y), members in by_stack.items():
+                if members:
+                    candidate = members[-1]
+                    cost = hypot(x - feeder_x, y - feeder_y) + \
+                        hypot(feeder_x - self.px[candidate], feeder_y - self.py[candidate])
+                    if best is None or cost < best[0]:
+                        best = (cost, candidate, members)
+            if grid is not None:
+                near = grid.nearest(x, y)
+                if near is not None and (best is None or near[0] < best[0]):
+                    best = (near[0], near[1], None)
+            _, chosen, members = best
+            if members is None:
+                grid.remove(chosen)
+            else:
+                members.pop()
+            tour.append(chosen)
+            x, y = self.px[chosen], self.py[chosen]
+        return tour
+
+    def _improve(self, tour, start, deadline):
+        improved = True
+        while improved and time() < deadline:
+            improved = self._two_opt(tour, start, deadline) or self._or_opt(tour, start, deadline)
+
+    def _edge(self, tour, start, i, j):
+        """Cost of going from position i to position j, where i of -1 is the start."""
+        if i < 0:
+            return self._start_cost(start, tour[j])
+        return self._cost(tour[i], tour[j])
+
+    def _two_opt(self, tour, start, deadline):
+        """Reverses segments wherever that shortens the tour.  Returns whether anything changed."""
+        n = len(tour)
+        if n < 3:
+            return False
+        cost = self._cost
+        improved = False
+        forward, backward = self._prefix_costs(tour)
+        i = 0
+        while i < n - 1 and time() < deadline:
+            before = self._edge(tour, start, i - 1, i)
+            for j in range(i + 1, n):
+                # Reversing tour[i:j + 1] turns its inner edges around, which the prefix sums cost in O(1).
+                delta = (backward[j] - backward[i]) - (forward[j] - forward[i])
+                delta += self._edge(tour, start, i - 1, j) - before
+                if j + 1 < n:
+                    delta += cost(tour[i], tour[j + 1]) - cost(tour[j], tour[j + 1])
+                if delta < -1e-9:
+                    tour[i:j + 1] = tour[i:j + 1][::-1]
+                    forward, backward = self._prefix_costs(tour)
+                    improved = True
+                    break
+            else:
+                i += 1
+        return improved
+
+    def _prefix_costs(self, tour):
+        """Running totals of the edge costs along the tour, going forwards and backwards."""
+        forward = [0.0] * len(tour)
+        backward = [0.0] * len(tour)
+        for k in range(1, len(tour)):
+            forward[k] = forward[k - 1] + self._cost(tour[k - 1], tour[k])
+            backward[k] = backward[k - 1] + self._cost(tour[k], tour[k - 1])
+        return forward, backward
+
+    def _or_opt(self, tour, start, deadline):
+        """Moves runs of up to three parts elsewhere wherever that shortens the tour.  Returns whether
+        anything changed."""
+        n = len(tour)
+        improved = False
+        for length in (1, 2, 3):
+            i = 0
+            while i < n - length + 1:
+                if time() >= deadline:
+                    return improved
+                if self._move_segment(tour, start, i, length):
+                    improved = True
+                else:
+                    i += 1
+        return improved
+
+    def _move_segment(self, tour, start, i, length):
+        n = len(tour)
+        last = i + length - 1
+        removed = self._edge(tour, start, i - 1, i)
+        if last + 1 < n:
+            removed += self._cost(tour[last], tour[last + 1])
+            removed -= self._edge(tour, start, i - 1, last + 1)
+        rest = tour[:i] + tour[last + 1:]
+        segment = tour[i:last + 1]
+        for p in range(len(rest) + 1):
+            if p == i:
+                continue
+            if p == 0:
+                added = self._start_cost(start, segment[0])
+                if rest:
+                    added += self._cost(segment[-1], rest[0]) - self._start_cost(start, rest[0])
+            else:
+                added = self._cost(rest[p - 1], segment[0])
+                if p < len(rest):
+                    added += self._cost(segment[-1], rest[p]) - self._cost(rest[p - 1], rest[p])
+            if added - removed < -1e-9:
+                tour[:] = rest[:p] + segment + rest[p:]
+                return True
+        return False
@@ -0,0 +1,148 @@
+"""Step-and-repeat panels.
+
+A PanelLayout is a grid of copies of one board.  Copies can be turned by multiples of 90
+degrees and marked as bad, so they're skipped.  The layout can either go to the machine as
+panelized board instructions, which leaves the machine to repeat the board, or be expanded
+into a placement for every part on every good copy, so the whole panel is sequenced as one job.
+
+Rows and columns are counted from 0, from the copy at the panel origin."""
+
+from tm2x0.fixedpoint import to_hundredths, hundredths_to_decimal
+from tm2x0.instructions import PanelizedBoardInstruction
+from tm2x0.partplacement import PartPlacement
+from tm2x0.transform import normalize_rotation
+
+
+class PanelCopy():
+    def __init__(self, number, row, column, x_hundredths, y_hundredths, rotation=0, skip=False):
+        self.number = number
+        self.row = row
+        self.column = column
+        self.x_hundredths = x_hundredths
+        self.y_hundredths = y_hundredths
+        self.rotation = rotation
+        self.skip = skip
+
+    def place(self, x, y):
+        """Where a board position, in hundredths of a millimetre, ends up on the panel."""
+        if self.rotation == 90:
+            x, y = -y, x
+        elif self.rotation == 180:
+            x, y = -x, -y
+        elif self.rotation == 270:
+            x, y = y, -x
+        return x + self.x_hundredths, y + self.y_hundredths
+
+    def __repr__(self):
+        return "<PanelCopy {0} at row {1}, column {2}>".format(self.number, self.row, self.column)
+
+
+class PanelLayout():
+    """rows by columns copies of a board, pitch_x and pitch_y mm apart, with the first at origin.
+
+    rotations maps (row, column) to the counterclockwise rotation of that copy, a multiple of 90
+    degrees, around its own origin.  skip is a collection of the (row, column) of bad boards."""
+
+    def __init__(self, rows, columns, pitch_x, pitch_y, origin=(0, 0), rotations=None, skip=None):
+        if rows < 1 or columns < 1:
+            raise ValueError("A panel needs at least one row and one column")
+        self.rows = rows
+        self.columns = columns
+        self.pitch_x = pitch_x
+        self.pitch_y = pitch_y
+        self.origin = origin
+        self.rotations = dict(rotations or {})
+        self.skip = set(skip or ())
+        for (row, column), rotation in self.rotations.items():
+            if rotation % 90:
+                raise ValueError("Copies can only be rotated by multiples of 90 degrees, not {0}".format(rotation))
+            self._check(row, column)
+        for row, column in self.skip:
+            self._check(row, column)
+
+    def signature(self):
+        """Text that changes whenever the layout does, for cache keys."""
+        return repr((self.rows, self.columns, str(self.pitch_x), str(self.pitch_y),
+                     (str(self.origin[0]), str(self.origin[1])), sorted(self.rotations.items()), sorted(self.skip)))
+
+    def _check(self, row, column):
+        if not (0 <= row < self.rows and 0 <= column < self.columns):
+            raise ValueError("There's no copy at row {0}, column {1} on a {2}x{3} panel".format(
+                row, column, self.rows, self.columns))
+
+    def __len__(self):
+        return self.rows * self.columns
+
+    def copies(self):
+        """Every copy, numbered from 1 in serpentine order: along the first row, back along the
+        second, and so on, so going from one copy to the next is always a short move."""
+        pitch_x = to_hundredths(self.pitch_x)
+        pitch_y = to_hundredths(self.pitch_y)
+        origin_x = to_hundredths(self.origin[0])
+        origin_y = to_hundredths(self.origin[1])
+        out = []
+        for row in range(self.rows):
+            columns = range(self.columns)
+            if row % 2:
+                columns.reverse()
+            for column in columns:
+                out.append(PanelCopy(len(out) + 1,
+                                     row,
+                                     column,
+                                     origin_x + column * pitch_x,
+                                     origin_y + row * pitch_y,
+                                     self.rotations.get((row, column), 0) % 360,
+                                     (row, column) in self.skip))
+        return out
+
+    def turned_over(self):
+        """The same panel seen from the other side, turned over left to right like
+        BoardTransform.turned_over, so the copy in the last column comes first.  A rotated copy
+        would also move off its place in the grid, so panels with any can't be turned over."""
+        if self.is_rotated():
+            raise ValueError("A panel with rotated copies can't be turned over for the back of the board")
+        last = self.columns - 1
+        return PanelLayout(self.rows, self.columns, self.pitch_x, self.pitch_y, self.origin,
+                           skip=[(row, last - column) for row, column in self.skip])
+
+    def good_copies(self):
+        return [copy for copy in self.copies() if not copy.skip]
+
+    def is_rotated(self):
+        return any(rotation % 360 for rotation in self.rotations.values())
+
+    def copy_offsets(self):
+        """(x, y) in mm of each good copy, like PlacementInstructions.get_copies gives them."""
+        if self.is_rotated():
+            raise ValueError("The machine can't rotate panel copies; expand the panel instead")
+        return [(hundredths_to_decimal(copy.x_hundredths), hundredths_to_decimal(copy.y_hundredths))
+                for copy in self.good_copies()]
+
+    def to_instructions(self):
+        """A PanelizedBoardInstruction for each copy, with bad ones skipped."""
+        if self.is_rotated():
+            raise ValueError("The machine can't rotate panel copies; expand the panel instead")
+        return [PanelizedBoardInstruction(x=hundredths_to_decimal(copy.x_hundredths),
+                                          y=hundredths_to_decimal(copy.y_hundredths),
+                                          skip=copy.skip)
+                for copy in self.copies()]
+
+    def expand(self, parts):
+        """Returns a PartPlacement for each part on each good copy, copy by copy in serpentine
+        order.  References get the copy number added, so R1 on copy 3 is R1-3."""
+        out = []
+        for copy in self.good_copies():
+            for part in parts:
+                x, y = copy.place(part.x_hundredths, part.y_hundredths)
+                out.append(PartPlacement.from_hundredths(reference="{0}-{1}".format(part.reference, copy.number),
+                                                         x=x,
+                                                         y=y,
+                                                         rotation=normalize_rotation(part.rotation + copy.rotation),
+                                                         height=part.height,
+                                                         footprint=part.footprint,
+                                                         value=part.value,
+                                                         comment=part.comment,
+                                                         reel=part.reel,
+                                                         head=part.head,
+                                                         mpn=part.mpn))
+        return out
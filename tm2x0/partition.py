@@ -0,0 +1,140 @@
+"""Splitting a job across machines.
+
+Each reel, and so all its parts, goes to one machine.  Reels are handed out longest job first:
+the reel whose parts take longest to place goes first, to whichever machine would then have
+the least to do, among those with a stack left for it.  How long a reel takes is estimated
+with a CycleTimeModel for each machine's MachineProfile, on every copy of the board.  The front
+tray, Reel 0, doesn't use a tape stack, so it can go to any machine.
+
+Listing the same machine more than once splits a job that needs more stacks than it has
+into passes, one after the other."""
+
+from copy import copy
+
+from tm2x0.instructions import PlacementInstructions, StackOffsetInstruction, FeedSpacingInstruction, \
+    PartPlacementInstruction
+from tm2x0.machine import MachineProfile
+from tm2x0.simulate import CycleTimeModel
+
+
+class JobShare():
+    """One machine's part of a job: the placement for it, with reels renumbered to fit
+    (mapping holds the renumbering, old number to new, for reels that moved), the reel
+    numbers it had in the whole job, and the estimated seconds to place it."""
+
+    def __init__(self, model, profile, placement, mapping, seconds, reel_numbers=()):
+        self.model = model
+        self.profile = profile
+        self.placement = placement
+        self.mapping = mapping
+        self.seconds = seconds
+        self.reel_numbers = set(reel_numbers)
+
+    def filter_instructions(self, instructions):
+        """This machine's rows of the whole job's instructions, a PlacementInstructions, as a new
+        PlacementInstructions.  Rows for other machines' stacks are left out, stacks are
+        renumbered by mapping and parts numbered from 1 again; every other row, and the order of
+        the rows, is kept as it was."""
+        out = PlacementInstructions()
+        part_number = 0
+        for instruction in instructions:
+            if isinstance(instruction, (StackOffsetInstruction, FeedSpacingInstruction, PartPlacementInstruction)):
+                if instruction.stack not in self.reel_numbers:
+                    continue
+            instruction = copy(instruction)
+            if isinstance(instruction, PartPlacementInstruction):
+                part_number += 1
+                instruction.part_number = part_number
+            out.instructions.append(instruction)
+        out.renumber_stacks(self.mapping)
+        return out
+
+    def __repr__(self):
+        return "<JobShare for a {0}, {1} reels, {2:.0f} s>".format(self.model.name, len(self.placement.reels),
+                                                                     self.seconds)
+
+
+def _sub_placement(placement, reel_numbers):
+    """A copy of placement with only the given reels, which can be changed without changing placement."""
+    out = copy(placement)
+    out.reels = dict((number, copy(placement.reels[number])) for number in reel_numbers if number in placement.reels)
+    out.parts = dict((number, [copy(part) for part in placement.parts[number]])
+                     for number in reel_numbers if number in placement.parts)
+    out.generated_parts = None
+    out._snapshot = None
+    return out
+
+
+class JobPartitioner():
+    """Splits jobs across machines, given as a list of MachineModels, each with the MachineProfile
+    at the same place in profiles, if they're given."""
+
+    def __init__(self, models, profiles=None):
+        if not models:
+            raise ValueError("There has to be at least one machine")
+        if profiles is None:
+            profiles = [MachineProfile() for _ in models]
+        if len(profiles) != len(models):
+            raise ValueError("There has to be a profile for each machine")
+        self.models = models
+        self.profiles = profiles
+
+    def reel_seconds(self, placement):
+        """For each machine, a dict of reel number to the estimated seconds placing that reel's parts takes."""
+        # Generating from a copy leaves placement's record of what's changed alone.
+        instructions = _sub_placement(placement, placement.parts.keys()).generate_instructions()
+        # CycleTimeModel keeps the unskipped part rows in order, so their stacks line up with its rows.
+        stacks = [instruction.stack for instruction in instructions
+                  if isinstance(instruction, PartPlacementInstruction) and not instruction.skip]
+        rows = {}
+        for index, stack in enumerate(stacks):
+            rows.setdefault(stack, []).append(index)
+        out = []
+        models = {}
+        for profile in self.profiles:
+            if id(profile) not in models:
+                models[id(profile)] = CycleTimeModel(instructions, profile)
+            model = models[id(profile)]
+            out.append(dict((stack, model.evaluate(order).panel) for stack, order in rows.items()))
+        return out
+
+    def split(self, placement):
+        """Returns a JobShare for each machine, in the order the machines were given."""
+        reel_numbers = sorted(set(placement.reels.keys()) | set(placement.parts.keys()))
+        tape_reels = [number for number in reel_numbers if number != 0]
+        capacity = sum(model.stacks for model in self.models)
+        if len(tape_reels) > capacity:
+            raise ValueError("{0} reels won't fit on {1} stacks".format(len(tape_reels), capacity))
+
+        seconds = self.reel_seconds(placement)
+        machines = range(len(self.models))
+        loads = [0.0 for _ in machines]
+        assigned = [[] for _ in machines]
+        for reel_number in sorted(reel_numbers, key=lambda number: (-seconds[0].get(number, 0.0), number)):
+            candidates = [m for m in machines
+                          if reel_number == 0 or
+                          len([n for n in assigned[m] if n != 0]) < self.models[m].stacks]
+            m = min(candidates, key=lambda m: (loads[m] + seconds[m].get(reel_number, 0.0), m))
+            assigned[m].append(reel_number)
+            loads[m] += seconds[m].get(reel_number, 0.0)
+
+        out = []
+        for m in machines:
+            share = _sub_placement(placement, assigned[m])
+            mapping = self._fit(sorted(assigned[m]), self.models[m])
+            if mapping:
+                share.renumber_reels(mapping)
+            out.append(JobShare(self.models[m], self.profiles[m], share, mapping,
+                                CycleTimeModel(share, self.profiles[m]).evaluate().panel if share.parts else 0.0,
+                                assigned[m]))
+        return out
+
+    def _fit(self, reel_numbers, model):
+        """Renumbers reels the machine doesn't have stacks for onto its free stacks."""
+        free = [stack for stack in range(1, model.stacks + 1) if stack not in reel_numbers]
+        free.reverse()
+        mapping = {}
+        for number in reel_numbers:
+            if number != 0 and not model.has_stack(number):
+                mapping[number] = free.pop()
+        return mapping
@@ -0,0 +1,75 @@
+from tm2x0.instructions import PlacementInstructions, write_csv
+from tm2x0.machine import MACHINE_MODELS
+from tm2x0.partition import JobPartitioner
+from tm2x0.placement import Placement
+
+import sys
+import argparse
+import logging
+import os
+
+
+def parse_command_line(argv):
+    parser = argparse.ArgumentParser(description="Splits a job across machines, or into passes on one machine, "
+                                                 "so each gets about the same amount of work")
+    parser.add_argument("--placement-file",
+                        required=True,
+                        help="Machine CSV file to split")
+    parser.add_argument("--machine",
+                        action="append",
+                        required=True,
+                        choices=sorted(MACHINE_MODELS.keys()),
+                        help="A machine to give part of the job to.  Give it once for each machine, or more than "
+                             "once for the same machine to split the job into passes.")
+    parser.add_argument("--output-dir",
+                        help="Where to write the CSV files.  Defaults to the directory of the placement file.")
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument("--quiet",
+                           dest="log_level",
+                           action="store_const",
+                           const=logging.WARNING,
+                           default=logging.INFO,
+                           help="Only log warnings and errors")
+    verbosity.add_argument("--verbose",
+                           dest="log_level",
+                           action="store_const",
+                           const=logging.DEBUG,
+                           help="Log debugging details too")
+    return parser.parse_args(argv[1:])
+
+
+def share_filename(placement_filename, number, model, output_directory=None):
+    stem = os.path.splitext(os.path.basename(placement_filename))[0]
+    if output_directory is None:
+        output_directory = os.path.dirname(placement_filename)
+    return os.path.join(output_directory, "{0}-{1}-{2}.csv".format(stem, number, model.name))
+
+
+def main():
+    logging.basicConfig(stream=sys.stderr, level=logging.DEBUG,
+                        format='(%(levelname)s): %(message)s')
+    try:
+        arguments = parse_command_line(sys.argv)
+        logging.getLogger().setLevel(arguments.log_level)
+        with open(arguments.placement_file) as f:
+            instructions = PlacementInstructions.from_file(f)
+        # The placement is only for splitting.  Each machine's file is its own rows of the job, so
+        # their order, heights, skips and speed stay as they were.
+        placement = Placement.from_instructions(instructions)
+
+        shares = JobPartitioner([MACHINE_MODELS[name] for name in arguments.machine]).split(placement)
+        if arguments.output_dir and not os.path.isdir(arguments.output_dir):
+            os.makedirs(arguments.output_dir)
+        for number, share in enumerate(shares, 1):
+            filename = share_filename(arguments.placement_file, number, share.model, arguments.output_dir)
+            with open(filename, 'w') as f:
+                write_csv(f, share.filter_instructions(instructions))
+            print "{0}: {1} reels, about {2:.0f} s".format(filename, len(share.placement.reels), share.seconds)
+            for old, new in sorted(share.mapping.items()):
+                print "\tReel {0} is loaded as Reel {1}".format(old, new)
+    finally:
+        logging.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,11 @@
-class PartPlacement():
+from tm2x0.fixedpoint import to_hundredths, hundredths_to_decimal
+
+
+class PartPlacement(object):
     """PartPlacement is the general, objecty thing that a PartPlacementInstruction corresponds to.
 
-    It is similar to Reel()."""
+    It is similar to Reel().  x and y are kept as integer hundredths of a millimetre
+    (x_hundredths and y_hundredths), and read back as Decimal millimetres."""
     def __init__(self,
                  reference,
                  x,
@@ -12,7 +16,8 @@ class PartPlacement():
                  value=None,
                  comment=None,
                  reel=None,
-                 head=1
+                 head=1,
+                 mpn=None
     ):
         self.reel = reel
         self.reference = reference
@@ -24,7 +29,44 @@ class PartPlacement():
         self.rotation = rotation
         self.comment = comment
         self.head=head
+        # Manufacturer part number, when it's known.
+        self.mpn = mpn
+
+    @classmethod
+    def from_hundredths(cls, reference, x, y, rotation=0, height=None, footprint=None, value=None, comment=None,
+                        reel=None, head=1, mpn=None):
+        """Like the constructor, but x and y are already integer hundredths of a millimetre.  This is
+        how parts are made in bulk, so it sets the attributes directly instead of going through
+        the conversions."""
+        out = cls.__new__(cls)
+        out.reel = reel
+        out.reference = reference
+        out.value = value
+        out.footprint = footprint
+        out.x_hundredths = x
+        out.y_hundredths = y
+        out.height = height
+        out.rotation = rotation
+        out.comment = comment
+        out.head = head
+        out.mpn = mpn
+        return out
+
+    @property
+    def x(self):
+        return hundredths_to_decimal(self.x_hundredths)
+
+    @x.setter
+    def x(self, value):
+        self.x_hundredths = to_hundredths(value)
+
+    @property
+    def y(self):
+        return hundredths_to_decimal(self.y_hundredths)
 
+    @y.setter
+    def y(self, value):
+        self.y_hundredths = to_hundredths(value)
 
     def __repr__(self):
         out = "<{0}".format(self.footprint)
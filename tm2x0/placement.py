@@ -1,15 +1,35 @@
 from operator import attrgetter
 
+from tm2x0.fixedpoint import to_hundredths, hundredths_to_decimal
 from tm2x0.instructions import PlacementInstructions, OriginOffsetInstruction, PanelizedBoardInstruction, \
     StackOffsetInstruction, FeedSpacingInstruction, PartPlacementInstruction
 from tm2x0.partplacement import PartPlacement
 from tm2x0.reel import Reel
 import logging
 
+# Reel settings, by the instructions they end up in.
+STACK_OFFSET_ATTRIBUTES = frozenset(["stack_x_offset", "stack_y_offset", "comment"])
+FEED_SPACING_ATTRIBUTES = frozenset(["feed_spacing"])
+PART_ROW_ATTRIBUTES = frozenset(["height", "rotation"])
+REEL_ATTRIBUTES = sorted(STACK_OFFSET_ATTRIBUTES | FEED_SPACING_ATTRIBUTES | PART_ROW_ATTRIBUTES | set(["head"]))
+# Part settings that go into its row, by the names set_part_attribute knows them by.
+PART_ATTRIBUTES = (("x", "x_hundredths"), ("y", "y_hundredths"), ("rotation", "rotation"), ("head", "head"),
+                   ("reference", "reference"), ("reel", "reel"))
+_part_settings = attrgetter(*[attribute for _, attribute in PART_ATTRIBUTES])
+# With debug logging on, generating instructions logs its progress every this many parts.
+PROGRESS_INTERVAL = 10000
+
 
 class Placement():
     """A Placement is a combination of Reels and Parts().  It also has panelization and
-    a global offset."""
+    a global offset.
+
+    Panelization is either a list of copy offsets, or a PanelLayout in panel, which takes the
+    place of copies.  If expand_panel is set, the panel's copies are written out as parts
+    instead of being left to the machine.
+
+    generate_instructions remembers what the placement looked like, so that update_instructions
+    can later rewrite just the rows affected by whatever has changed since, however it was changed."""
 
     def __init__(self,
                  parts=None,
@@ -17,6 +37,8 @@ class Placement():
                  copies=None,
                  offset_x=0,
                  offset_y=0,
+                 panel=None,
+                 expand_panel=False,
     ):
 
         if parts is None:
@@ -37,6 +59,27 @@ class Placement():
         else:
             self.copies = copies
 
+        self.panel = panel
+        self.expand_panel = expand_panel
+
+        # The part on each part placement row of the last instructions generated, by part number - 1.
+        self.generated_parts = None
+        # What the placement looked like when generate_instructions last ran, for update_instructions.
+        self._snapshot = None
+
+    def set_reel_attribute(self, reel_number, attribute, value):
+        """Changes a reel setting, like stack_x_offset or height."""
+        if attribute == "rotation":
+            value = int(value) if value else 0
+        setattr(self.reels[reel_number], attribute, value)
+
+    def set_part_attribute(self, part, attribute, value):
+        """Changes a part's x, y, rotation or head.  Use assign_part_to_reel to move a part to
+        another reel."""
+        if attribute == "reel":
+            raise ValueError("Use assign_part_to_reel and unassign_part_from_reel to move parts between reels")
+        setattr(part, attribute, value)
+
     def get_reel_for_part(self, part):
         return self.reels[part.reel]
 
@@ -53,97 +96,268 @@ class Placement():
 
         out.copies = instructions.get_copies()
 
+        # Rows are read in hundredths of a millimetre; a height is only made a Decimal once.
+        decimal_heights = {}
+        part_heights = {}
         for instruction in instructions:
             if isinstance(instruction, StackOffsetInstruction):
                 if instruction.stack not in out.reels:
                     out.reels[instruction.stack] = Reel(instruction.stack)
                 out.reels[instruction.stack].stack_x_offset = instruction.x
                 out.reels[instruction.stack].stack_y_offset = instruction.y
+                if instruction.comment:
+                    out.reels[instruction.stack].comment = instruction.comment
             elif isinstance(instruction, FeedSpacingInstruction):
                 if instruction.stack not in out.reels:
                     out.reels[instruction.stack] = Reel(instruction.stack)
                 out.reels[instruction.stack].feed_spacing = instruction.feed_spacing
             elif isinstance(instruction, PartPlacementInstruction):
                 if not instruction.skip:
-                    p = PartPlacement(rotation=instruction.rotation,
-                                      height=instruction.height,
-                                      x=instruction.x,
-                                      y=instruction.y,
-                                      reference=instruction.reference,
-                                      comment=instruction.comment,
-                                      reel=instruction.stack,
-                                      head=instruction.pickup_head
+                    height = instruction.height_hundredths
+                    if height not in decimal_heights:
+                        decimal_heights[height] = hundredths_to_decimal(height)
+                    p = PartPlacement.from_hundredths(rotation=instruction.rotation,
+                                                      height=decimal_heights[height],
+                                                      x=instruction.x_hundredths,
+                                                      y=instruction.y_hundredths,
+                                                      reference=instruction.reference,
+                                                      comment=instruction.comment,
+                                                      reel=instruction.stack,
+                                                      head=instruction.pickup_head
                     )
-
-                if p.reel not in out.parts:
-                    out.parts[p.reel] = []
-                out.assign_part_to_reel(p, p.reel)
-                if p.reel not in out.reels:
-                    out.reels[instruction.stack] = Reel(instruction.stack)
+                    out.assign_part_to_reel(p, p.reel)
+                    part_heights.setdefault(p.reel, set()).add(height)
 
         # check heights
-        part_heights = {}
-        for reel_number, part_list in out.parts.items():
-            for part in part_list:
-                if part.reel not in part_heights:
-                    part_heights[reel_number] = set()
-                part_heights[reel_number].add(part.height)
-
         for reel_number, heights in part_heights.items():
             if len(heights) > 1:
                 logging.warning("Multiple heights assigned to different parts for Reel {0}".format(reel_number))
             else:
-                out.reels[reel_number].height = heights[0]
+                out.reels[reel_number].height = decimal_heights[heights.pop()]
 
         return out
 
     def get_parts_sorted_by_reference(self, reel_number):
         return sorted(self.parts[reel_number], key=attrgetter("reference"))
 
-    def generate_instructions(self):
-        logging.info("Generating instructions.")
+    def generate_instructions(self, optimizer=None, scheduler=None):
         instructions = PlacementInstructions()
-        logging.info("Adding offset instruction.")
-        instructions.instructions.append(OriginOffsetInstruction(x=self.offset_x,
-                                                                 y=self.offset_y))
+        instructions.instructions.extend(self.iter_instructions(optimizer=optimizer, scheduler=scheduler))
+        self._snapshot = _Snapshot(self, instructions, self.generated_parts)
+        return instructions
+
+    def _layout(self):
+        """Everything but the reel and part settings: changing any of it means generating again."""
+        return (str(self.offset_x), str(self.offset_y), [(str(x), str(y)) for x, y in self.copies],
+                self.panel.signature() if self.panel is not None else None, self.expand_panel,
+                [(reel_number, self.reels[reel_number].reel_number) for reel_number in sorted(self.reels)],
+                [(reel_number, map(id, self.parts[reel_number])) for reel_number in sorted(self.parts)])
+
+    def _changes(self, instructions):
+        """The (reel attributes by reel number, part attributes by part) changed since instructions
+        were generated, or None if they weren't the last generated or the changes can't be worked out."""
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.instructions is not instructions or snapshot.layout != self._layout():
+            return None
+        dirty_reels = {}
+        for reel_number, settings in snapshot.reels.items():
+            changed = _changed(REEL_ATTRIBUTES, settings, _reel_settings(self.reels[reel_number]))
+            if changed:
+                dirty_reels[reel_number] = changed
+        dirty_parts = {}
+        names = [name for name, _ in PART_ATTRIBUTES]
+        for part, settings in snapshot.parts:
+            current = _part_settings(part)
+            if current != settings:
+                dirty_parts[part] = _changed(names, settings, current)
+        if any("reel" in attributes for attributes in dirty_parts.values()):
+            return None
+        return dirty_reels, dirty_parts
+
+    def _needs_regeneration(self, changes, optimizer, scheduler):
+        """Whether changes, from _changes, can move rows around, rather than just changing what's in them."""
+        if changes is None:
+            return True
+        dirty_reels, dirty_parts = changes
+        for attributes in dirty_reels.values():
+            # The scheduler pairs parts up by height and head, and the optimizer layers them by height.
+            if scheduler is not None and attributes & set(["head", "height"]):
+                return True
+            if optimizer is not None and "height" in attributes:
+                return True
+        if dirty_parts:
+            if self.panel is not None and self.expand_panel:
+                # The rows belong to copies of the parts, not the parts themselves.
+                return True
+            for attributes in dirty_parts.values():
+                if scheduler is not None and "head" in attributes:
+                    return True
+                if optimizer is not None and attributes & set(["x", "y"]):
+                    return True
+        return False
+
+    def update_instructions(self, instructions, optimizer=None, scheduler=None):
+        """Brings instructions, the ones generate_instructions last returned for this placement, with
+        the same optimizer and scheduler, up to date with whatever has changed since.  Only the
+        stack offset, feed spacing and part placement rows those changes affect are rewritten.
+
+        Changes that can reorder the parts, like assigning parts to reels, or changing heights
+        when an optimizer or scheduler is used, mean generating everything again, as do any
+        instructions but the last ones generated.  Returns the up to date instructions:
+        instructions itself, or new ones if everything was regenerated."""
+        changes = self._changes(instructions)
+        if self._needs_regeneration(changes, optimizer, scheduler):
+            logging.info("Regenerating all instructions.")
+            return self.generate_instructions(optimizer=optimizer, scheduler=scheduler)
+
+        dirty_reels, dirty_parts = changes
+        stack_reels = set(n for n, attributes in dirty_reels.items() if attributes & STACK_OFFSET_ATTRIBUTES)
+        feed_reels = set(n for n, attributes in dirty_reels.items() if attributes & FEED_SPACING_ATTRIBUTES)
+        part_reels = set(n for n, attributes in dirty_reels.items() if attributes & PART_ROW_ATTRIBUTES)
+        generated_parts = self._snapshot.generated_parts
+        heights = {}
+        rows = instructions.instructions
+        updated = 0
+        for position, instruction in enumerate(rows):
+            if isinstance(instruction, PartPlacementInstruction):
+                part = generated_parts[instruction.part_number - 1]
+                part_attributes = dirty_parts.get(part)
+                if part.reel in part_reels or part_attributes:
+                    head = instruction.pickup_head
+                    if part_attributes and "head" in part_attributes:
+                        head = part.head
+                    if part.reel not in heights:
+                        heights[part.reel] = to_hundredths(self.reels[part.reel].height)
+                    rows[position] = self._part_instruction(instruction.part_number, part, head, heights[part.reel])
+                    updated += 1
+            elif isinstance(instruction, StackOffsetInstruction) and instruction.stack in stack_reels:
+                rows[position] = self._stack_offset_instruction(self.reels[instruction.stack])
+                updated += 1
+            elif isinstance(instruction, FeedSpacingInstruction) and instruction.stack in feed_reels:
+                rows[position] = self._feed_spacing_instruction(self.reels[instruction.stack])
+                updated += 1
+        logging.info("Updated %d of %d instructions.", updated, len(rows))
+        self._snapshot.update(self, dirty_parts)
+        return instructions
+
+    def _stack_offset_instruction(self, reel):
+        return StackOffsetInstruction(stack=reel.reel_number,
+                                      x=reel.stack_x_offset,
+                                      y=reel.stack_y_offset,
+                                      comment=reel.comment)
+
+    def _feed_spacing_instruction(self, reel):
+        return FeedSpacingInstruction(stack=reel.reel_number,
+                                      feed_spacing=reel.feed_spacing)
 
-        for x_offset, y_offset in self.copies:
-            logging.info("Adding copy at ({0}, {1})".format(x_offset, y_offset))
-            instructions.instructions.append(PanelizedBoardInstruction(x=x_offset,
-                                                                       y=y_offset))
+    def _part_instruction(self, part_number, part, head, height):
+        """height is the reel's height, already in hundredths of a millimetre."""
+        return PartPlacementInstruction.from_hundredths(part_number=part_number,
+                                                        pickup_head=head,
+                                                        rotation=part.rotation + self.reels[part.reel].rotation,
+                                                        stack=part.reel,
+                                                        x=part.x_hundredths,
+                                                        y=part.y_hundredths,
+                                                        height=height,
+                                                        reference=part.reference)
 
+    def iter_instructions(self, optimizer=None, scheduler=None):
+        """Yields the machine instructions for this placement one at a time, in the
+        same order as generate_instructions, without building the whole list.
+
+        Parts are placed reel by reel unless an optimizer, like a PlacementOrderOptimizer,
+        is given to reorder them.  Each part's own head is used unless a scheduler, like a
+        DualHeadScheduler, is given to assign heads."""
+        logging.info("Generating instructions.")
+        debug = logging.getLogger().isEnabledFor(logging.DEBUG)
+        yield OriginOffsetInstruction(x=self.offset_x,
+                                      y=self.offset_y)
+
+        if self.panel is None:
+            if self.copies:
+                logging.info("Adding %d copies.", len(self.copies))
+            for x_offset, y_offset in self.copies:
+                yield PanelizedBoardInstruction(x=x_offset,
+                                                y=y_offset)
+        elif not self.expand_panel:
+            logging.info("Adding %d panel copies.", len(self.panel))
+            for instruction in self.panel.to_instructions():
+                yield instruction
+
+        logging.info("Setting up %d reels.", len(self.reels))
         for reel_number in sorted(self.reels.keys()):
             reel = self.reels[reel_number]
-            logging.info("Setting stack offset for Reel {0}".format(reel_number))
-            instructions.instructions.append(StackOffsetInstruction(stack=reel.reel_number,
-                                                                    x=reel.stack_x_offset,
-                                                                    y=reel.stack_y_offset,
-                                                                    comment=reel.comment))
-            logging.info("Setting feed spacing for Reel {0}".format(reel_number))
-            instructions.instructions.append(FeedSpacingInstruction(stack=reel.reel_number,
-                                                                    feed_spacing=reel.feed_spacing))
-
-        logging.info("Collecting all parts.")
+            yield self._stack_offset_instruction(reel)
+            yield self._feed_spacing_instruction(reel)
+
         all_parts = []
         for reel_number in sorted(self.parts.keys()):
-            for part in self.parts[reel_number]:
-                if part.reel != reel_number:
-                    logging.warning("Part reel number doesn't match the Reel reel number.")
-                all_parts.append(part)
-
-        for index, part in enumerate(all_parts):
-            logging.info("Processing Part {0}".format(part.reference))
-            total_rotation = part.rotation + self.get_reel_for_part(part).rotation
-            instructions.instructions.append(PartPlacementInstruction(part_number=index+1,
-                                                                      pickup_head=part.head,
-                                                                      rotation=total_rotation,
-                                                                      stack=part.reel,
-                                                                      x=part.x,
-                                                                      y=part.y,
-                                                                      height=self.get_reel_for_part(part).height))
-        return instructions
+            mismatched = sum(1 for part in self.parts[reel_number] if part.reel != reel_number)
+            if mismatched:
+                logging.warning("%d parts on Reel %d have a different reel number.", mismatched, reel_number)
+            if self.panel is not None and self.expand_panel:
+                # Each reel's parts go down across the whole panel before moving on to the next reel.
+                all_parts.extend(self.panel.expand(self.parts[reel_number]))
+            else:
+                all_parts.extend(self.parts[reel_number])
+            if debug:
+                logging.debug("Reel %d has %d parts.", reel_number, len(self.parts[reel_number]))
+
+        if optimizer is not None:
+            logging.info("Optimizing placement order.")
+            all_parts = optimizer.optimize(all_parts, self.reels)
+            logging.info("Optimized head travel from %.1f mm to %.1f mm.",
+                         optimizer.initial_distance, optimizer.final_distance)
+
+        if scheduler is not None:
+            scheduled = scheduler.schedule(all_parts, self.reels)
+            logging.info("Scheduled both heads, saving %d trips to the feeders.", scheduler.saved_trips)
+        else:
+            scheduled = [(part, part.head) for part in all_parts]
+
+        self.generated_parts = [part for part, _ in scheduled]
+
+        logging.info("Placing %d parts.", len(scheduled))
+        # Reel heights are converted once per reel rather than once per part.
+        heights = {}
+        for index, (part, head) in enumerate(scheduled):
+            if debug and index and not index % PROGRESS_INTERVAL:
+                logging.debug("Placed %d of %d parts.", index, len(scheduled))
+            if part.reel not in heights:
+                heights[part.reel] = to_hundredths(self.get_reel_for_part(part).height)
+            yield self._part_instruction(index + 1, part, head, heights[part.reel])
 
 
+    def apply_library(self, library, overwrite=False):
+        """Fills in the settings of every reel with parts from library, a ReelLibrary, going by the
+        reel's first part.  Returns the reel numbers the library had settings for."""
+        configured = []
+        for reel_number in sorted(self.parts.keys()):
+            parts = self.parts[reel_number]
+            if parts and library.configure(self.reels[reel_number], parts[0], overwrite=overwrite):
+                configured.append(reel_number)
+        return configured
+
+    def renumber_reels(self, mapping):
+        """Moves reels to new numbers, given a dict of old reel number to new.  Reels not in mapping
+        keep their numbers.  The reels, their parts and the parts' reel numbers all change together."""
+        numbers = set(self.reels.keys()) | set(self.parts.keys())
+        renumbered = [mapping.get(reel_number, reel_number) for reel_number in numbers]
+        if len(set(renumbered)) != len(renumbered):
+            raise ValueError("Renumbering would put two reels on the same number")
+        reels = {}
+        for reel_number, reel in self.reels.items():
+            reel.reel_number = mapping.get(reel_number, reel_number)
+            reels[reel.reel_number] = reel
+        parts = {}
+        for reel_number, reel_parts in self.parts.items():
+            new_number = mapping.get(reel_number, reel_number)
+            for part in reel_parts:
+                part.reel = new_number
+            parts[new_number] = reel_parts
+        self.reels = reels
+        self.parts = parts
+
     def clear_parts(self):
         self.parts = {}
 
@@ -158,4 +372,32 @@ class Placement():
         if reel_number not in self.parts:
             self.parts[reel_number] = [part]
         else:
-            self.parts[reel_number].append(part)
\ No newline at end of file
+            self.parts[reel_number].append(part)
+
+
+def _reel_settings(reel):
+    return tuple(str(getattr(reel, attribute)) for attribute in REEL_ATTRIBUTES)
+
+
+def _changed(names, before, after):
+    return set(name for name, old, new in zip(names, before, after) if old != new)
+
+
+class _Snapshot():
+    """The reel and part settings of a placement when instructions were generated from it, so
+    changes made since can be found by comparing, whether or not they went through Placement."""
+
+    def __init__(self, placement, instructions, generated_parts):
+        self.instructions = instructions
+        self.generated_parts = generated_parts
+        self.layout = placement._layout()
+        self.reels = dict((reel_number, _reel_settings(reel)) for reel_number, reel in placement.reels.items())
+        self.parts = [(part, _part_settings(part)) for parts in placement.parts.values() for part in parts]
+
+    def update(self, placement, dirty_parts):
+        """Catches up with the placement once the instructions have been updated, when only the
+        settings of the reels and of the parts in dirty_parts have changed."""
+        self.reels = dict((reel_number, _reel_settings(reel)) for reel_number, reel in placement.reels.items())
+        if dirty_parts:
+            self.parts = [(part, _part_settings(part) if part in dirty_parts else settings)
+                          for part, settings in self.parts]
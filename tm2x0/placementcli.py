@@ -1,3 +1,10 @@
+from tm2x0 import profiling
+from tm2x0.assignment import ReelAssigner
+from tm2x0.cache import placement_signature
+from tm2x0.feeders import FeederLayoutOptimizer
+from tm2x0.instructions import replace_file, write_csv
+
+from StringIO import StringIO
 import logging
 from operator import attrgetter
 import traceback
@@ -57,10 +64,28 @@ class PlacementCLI():
     def __init__(self,
                  placement,
                  unassigned_parts=None,
-                 output_filename=None):
+                 output_filename=None,
+                 optimizer=None,
+                 scheduler=None,
+                 assigner=None,
+                 library=None,
+                 cache=None,
+                 cache_context=()):
         self.placement = placement
         self.unassigned_parts = unassigned_parts
         self.output_filename = output_filename
+        self.optimizer = optimizer
+        self.scheduler = scheduler
+        if assigner is None:
+            assigner = ReelAssigner()
+        self.assigner = assigner
+        self.library = library
+        # A JobCache, and strings describing everything about the job that isn't in the placement,
+        # like the .pos file and the options.
+        self.cache = cache
+        self.cache_context = cache_context
+        # Instructions from the last preview or export, so the next one only has to update them.
+        self.instructions = None
 
     def print_reels(self):
         out = []
@@ -99,6 +124,7 @@ class PlacementCLI():
 
         self.placement.assign_part_to_reel(part, reel_index)
         del self.unassigned_parts[part_index]
+        self.configure_reels_from_library()
 
 
     def assign_parts_to_reels(self):
@@ -109,6 +135,40 @@ class PlacementCLI():
         if not self.unassigned_parts:
             print "All parts have been assigned to reels."
 
+    def auto_assign_parts_to_reels(self):
+        print "Automatically Assigning Parts to Reels:"
+        self.unassigned_parts[:] = self.assigner.assign(self.placement, self.unassigned_parts)
+        print self.print_reels()
+        self.configure_reels_from_library()
+        if not self.unassigned_parts:
+            print "All parts have been assigned to reels."
+        else:
+            print "There weren't enough reels for {0} parts.".format(len(self.unassigned_parts))
+
+
+    def configure_reels_from_library(self):
+        """Fills in any unset reel settings from the library, if there is one."""
+        if self.library is None:
+            return
+        configured = self.placement.apply_library(self.library)
+        if configured:
+            print "Reel settings from the library: Reels {0}".format(", ".join(str(n) for n in configured))
+
+    def save_reels_to_library(self):
+        learned = self.library.learn(self.placement)
+        print "Saved {0} reels to the library.".format(learned)
+
+    def arrange_reels(self):
+        """Moves the busiest reels to the stacks closest to their parts."""
+        optimizer = FeederLayoutOptimizer()
+        mapping = optimizer.arrange(self.placement)
+        if not mapping:
+            print "The reels are already arranged as well as they can be."
+            return
+        for old, new in sorted(mapping.items()):
+            print "\tReel {0} moves to Reel {1}".format(old, new)
+        print "This cuts travel from the feeders from {0:.0f} mm to {1:.0f} mm.".format(optimizer.initial_travel,
+                                                                                 optimizer.final_travel)
 
     def run(self):
         while True:
@@ -119,16 +179,21 @@ class PlacementCLI():
                 for part in self.unassigned_parts:
                     print "\t{0} ({1})".format(part, part.reference)
                 choices.append(("Assign Parts to Reels", self.assign_parts_to_reels))
+                choices.append(("Automatically Assign Parts to Reels", self.auto_assign_parts_to_reels))
 
             if self.placement.reels:
                 print "Reels:"
                 for reel_number in self.placement.reels:
                     print "\tReel {0}".format(reel_number)
                 choices.append(("Configure Reels", self.configure_reels))
+                choices.append(("Arrange Reels by Usage", self.arrange_reels))
+                if self.library is not None:
+                    choices.append(("Save Reels to Library", self.save_reels_to_library))
             if not choices:
                 print "Without parts to assign or reels to configure, we can't really do anything!"
                 return
             else:
+                choices.append(("Preview Instructions", self.preview))
                 choices.append(("Save to file", self.export))
             choice = choose("Choose an option:",
                             '? ',
@@ -151,11 +216,11 @@ class PlacementCLI():
             return
         else:
             for attr, val in AUTOSET[footprint_choice]:
-                reel.__dict__[attr] = val
+                self.placement.set_reel_attribute(reel_number, attr, val)
 
         if reel.reel_number == 0:
             print "Because this is on Reel 0 (the tray), the feed spacing has been autoset to 18 mm."
-            reel.feed_spacing = 18
+            self.placement.set_reel_attribute(reel_number, "feed_spacing", 18)
 
 
     def describe_reel_configuration(self, reel):
@@ -167,6 +232,7 @@ class PlacementCLI():
         out.append("\tPart Height (mm): {0}".format(reel.height))
         out.append("\tExtra Rotation (degrees, positive is counter-clockwise): {0}".format(reel.rotation))
         out.append("\tComment: {0}".format(reel.comment))
+        out.append("\tPickup Head: {0}".format(reel.head if reel.head else "Either"))
         parts = ", ".join(
             [part.reference for part in self.placement.get_parts_sorted_by_reference(reel.reel_number)])
         if not parts:
@@ -212,7 +278,8 @@ class PlacementCLI():
                            ("Part Y Offset", "stack_y_offset"),
                            ("Height", "height"),
                            ("Rotation", "rotation"),
-                           ("Comment", "comment")]
+                           ("Comment", "comment"),
+                           ("Pickup Head", "head")]
                 if self.placement.parts[reel_to_configure.reel_number]:
                     choices.append(("Unassign a Part", "remove_parts"))
                 choices.append(("Back", "back"))
@@ -237,28 +304,81 @@ class PlacementCLI():
                     else:
                         self.placement.unassign_part_from_reel(part, reel_to_configure.reel_number)
                         self.unassigned_parts.append(part)
+                elif choice == "head":
+                    self.placement.set_reel_attribute(reel_to_configure.reel_number, "head", get_input(
+                        "Which head should pick up these parts? [1, 2, or blank for either] ", ["1", "2", ""]))
                 else:
-                    self.placement.reels[reel_to_configure.reel_number].__dict__[choice] = raw_input(
-                        "Enter the new value: ")
+                    try:
+                        self.placement.set_reel_attribute(reel_to_configure.reel_number, choice,
+                                                          raw_input("Enter the new value: "))
+                    except ValueError:
+                        print "That isn't a whole number of degrees."
 
     def export(self):
-        try:
-            output = self.placement.generate_instructions().to_csv()
-        except Exception, e:
-            logging.error("Error while creating instructions from configuration.")
-            print traceback.print_exc(file=sys.stdout)
-            return False
-
         if self.output_filename:
             try:
-                with open(self.output_filename, 'w') as f:
-                    f.write(output)
-                    return True
-            except:
+                # A failed export leaves the last good file alone.
+                return replace_file(self.output_filename, self._write_instructions)
+            except (IOError, OSError):
                 print "There was an error writing the output file."
                 print "Because there was an error, you may want to verify this."
-                print output
+                self._write_instructions(sys.stdout)
+                print
                 return False
         else:
-            print output
-            return True
\ No newline at end of file
+            written = self._write_instructions(sys.stdout)
+            print
+            return written
+
+    def preview(self):
+        """Prints what the instructions will do, without saving them.  They're kept, so changing
+        a reel and previewing or saving again only has to update them."""
+        try:
+            instructions = self._current_instructions()
+        except Exception:
+            logging.error("Error while creating instructions from configuration.")
+            traceback.print_exc(file=sys.stdout)
+            return False
+        for line in instructions.describe():
+            print line
+        return True
+
+    def _current_instructions(self):
+        """Instructions for the placement as it is now.  Instructions kept from an earlier preview
+        or export are updated; otherwise they're generated.  Either way they're kept for next time."""
+        with profiling.stage("generate"):
+            if self.instructions is None:
+                self.instructions = self.placement.generate_instructions(optimizer=self.optimizer,
+                                                                         scheduler=self.scheduler)
+            else:
+                self.instructions = self.placement.update_instructions(self.instructions,
+                                                                       optimizer=self.optimizer,
+                                                                       scheduler=self.scheduler)
+        return self.instructions
+
+    def _write_instructions(self, f):
+        """Writes the instructions to f, keeping them for the next export.  With a cache, they're
+        read back from the cache if this job was done before, and stored in it otherwise."""
+        try:
+            if self.cache is None:
+                instructions = self._current_instructions()
+                with profiling.stage("csv_export"):
+                    write_csv(f, instructions)
+                return True
+            key = self.cache.key(*(list(self.cache_context) + [placement_signature(self.placement)]))
+            csv = self.cache.get(key)
+            if csv is None:
+                instructions = self._current_instructions()
+                with profiling.stage("csv_export"):
+                    buffer = StringIO()
+                    write_csv(buffer, instructions)
+                    csv = buffer.getvalue()
+                self.cache.put(key, csv)
+            f.write(csv)
+        except IOError:
+            raise
+        except Exception, e:
+            logging.error("Error while creating instructions from configuration.")
+            print traceback.print_exc(file=sys.stdout)
+            return False
+        return True
@@ -0,0 +1,154 @@
+"""Timers and counters for the stages of a conversion.
+
+Code marks its stages with
+
+    with profiling.stage("kicad_parse"):
+        ...
+
+and counts things with profiling.count("parts", n).  Until enable() is called, both do nothing
+but return, so they can be left in the pipeline.  Time spent in a stage nested inside another
+is only counted against the inner one, so the stages add up to the time they cover.  iterate()
+times a generator one item at a time, for stages like generating instructions that are consumed
+by another stage as they're produced."""
+
+import time
+
+
+class _NullStage():
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage():
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler._push(self.name)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler._pop(self.name)
+        return False
+
+
+class Profiler():
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        # Stage name to [seconds, calls].  The seconds don't include nested stages.
+        self.stages = {}
+        self.counters = {}
+        # For each open stage, [start time, seconds spent in the stages nested in it].
+        self._open = []
+        # Stage names in the order they first started.
+        self._order = []
+
+    def stage(self, name):
+        return _Stage(self, name)
+
+    def _push(self, name):
+        if name not in self.stages:
+            self.stages[name] = [0.0, 0]
+            self._order.append(name)
+        self._open.append([self.clock(), 0.0])
+
+    def _pop(self, name):
+        start, nested = self._open.pop()
+        elapsed = self.clock() - start
+        if self._open:
+            self._open[-1][1] += elapsed
+        self.add(name, elapsed - nested)
+
+    def add(self, name, seconds, calls=1):
+        if name not in self.stages:
+            self.stages[name] = [0.0, 0]
+            self._order.append(name)
+        self.stages[name][0] += seconds
+        self.stages[name][1] += calls
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def iterate(self, name, iterable):
+        """Yields from iterable, counting the time spent getting each item as the stage name."""
+        iterator = iter(iterable)
+        while True:
+            self._push(name)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self._pop(name)
+                return
+            except:
+                self._pop(name)
+                raise
+            self._pop(name)
+            yield item
+
+    def merge(self, data):
+        """Adds in the stages and counters from another profiler's data(), like one from a worker process."""
+        for name, (seconds, calls) in data["stages"]:
+            self.add(name, seconds, calls)
+        for name, n in data["counters"].items():
+            self.count(name, n)
+
+    def data(self):
+        """The stages, in the order they first started, and counters, as plain data that can be pickled."""
+        return {"stages": [(name, tuple(self.stages[name])) for name in self._order],
+                "counters": dict(self.counters)}
+
+    def report(self):
+        total = sum(seconds for seconds, _ in self.stages.values())
+        out = ["Stage                     Seconds      %    Calls"]
+        for name in self._order:
+            seconds, calls = self.stages[name]
+            out.append("{0:<24} {1:>8.3f} {2:>6.1f} {3:>8}".format(
+                name, seconds, 100.0 * seconds / total if total else 0, calls))
+        out.append("{0:<24} {1:>8.3f}".format("total", total))
+        for name in sorted(self.counters):
+            out.append("{0:<24} {1:>8}".format(name, self.counters[name]))
+        return "\n".join(out)
+
+
+_profiler = None
+
+
+def enable():
+    """Starts collecting timings, and returns the Profiler they go to."""
+    global _profiler
+    _profiler = Profiler()
+    return _profiler
+
+
+def disable():
+    global _profiler
+    _profiler = None
+
+
+def current():
+    """The Profiler collecting timings, or None if profiling isn't enabled."""
+    return _profiler
+
+
+def stage(name):
+    if _profiler is None:
+        return _NULL_STAGE
+    return _profiler.stage(name)
+
+
+def count(name, n=1):
+    if _profiler is not None:
+        _profiler.count(name, n)
+
+
+def iterate(name, iterable):
+    if _profiler is None:
+        return iterable
+    return _profiler.iterate(name, iterable)
@@ -6,7 +6,8 @@ class Reel():
                  feed_spacing=None,
                  height=0,
                  comment=None,
-                 rotation=0):
+                 rotation=0,
+                 head=None):
         self.reel_number = reel_number
         self.stack_x_offset = stack_x_offset
         self.stack_y_offset = stack_y_offset
@@ -14,6 +15,8 @@ class Reel():
         self.height = height
         self.comment = comment
         self.rotation = rotation
+        # None means either pickup head can be used.
+        self.head = head
 
     def __repr__(self):
         return "<Reel {0}>".format(self.reel_number)
\ No newline at end of file
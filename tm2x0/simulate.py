@@ -0,0 +1,184 @@
+"""Estimating how long a job will take on the machine.
+
+Every trip goes from wherever the head is to the feeder, picks up, goes to the board, rotates
+the part and places it.  When a head 1 row is followed by a head 2 row, both parts are picked
+up on the same trip before either is placed.  Each axis accelerates at a constant rate up to
+its top speed, the axes move at the same time, and rotation and nozzle moves happen after
+the head has stopped.
+
+CycleTimeModel does the slow part, pulling rows out of the instructions, once, so that
+evaluating different placement orders is quick enough to use inside an optimizer."""
+
+from math import sqrt
+
+from tm2x0.instructions import PartPlacementInstruction, SpeedInstruction, PlacementInstructions
+from tm2x0.machine import MachineProfile
+
+
+class CycleTime():
+    """Seconds spent on one board, split up by what the machine was doing, and for the whole panel."""
+
+    def __init__(self, travel=0.0, rotation=0.0, pick=0.0, boards=1, trips=0):
+        self.travel = travel
+        self.rotation = rotation
+        self.pick = pick
+        self.boards = boards
+        self.trips = trips
+
+    @property
+    def board(self):
+        return self.travel + self.rotation + self.pick
+
+    @property
+    def panel(self):
+        return self.board * self.boards
+
+    def describe(self):
+        return ["Travel: {0:.1f} s".format(self.travel),
+                "Rotation: {0:.1f} s".format(self.rotation),
+                "Pick and place: {0:.1f} s".format(self.pick),
+                "Per board: {0:.1f} s in {1} trips to the feeders".format(self.board, self.trips),
+                "Per panel of {0} boards: {1:.1f} s".format(self.boards, self.panel)]
+
+
+def move_time(dx, dy, speed, acceleration):
+    """Seconds to move by (dx, dy), with both axes moving at once."""
+    distance = float(max(abs(dx), abs(dy)))
+    speed = float(speed)
+    if distance * acceleration <= speed * speed:
+        # Never reaches top speed.
+        return 2 * sqrt(distance / acceleration)
+    return distance / speed + speed / acceleration
+
+
+class CycleTimeModel():
+    def __init__(self, instructions, profile=None):
+        """instructions is a PlacementInstructions (or anything else that iterates over instructions),
+        or a Placement, whose instructions are generated first."""
+        if profile is None:
+            profile = MachineProfile()
+        self.profile = profile
+        if not isinstance(instructions, PlacementInstructions) and hasattr(instructions, 'generate_instructions'):
+            instructions = instructions.generate_instructions()
+
+        self.feeder_x = []
+        self.feeder_y = []
+        self.place_x = []
+        self.place_y = []
+        self.heads = []
+        self.speeds = []
+        self.rotation_times = []
+        boards = 0
+        speed = 100
+        for instruction in instructions:
+            if isinstance(instruction, SpeedInstruction):
+                if instruction.speed <= 0:
+                    raise ValueError("The machine can't place parts at {0}% speed".format(instruction.speed))
+                speed = instruction.speed
+            elif isinstance(instruction, PartPlacementInstruction) and not instruction.skip:
+                feeder = profile.feeder_position(instruction.stack)
+                self.feeder_x.append(feeder[0])
+                self.feeder_y.append(feeder[1])
+                self.place_x.append(instruction.x_hundredths / 100.0)
+                self.place_y.append(instruction.y_hundredths / 100.0)
+                self.heads.append(instruction.pickup_head)
+                self.speeds.append(speed / 100.0)
+                self.rotation_times.append(abs(instruction.rotation) / float(profile.rotation_speed))
+        if hasattr(instructions, 'get_copies'):
+            boards = len(instructions.get_copies())
+        self.boards = max(boards, 1)
+
+        # Each row's speed setting turned into the constants move_time needs.
+        self.inverse_speed = []
+        self.inverse_acceleration = []
+        self.cruise_distance = []
+        self.ramp_time = []
+        for fraction in self.speeds:
+            speed = float(profile.speed) * fraction
+            acceleration = float(profile.acceleration) * fraction
+            self.inverse_speed.append(1.0 / speed)
+            self.inverse_acceleration.append(1.0 / acceleration)
+            self.cruise_distance.append(speed * speed / acceleration)
+            self.ramp_time.append(speed / acceleration)
+
+        # The feeder to board leg of a single part trip doesn't depend on the order, so work it out now.
+        self.single_leg = [self._move(i, self.feeder_x[i], self.feeder_y[i], self.place_x[i], self.place_y[i])
+                           for i in range(len(self.heads))]
+        self.pair_legs = {}
+
+    def _move(self, index, from_x, from_y, to_x, to_y):
+        """move_time, using the speed in effect for a row."""
+        distance = max(abs(to_x - from_x), abs(to_y - from_y))
+        if distance <= self.cruise_distance[index]:
+            return 2 * sqrt(distance * self.inverse_acceleration[index])
+        return distance * self.inverse_speed[index] + self.ramp_time[index]
+
+    def evaluate(self, order=None, heads=None):
+        """Returns the CycleTime for placing rows in order, a list of row indices, with the given heads.
+        By default the rows are placed as they are in the instructions, on the heads they were given."""
+        if order is None:
+            order = range(len(self.heads))
+        if heads is None:
+            heads = [self.heads[index] for index in order]
+        dwell = self.profile.pick_time + self.profile.place_time
+        feeder_x, feeder_y, place_x, place_y = self.feeder_x, self.feeder_y, self.place_x, self.place_y
+        cruise_distance, inverse_speed, inverse_acceleration, ramp_time = \
+            self.cruise_distance, self.inverse_speed, self.inverse_acceleration, self.ramp_time
+        single_leg, rotation_times, pair_legs = self.single_leg, self.rotation_times, self.pair_legs
+
+        def leg(index, dx, dy):
+            distance = max(abs(dx), abs(dy))
+            if distance <= cruise_distance[index]:
+                return 2 * sqrt(distance * inverse_acceleration[index])
+            return distance * inverse_speed[index] + ramp_time[index]
+
+        travel = 0.0
+        rotation = 0.0
+        trips = 0
+        x, y = self.profile.home
+        position = 0
+        count = len(order)
+        while position < count:
+            a = order[position]
+            trips += 1
+            if position + 1 < count and heads[position] != heads[position + 1]:
+                b = order[position + 1]
+                travel += leg(a, feeder_x[a] - x, feeder_y[a] - y)
+                pair = pair_legs.get((a, b))
+                if pair is None:
+                    # Everything after reaching the first feeder only depends on the pair, so remember it.
+                    pair = leg(b, feeder_x[b] - feeder_x[a], feeder_y[b] - feeder_y[a]) + \
+                        leg(a, place_x[a] - feeder_x[b], place_y[a] - feeder_y[b]) + \
+                        leg(b, place_x[b] - place_x[a], place_y[b] - place_y[a])
+                    pair_legs[(a, b)] = pair
+                travel += pair
+                rotation += rotation_times[a] + rotation_times[b]
+                x = place_x[b]
+                y = place_y[b]
+                position += 2
+            else:
+                # move_time, written out here since this is the bulk of the work.
+                dx = feeder_x[a] - x
+                dy = feeder_y[a] - y
+                distance = dx if dx > -dx else -dx
+                if dy > distance or -dy > distance:
+                    distance = dy if dy > -dy else -dy
+                if distance <= cruise_distance[a]:
+                    travel += 2 * sqrt(distance * inverse_acceleration[a])
+                else:
+                    travel += distance * inverse_speed[a] + ramp_time[a]
+                travel += single_leg[a]
+                rotation += rotation_times[a]
+                x = place_x[a]
+                y = place_y[a]
+                position += 1
+        return CycleTime(travel=travel,
+                         rotation=rotation,
+                         pick=dwell * count,
+                         boards=self.boards,
+                         trips=trips)
+
+
+def simulate(instructions, profile=None):
+    """Estimates the CycleTime for a PlacementInstructions or Placement."""
+    return CycleTimeModel(instructions, profile).evaluate()
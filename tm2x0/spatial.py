@@ -0,0 +1,131 @@
+"""A grid index over part positions.
+
+Points are bucketed into square cells, so finding the points in an area, the nearest point,
+or the points close to each other only looks at the cells nearby instead of every point.
+Points are kept as indices into coordinate lists, so the same index works for parts in
+hundredths of a millimetre and for the optimizer's floats in millimetres."""
+
+from math import ceil, hypot
+
+
+class GridIndex():
+    """Indexes the points (xs[i], ys[i]) for each i in indices, all of them if indices is None.
+
+    cell is the side of a cell, in the units of the coordinates.  By default it's picked to put
+    a couple of points in each cell, or, when the points are all in a line and cover no area, so
+    the grid is as many cells along its longer side as there are across a square one."""
+
+    def __init__(self, xs, ys, indices=None, cell=None):
+        if indices is None:
+            indices = range(len(xs))
+        self.xs = xs
+        self.ys = ys
+        if indices:
+            self.min_x = min(xs[i] for i in indices)
+            self.min_y = min(ys[i] for i in indices)
+            max_x = max(xs[i] for i in indices)
+            max_y = max(ys[i] for i in indices)
+        else:
+            self.min_x = self.min_y = max_x = max_y = 0
+        if cell is None:
+            count = max(len(indices), 1)
+            width, height = max_x - self.min_x, max_y - self.min_y
+            cell = max((width * height * 2.0 / count) ** 0.5, max(width, height) / count ** 0.5, 1.0)
+        self.cell = cell
+        self.cells = {}
+        self.count = 0
+        # The furthest cell from the origin cell in either direction, which bounds the nearest() search.
+        self.span = 0
+        for i in indices:
+            self.insert(i)
+
+    @classmethod
+    def from_parts(cls, parts, cell=None):
+        """Indexes PartPlacements by position, in hundredths of a millimetre.  Indices are into parts."""
+        out = cls([part.x_hundredths for part in parts], [part.y_hundredths for part in parts], cell=cell)
+        out.parts = parts
+        return out
+
+    def __len__(self):
+        return self.count
+
+    def _key(self, x, y):
+        return int((x - self.min_x) // self.cell), int((y - self.min_y) // self.cell)
+
+    def insert(self, i):
+        key = self._key(self.xs[i], self.ys[i])
+        self.cells.setdefault(key, set()).add(i)
+        self.count += 1
+        self.span = max(self.span, abs(key[0]), abs(key[1]))
+
+    def remove(self, i):
+        key = self._key(self.xs[i], self.ys[i])
+        self.cells[key].discard(i)
+        if not self.cells[key]:
+            del self.cells[key]
+        self.count -= 1
+
+    def _cells_between(self, min_key, max_key):
+        """The occupied cells with keys between min_key and max_key, inclusive."""
+        columns = max_key[0] - min_key[0] + 1
+        rows = max_key[1] - min_key[1] + 1
+        if columns * rows > len(self.cells):
+            return [points for (gx, gy), points in self.cells.items()
+                    if min_key[0] <= gx <= max_key[0] and min_key[1] <= gy <= max_key[1]]
+        out = []
+        for gx in range(min_key[0], max_key[0] + 1):
+            for gy in range(min_key[1], max_key[1] + 1):
+                points = self.cells.get((gx, gy))
+                if points:
+                    out.append(points)
+        return out
+
+    def within(self, min_x, min_y, max_x, max_y):
+        """Sorted indices of the points in the rectangle, edges included."""
+        out = []
+        for points in self._cells_between(self._key(min_x, min_y), self._key(max_x, max_y)):
+            for i in points:
+                if min_x <= self.xs[i] <= max_x and min_y <= self.ys[i] <= max_y:
+                    out.append(i)
+        return sorted(out)
+
+    def within_distance(self, x, y, distance):
+        """Sorted indices of the points no further than distance from (x, y)."""
+        return [i for i in self.within(x - distance, y - distance, x + distance, y + distance)
+                if hypot(self.xs[i] - x, self.ys[i] - y) <= distance]
+
+    def nearest(self, x, y):
+        """Returns (distance, index) of the nearest point, or None if there aren't any."""
+        if not self.count:
+            return None
+        cx, cy = self._key(x, y)
+        best = None
+        ring = 0
+        limit = self.span + max(abs(cx), abs(cy)) + 1
+        while ring <= limit:
+            for gx in range(cx - ring, cx + ring + 1):
+                for gy in (range(cy - ring, cy + ring + 1) if abs(gx - cx) == ring else (cy - ring, cy + ring)):
+                    for i in self.cells.get((gx, gy), ()):
+                        d = hypot(self.xs[i] - x, self.ys[i] - y)
+                        if best is None or d < best[0]:
+                            best = (d, i)
+            # Anything in a further ring is at least ring * cell away.
+            if best is not None and best[0] <= ring * self.cell:
+                break
+            ring += 1
+        return best
+
+    def pairs_within(self, distance):
+        """Sorted (i, j) pairs, with i < j, of points no further than distance apart.  A distance
+        of 0 finds points on top of each other."""
+        reach = int(ceil(float(distance) / self.cell))
+        out = []
+        for (gx, gy), points in self.cells.items():
+            nearby = []
+            for other in self._cells_between((gx - reach, gy - reach), (gx + reach, gy + reach)):
+                nearby.extend(other)
+            for i in points:
+                for j in nearby:
+                    if i < j and hypot(self.xs[i] - self.xs[j], self.ys[i] - self.ys[j]) <= distance:
+                        out.append((i, j))
+        return sorted(out)
@@ -223,3 +223,25 @@ class TestPartPlacement(TestCase):
 
 
 
+
+
+class TestFixedPointCoordinates(TestCase):
+    def test_hundredths(self):
+        pp = PartPlacementInstruction(part_number=1, pickup_head=1, stack=1, x="141.732", y=-64.516,
+                                      rotation=-90, height="0.5")
+        self.assertEqual(14173, pp.x_hundredths)
+        self.assertEqual(-6452, pp.y_hundredths)
+        self.assertEqual(50, pp.height_hundredths)
+        self.assertEqual(Decimal('141.73'), pp.x)
+        self.assertEqual(Decimal('0.5'), pp.height)
+
+    def test_from_hundredths(self):
+        pp = PartPlacementInstruction.from_hundredths(part_number=1, pickup_head=2, stack=1, x=103330, y=9999,
+                                                      rotation=-45, height=220)
+        self.assertEqual('1,2,1,1033.3,99.99,-45,2.2,0,,', pp.to_csv())
+        self.assertEqual(Decimal('1033.3'), pp.x)
+
+    def test_feed_spacing(self):
+        fs = FeedSpacingInstruction(stack=0, feed_spacing="18.000")
+        self.assertEqual(1800, fs.feed_spacing_hundredths)
+        self.assertEqual(Decimal('18'), fs.feed_spacing)
@@ -0,0 +1,83 @@
+from unittest import TestCase
+import time
+
+from tm2x0.assignment import ReelAssigner, describe_group, reel_numbers_by_reference
+from tm2x0.instructions import PlacementInstructions
+from tm2x0.kicad import KicadPartPositions
+from tm2x0.partplacement import PartPlacement
+from tm2x0.placement import Placement
+from tm2x0.test.test_placementCLI import sample_kicad_pos
+
+
+def part(reference, footprint, value):
+    return PartPlacement(reference=reference, x=0, y=0, footprint=footprint, value=value)
+
+
+class TestReelAssigner(TestCase):
+    def test_groups_by_footprint_and_value(self):
+        placement = Placement()
+        parts = KicadPartPositions.from_string(sample_kicad_pos).instructions['Front']
+        self.assertEqual([], ReelAssigner().assign(placement, parts))
+        self.assertEqual([1, 2, 3, 4], sorted(placement.parts.keys()))
+        self.assertEqual("10K SM0805-SS-POL", placement.reels[1].comment)
+
+    def test_most_used_closest(self):
+        placement = Placement()
+        parts = [part("R1", "0805", "1K"),
+                 part("C1", "0603", "100n"),
+                 part("C2", "0603", "100n"),
+                 part("C3", "0603", "100n"),
+                 part("R2", "0805", "1K"),
+                 part("D1", "0805", "LED")]
+        ReelAssigner(reel_numbers=[5, 2, 9]).assign(placement, parts)
+        self.assertEqual(["C1", "C2", "C3"], [p.reference for p in placement.parts[5]])
+        self.assertEqual(["R1", "R2"], [p.reference for p in placement.parts[2]])
+        self.assertEqual(["D1"], [p.reference for p in placement.parts[9]])
+
+    def test_tray(self):
+        placement = Placement()
+        ReelAssigner().assign(placement, [part("U1", "TQFP-44", "PIC18F4520"), part("R1", "0805", "1K")])
+        self.assertEqual(["U1"], [p.reference for p in placement.parts[0]])
+        self.assertEqual(["R1"], [p.reference for p in placement.parts[1]])
+
+    def test_out_of_reels(self):
+        placement = Placement()
+        unassigned = ReelAssigner(reel_numbers=[1]).assign(placement, [part("R1", "0805", "1K"),
+                                                                       part("R2", "0805", "1K"),
+                                                                       part("R3", "0805", "10K")])
+        self.assertEqual(["R3"], [p.reference for p in unassigned])
+
+    def test_reuses_configured_reels(self):
+        instructions = PlacementInstructions.from_string("""65535,0,0,0,,
+65535,1,3,0.05,0,1K 0805
+65535,2,3,4,
+65535,1,4,0.05,0,LED
+65535,2,4,4,
+65535,1,7,0.05,0,0603
+65535,2,7,4,
+1,1,7,4,22,-45,0,0,C1,""")
+        placement = Placement.from_instructions(instructions)
+        assigner = ReelAssigner(previous=reel_numbers_by_reference(placement))
+        placement.clear_parts()
+        assigner.assign(placement, [part("R1", "0805", "1K"),
+                                    part("D1", "0805", "LED"),
+                                    part("C1", "0402", "100n"),
+                                    part("R2", "0805", "10K")])
+        self.assertEqual(["R1"], [p.reference for p in placement.parts[3]])
+        self.assertEqual(["D1"], [p.reference for p in placement.parts[4]])
+        self.assertEqual(["C1"], [p.reference for p in placement.parts[7]])
+        # Reels 3, 4 and 7 are already taken.
+        self.assertEqual(["R2"], [p.reference for p in placement.parts[1]])
+        self.assertEqual("0603", placement.reels[7].comment)
+
+    def test_many_groups(self):
+        placement = Placement()
+        parts = [part("R{0}".format(i), "0603", str(i % 500)) for i in range(5000)]
+        start = time.time()
+        ReelAssigner().assign(placement, parts)
+        self.assertTrue(time.time() - start < 1)
+        self.assertEqual(500, len(placement.reels))
+
+    def test_describe_group(self):
+        self.assertEqual("1K 0805", describe_group(("0805", "1K")))
+        self.assertEqual("0805", describe_group(("0805", None)))
@@ -0,0 +1,197 @@
+from StringIO import StringIO
+from unittest import TestCase
+import os
+import shutil
+import tempfile
+
+from testfixtures import Replace
+
+from tm2x0.batch import ReelMap, convert, convert_both, convert_many, find_kicad_files
+from tm2x0.instructions import PlacementInstructions, PartPlacementInstruction, StackOffsetInstruction
+from tm2x0.kicad import KicadPartPositions
+from tm2x0.panel import PanelLayout
+from tm2x0.placement import Placement
+from tm2x0.test.test_placementCLI import sample_kicad_pos
+
+sample_reel_map = """reel,footprint,value,feed_spacing,stack_x_offset,stack_y_offset,height,rotation,comment,head
+1,SM0805-SS,1K,4,0.05,0,0,0,1K 0805,
+1,SM0805-SS,1M,,,,,,,
+2,SM0805-SS-POL,,4,0,0,0.5,90,,2
+3,SO14,,8,0,0,1,0,LED,
+"""
+
+
+class TestReelMap(TestCase):
+    def setUp(self):
+        self.reel_map = ReelMap.from_file(StringIO(sample_reel_map))
+
+    def test_reels(self):
+        self.assertEqual([1, 2, 3], sorted(self.reel_map.reels.keys()))
+        self.assertEqual("4", self.reel_map.reels[1].feed_spacing)
+        self.assertEqual("1K 0805", self.reel_map.reels[1].comment)
+        self.assertEqual("2", self.reel_map.reels[2].head)
+        self.assertEqual(None, self.reel_map.reels[3].head)
+
+    def test_blank_value_matches_any_value(self):
+        placement = Placement()
+        parts = KicadPartPositions.from_string(sample_kicad_pos).instructions['Front']
+        self.assertEqual([], self.reel_map.assign(placement, parts))
+        self.assertEqual(["R1", "R3"], sorted(p.reference for p in placement.parts[1]))
+        self.assertEqual(["R2"], [p.reference for p in placement.parts[2]])
+        self.assertEqual(["D1"], [p.reference for p in placement.parts[3]])
+
+    def test_needs_reel_and_footprint(self):
+        with self.assertRaises(ValueError):
+            ReelMap.from_file(StringIO("reel,value\n1,1K\n"))
+
+
+class TestConvert(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.reel_map = ReelMap.from_file(StringIO(sample_reel_map))
+        for name in ("a.pos", "b.pos"):
+            with open(os.path.join(self.directory, name), 'w') as f:
+                f.write(sample_kicad_pos)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_convert(self):
+        output = os.path.join(self.directory, "a.csv")
+        convert(os.path.join(self.directory, "a.pos"), self.reel_map, output_filename=output, dual_head=True)
+        with open(output) as f:
+            instructions = PlacementInstructions.from_file(f)
+        parts = [i for i in instructions if isinstance(i, PartPlacementInstruction)]
+        self.assertEqual([1, 1, 2, 3], [part.stack for part in parts])
+        self.assertEqual(2, parts[2].pickup_head)
+
+    def test_unmapped_parts(self):
+        reel_map = ReelMap.from_file(StringIO("reel,footprint\n1,SM0805-SS\n"))
+        output = os.path.join(self.directory, "a.csv")
+        with self.assertRaises(ValueError):
+            convert(os.path.join(self.directory, "a.pos"), reel_map, output_filename=output)
+        convert(os.path.join(self.directory, "a.pos"), reel_map, output_filename=output, auto_assign=True)
+
+    def test_auto_assign_leaves_mapped_reels_alone(self):
+        # The board has no SO14, so the map's Reel 3 is free, and Reel 1's comment names a footprint.
+        reel_map = ReelMap.from_file(StringIO("reel,footprint,value,comment\n1,SM0805-SS,1K,SM0805-SS\n"
+                                              "2,SM0805-SS,10K,\n3,SO14,,LED\n"))
+        kicad_file = os.path.join(self.directory, "c.pos")
+        with open(kicad_file, 'w') as f:
+            f.write("""## Unit = mm, Angle = deg.
+R1       1K                SM0805-SS         141.7320   -64.5160     270.0    Front
+R2       47K               SM0805-SS         156.5910   -77.9780     270.0    Front
+C1       10u               SM1206            144.7800   -64.5160      90.0    Front
+""")
+        placement = convert(kicad_file, reel_map, output_filename=os.path.join(self.directory, "c.csv"),
+                            auto_assign=True)
+        self.assertEqual(["R1"], [part.reference for part in placement.parts[1]])
+        unmapped = [n for n, parts in placement.parts.items() if n != 1]
+        self.assertFalse(set(unmapped) & set([1, 2, 3]))
+
+    def test_failed_convert_keeps_old_file(self):
+        output = os.path.join(self.directory, "a.csv")
+        with open(output, 'w') as f:
+            f.write("old")
+
+        def failing(placement, optimizer=None, scheduler=None):
+            yield StackOffsetInstruction(1, 0, 0)
+            raise ValueError("Generation failed")
+
+        with Replace("tm2x0.placement.Placement.iter_instructions", failing):
+            with self.assertRaises(ValueError):
+                convert(os.path.join(self.directory, "a.pos"), self.reel_map, output_filename=output)
+        with open(output) as f:
+            self.assertEqual("old", f.read())
+        self.assertEqual(["a.csv", "a.pos", "b.pos"], sorted(os.listdir(self.directory)))
+
+    def test_convert_many(self):
+        out = os.path.join(self.directory, "out")
+        os.mkdir(out)
+        kicad_files = find_kicad_files(self.directory) + [os.path.join(self.directory, "missing.pos")]
+        results = convert_many(kicad_files, self.reel_map, output_directory=out, processes=2)
+        self.assertEqual([os.path.join(out, "a-front.csv"), os.path.join(out, "b-front.csv"),
+                          os.path.join(out, "missing-front.csv")], [output for output, _ in results])
+        self.assertEqual([None, None], [error for _, error in results[:2]])
+        self.assertNotEqual(None, results[2][1])
+        with open(results[0][0]) as a, open(results[1][0]) as b:
+            self.assertEqual(a.read(), b.read())
+
+
+two_sided_kicad_pos = """## Unit = mm, Angle = deg.
+# Ref    Val                  Package         PosX       PosY        Rot     Side
+R1       1K                SM0805-SS          10.0000   -10.0000       0.0    Front
+C1       100n              SM0603             20.0000   -10.0000      90.0    Front
+R2       1K                SM0805-SS          15.0000   -20.0000       0.0    Back
+C2       10u               SM0603             25.0000   -20.0000      90.0    Back
+C3       100n              SM0603             30.0000   -20.0000      90.0    Back
+## End"""
+
+
+class TestConvertBoth(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.kicad_file = os.path.join(self.directory, "board.pos")
+        with open(self.kicad_file, 'w') as f:
+            f.write(two_sided_kicad_pos)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def read(self, side):
+        """The part rows written for a side, by where they go."""
+        with open(os.path.join(self.directory, "board-{0}.csv".format(side))) as f:
+            instructions = PlacementInstructions.from_file(f)
+        return dict(((part.x_hundredths, part.y_hundredths), part) for part in instructions
+                    if isinstance(part, PartPlacementInstruction))
+
+    def test_both_sides(self):
+        reel_map = ReelMap.from_file(StringIO(sample_reel_map))
+        placements = convert_both(self.kicad_file, reel_map, "40", auto_assign=True)
+        front, back = self.read("front"), self.read("back")
+        r1, c1 = front[(1000, -1000)], front[(2000, -1000)]
+        # The back is turned over across a 40 mm board, and its rotations flipped to match.
+        self.assertEqual([(1000, -2000), (1500, -2000), (2500, -2000)], sorted(back))
+        r2, c2, c3 = back[(2500, -2000)], back[(1500, -2000)], back[(1000, -2000)]
+        self.assertEqual((180, 0), (r1.rotation, r2.rotation))
+        # Parts the front has too go on the same reels, whether they came from the map or not.
+        self.assertEqual(r1.stack, r2.stack)
+        self.assertEqual(c1.stack, c3.stack)
+        self.assertNotIn(c2.stack, (r1.stack, c1.stack))
+        self.assertEqual(["C2", "C3", "R2"], sorted(part.reference for parts in placements["Back"].parts.values()
+                                                    for part in parts))
+
+    def test_back_alone_turned_over_the_same(self):
+        reel_map = ReelMap.from_file(StringIO(sample_reel_map))
+        convert_both(self.kicad_file, reel_map, "40", auto_assign=True, processes=1)
+        both = self.read("back")
+        convert(self.kicad_file, reel_map, side="Back", auto_assign=True, board_width="40",
+                output_filename=os.path.join(self.directory, "board-back.csv"))
+        alone = self.read("back")
+        self.assertEqual(sorted((k, v.rotation) for k, v in both.items()),
+                         sorted((k, v.rotation) for k, v in alone.items()))
+        # Without the width, the back isn't turned over.
+        convert(self.kicad_file, reel_map, side="Back", auto_assign=True,
+                output_filename=os.path.join(self.directory, "board-back.csv"))
+        self.assertEqual([(1500, -2000), (2500, -2000), (3000, -2000)], sorted(self.read("back")))
+
+    def test_panel_turned_over(self):
+        reel_map = ReelMap.from_file(StringIO(sample_reel_map))
+        # The left copy is bad, which is the right one seen from the back.
+        panel = PanelLayout(1, 2, 50, 0, skip=[(0, 0)])
+        convert_both(self.kicad_file, reel_map, "40", auto_assign=True, panel=panel, expand_panel=True,
+                     processes=1)
+        self.assertTrue(all(x >= 5000 for x, y in self.read("front")))
+        self.assertEqual([(1000, -2000), (1500, -2000), (2500, -2000)], sorted(self.read("back")))
+        rotated = PanelLayout(1, 2, 50, 0, rotations={(0, 1): 90})
+        self.assertRaises(ValueError, convert_both, self.kicad_file, reel_map, "40", auto_assign=True,
+                          panel=rotated, expand_panel=True, processes=1)
+
+    def test_same_in_one_process(self):
+        reel_map = ReelMap()
+        convert_both(self.kicad_file, reel_map, "40", auto_assign=True)
+        parallel = self.read("front"), self.read("back")
+        convert_both(self.kicad_file, reel_map, "40", auto_assign=True, processes=1)
+        serial = self.read("front"), self.read("back")
+        for a, b in zip(parallel, serial):
+            self.assertEqual(sorted((k, v.to_csv()) for k, v in a.items()), sorted((k, v.to_csv()) for k, v in b.items()))
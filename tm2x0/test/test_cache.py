@@ -0,0 +1,96 @@
+from StringIO import StringIO
+from unittest import TestCase
+import os
+import shutil
+import tempfile
+
+from tm2x0 import cache
+from tm2x0.batch import ReelMap, convert
+from tm2x0.cache import JobCache, placement_signature
+from tm2x0.kicad import KicadPartPositions
+from tm2x0.placement import Placement
+from tm2x0.placementcli import PlacementCLI
+from tm2x0.test.test_batch import sample_reel_map
+from tm2x0.test.test_placementCLI import sample_kicad_pos
+
+
+class TestJobCache(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = JobCache(os.path.join(self.directory, "cache"), max_bytes=250)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_key(self):
+        self.assertEqual(self.cache.key("a", "b"), self.cache.key("a", "b"))
+        self.assertNotEqual(self.cache.key("ab", "c"), self.cache.key("a", "bc"))
+
+    def test_key_includes_format_version(self):
+        before = self.cache.key("a")
+        cache.FORMAT_VERSION += 1
+        try:
+            self.assertNotEqual(before, self.cache.key("a"))
+        finally:
+            cache.FORMAT_VERSION -= 1
+
+    def test_get_and_put(self):
+        self.assertEqual(None, self.cache.get("missing"))
+        self.cache.put("job", "1,1,1,0,0,0,0,0,,")
+        self.assertEqual("1,1,1,0,0,0,0,0,,", self.cache.get("job"))
+
+    def test_least_recently_used_evicted(self):
+        self.cache.max_bytes = 1000
+        for n, key in enumerate(("a", "b", "c")):
+            self.cache.put(key, "x" * 100)
+            os.utime(os.path.join(self.cache.directory, key + ".csv"), (1000 + n, 1000 + n))
+        # Reading a makes b the least recently used.
+        self.cache.get("a")
+        self.cache.max_bytes = 250
+        self.cache.evict()
+        self.assertEqual(None, self.cache.get("b"))
+        self.assertEqual("x" * 100, self.cache.get("a"))
+        self.assertEqual("x" * 100, self.cache.get("c"))
+
+    def test_placement_signature(self):
+        placement = Placement()
+        ReelMap.from_file(StringIO(sample_reel_map)).assign(
+            placement, KicadPartPositions.from_string(sample_kicad_pos).instructions['Front'])
+        before = placement_signature(placement)
+        placement.reels[2].stack_x_offset = "0.1"
+        self.assertNotEqual(before, placement_signature(placement))
+
+    def test_convert_uses_cache(self):
+        kicad_filename = os.path.join(self.directory, "a.pos")
+        with open(kicad_filename, 'w') as f:
+            f.write(sample_kicad_pos)
+        output = os.path.join(self.directory, "a.csv")
+        cache = JobCache(os.path.join(self.directory, "cache"))
+        reel_map = ReelMap.from_file(StringIO(sample_reel_map))
+
+        self.assertNotEqual(None, convert(kicad_filename, reel_map, output_filename=output, cache=cache))
+        with open(output) as f:
+            first = f.read()
+        os.remove(output)
+        self.assertEqual(None, convert(kicad_filename, reel_map, output_filename=output, cache=cache))
+        with open(output) as f:
+            self.assertEqual(first, f.read())
+
+        # A different reel map is a different job.
+        reel_map.reels[1].stack_x_offset = "0.1"
+        self.assertNotEqual(None, convert(kicad_filename, reel_map, output_filename=output, cache=cache))
+
+    def test_cli_export_uses_cache(self):
+        placement = Placement()
+        ReelMap.from_file(StringIO(sample_reel_map)).assign(
+            placement, KicadPartPositions.from_string(sample_kicad_pos).instructions['Front'])
+        cli = PlacementCLI(placement, cache=JobCache(os.path.join(self.directory, "cache")), cache_context=("a",))
+        first = StringIO()
+        self.assertTrue(cli._write_instructions(first))
+        self.assertEqual(1, len(cli.cache.entries()))
+        placement.reels[1].comment = "Changed"
+        second = StringIO()
+        self.assertTrue(cli._write_instructions(second))
+        self.assertEqual(2, len(cli.cache.entries()))
+        self.assertNotEqual(first.getvalue(), second.getvalue())
+        self.assertTrue("Changed" in second.getvalue())
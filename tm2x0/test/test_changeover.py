@@ -0,0 +1,139 @@
+from unittest import TestCase
+import random
+
+from testfixtures import LogCapture
+
+from tm2x0.changeover import ChangeoverPlanner, board_reels, reel_identity
+from tm2x0.instructions import PlacementInstructions, PartPlacementInstruction, SpeedInstruction, \
+    StackOffsetInstruction
+from tm2x0.partplacement import PartPlacement
+from tm2x0.placement import Placement
+
+
+def board(*groups):
+    """A placement with a reel for each (footprint, value), numbered from 1 in the order given."""
+    placement = Placement()
+    for reel_number, (footprint, value) in enumerate(groups, 1):
+        placement.assign_part_to_reel(PartPlacement("P{0}".format(reel_number), reel_number, 0,
+                                                    footprint=footprint, value=value), reel_number)
+        placement.reels[reel_number].stack_x_offset = 0
+        placement.reels[reel_number].stack_y_offset = 0
+        placement.reels[reel_number].feed_spacing = 4
+    return placement
+
+
+R1K = ("0805", "1K")
+R10K = ("0805", "10K")
+C100N = ("0603", "100n")
+LED = ("0805", "LED")
+C1U = ("0603", "1u")
+
+
+class TestChangeoverPlanner(TestCase):
+    def test_shared_reels_on_shared_stacks(self):
+        boards = [board(R1K, C100N), board(C100N, R10K, R1K)]
+        plan = ChangeoverPlanner(range(1, 11)).plan(boards)
+        self.assertEqual(0, plan.changes)
+        plan.apply(boards)
+        stacks = [dict((reel_identity(placement, n), n) for n in placement.reels) for placement in boards]
+        self.assertEqual(stacks[0]["1K 0805"], stacks[1]["1K 0805"])
+        self.assertEqual(stacks[0]["100n 0603"], stacks[1]["100n 0603"])
+
+    def test_order_groups_similar_boards(self):
+        # With room for two reels, running the two boards using 1K and 10K together means the
+        # reels only have to be changed once, in the middle.
+        boards = [board(R1K, R10K), board(LED, C1U), board(R10K, R1K), board(C1U, LED)]
+        plan = ChangeoverPlanner([1, 2]).plan(boards)
+        self.assertEqual(2, plan.changes)
+        self.assertTrue(set(plan.order[:2]) in (set([0, 2]), set([1, 3])))
+
+    def test_furthest_next_use_replaced(self):
+        boards = [board(R1K, R10K, LED), board(R1K, C1U), board(R10K, C1U)]
+        plan = ChangeoverPlanner([1, 2, 3]).plan(boards)
+        self.assertEqual(1, plan.changes)
+
+    def test_too_many_reels(self):
+        with self.assertRaises(ValueError):
+            ChangeoverPlanner([1]).plan([board(R1K, R10K)])
+
+    def test_identity_from_comments(self):
+        s = """65535,0,0,0,,
+65535,1,1,0,0,1K 0805
+65535,2,1,4,
+65535,1,2,0,0,10K  0805
+65535,2,2,4,
+65535,1,3,0,0,0805
+65535,2,3,4,
+65535,1,4,0,0,
+65535,2,4,4,
+1,1,1,10,-10,0,0.5,0,R1,
+2,1,2,20,-10,0,0.5,0,R2,
+3,1,3,30,-10,0,0.5,0,R3,
+4,1,4,40,-10,0,0.5,0,R4,"""
+        placement = Placement.from_instructions(PlacementInstructions.from_string(s))
+        with LogCapture() as logs:
+            reels = board_reels(placement, 7, "top.csv")
+        # A footprint alone could be any value, so Reel 3 stays with its board.
+        self.assertEqual([(("1K 0805", 1), 1), (("10K 0805", 1), 2), (("board", 7, 3), 3), (("board", 7, 4), 4)],
+                         reels)
+        logs.check(('root', 'WARNING', "top.csv: Reels 1, 2 are matched to other boards by their comments only"))
+
+    def test_repeated_comments_not_shared(self):
+        s = """65535,0,0,0,,
+65535,1,1,0,0,1K 0805
+65535,2,1,4,
+65535,1,2,0,0,1K 0805
+65535,2,2,4,
+1,1,1,10,-10,0,0.5,0,R1,
+2,1,2,20,-10,0,0.5,0,R2,"""
+        placement = Placement.from_instructions(PlacementInstructions.from_string(s))
+        self.assertEqual([(("board", 7, 1), 1), (("board", 7, 2), 2)], board_reels(placement, 7))
+
+    def test_footprint_without_value_not_shared(self):
+        boards = [board(("0805", None)), board(("0805", None))]
+        plan = ChangeoverPlanner([1, 2]).plan(boards)
+        self.assertEqual(1, plan.changes)
+        self.assertEqual(None, reel_identity(boards[0], 1))
+
+    def test_apply_to_instructions_keeps_rows(self):
+        first = """65535,0,0,0,,
+0,50,0,0,0,0,0,0,
+65535,1,1,0,0,1K 0805
+65535,2,1,4,
+65535,1,2,0,0,10K 0805
+65535,2,2,4,
+1,1,2,30,-10,0,1,0,R2,
+2,1,1,10,-10,0,0.5,1,R1,
+3,1,1,20,-10,0,0.8,0,R3,"""
+        second = """65535,0,0,0,,
+65535,1,5,0,0,10K 0805
+65535,2,5,4,
+1,2,5,10,-10,90,1,0,R9,"""
+        instructions = [PlacementInstructions.from_string(s) for s in (first, second)]
+        placements = [Placement.from_instructions(board_instructions) for board_instructions in instructions]
+        with LogCapture():
+            plan = ChangeoverPlanner([1, 2]).plan(placements)
+            plan.apply_to_instructions(instructions)
+        self.assertEqual(0, plan.changes)
+        stack, other = plan.stacks[0][2], plan.stacks[0][1]
+        self.assertEqual(stack, plan.stacks[1][5])
+        # Only the stack numbers change: the speed, order, heights and skipped row are kept.
+        rows = instructions[0].instructions
+        self.assertTrue(isinstance(rows[1], SpeedInstruction))
+        self.assertEqual([("R2", stack, 100, False), ("R1", other, 50, True), ("R3", other, 80, False)],
+                         [(row.reference, row.stack, row.height_hundredths, bool(row.skip)) for row in rows
+                          if isinstance(row, PartPlacementInstruction)])
+        self.assertEqual([(other, "1K 0805"), (stack, "10K 0805")],
+                         [(row.stack, row.comment) for row in rows if isinstance(row, StackOffsetInstruction)])
+        self.assertEqual([stack], [row.stack for row in instructions[1].instructions
+                                   if isinstance(row, PartPlacementInstruction)])
+
+    def test_scales(self):
+        generator = random.Random(5)
+        groups = [("0603", str(n)) for n in range(300)]
+        boards = [board(*generator.sample(groups, 20)) for _ in range(30)]
+        plan = ChangeoverPlanner(range(1, 41), time_budget=0.5).plan(boards)
+        self.assertEqual(sorted(range(30)), sorted(plan.order))
+        plan.apply(boards)
+        for placement in boards:
+            self.assertTrue(all(1 <= n <= 40 for n in placement.reels))
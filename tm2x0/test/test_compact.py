@@ -0,0 +1,78 @@
+from unittest import TestCase
+from StringIO import StringIO
+
+from tm2x0.compact import CompactPlacementInstructions, PartPlacementColumns
+from tm2x0.fixedpoint import to_hundredths, format_hundredths
+from tm2x0.instructions import PlacementInstructions, PartPlacementInstruction, StackOffsetInstruction
+
+
+class TestFixedPoint(TestCase):
+    def test_to_hundredths(self):
+        self.assertEqual(100, to_hundredths(1))
+        self.assertEqual(134, to_hundredths("1.34"))
+        self.assertEqual(-4, to_hundredths("-0.04"))
+        self.assertEqual(103, to_hundredths(1.0303))
+        # rounds half to even, like represent_decimal
+        self.assertEqual(268, to_hundredths("2.675"))
+        self.assertEqual(-2, to_hundredths("-0.015"))
+
+    def test_format_hundredths(self):
+        self.assertEqual('1.34', format_hundredths(134))
+        self.assertEqual('1.3', format_hundredths(130))
+        self.assertEqual('-0.04', format_hundredths(-4))
+        self.assertEqual('0', format_hundredths(0))
+        self.assertEqual('35', format_hundredths(3500))
+        self.assertEqual('1E+2', format_hundredths(10000))
+        self.assertEqual('-1.2E+2', format_hundredths(-12000))
+
+
+class TestCompactPlacementInstructions(TestCase):
+    s = """%,Head,Stack,X,Y,R,H,skip,Ref,Comment,
+65535,0,0,0,,
+65535,1,1,-0.04,-0.1,0603
+65535,2,1,4,
+65535,3,1,0,0,0,0,0,
+
+1,1,1,4,22,-45,1,0,LED7,-LED-805
+2,2,1,4.5,19.25,-45,1,0,LED8,-LED-805
+3,1,2,100.5,-16.01,90,0.5,1,LED9,
+4,1,2,1033.3,99.99,0,2.2,0,,"""
+
+    def test_round_trip(self):
+        c = CompactPlacementInstructions.from_string(self.s)
+        self.assertEqual(self.s, c.to_csv())
+        self.assertEqual(PlacementInstructions.from_string(self.s).to_csv(), c.to_csv())
+
+    def test_from_file(self):
+        c = CompactPlacementInstructions.from_file(StringIO(self.s))
+        self.assertEqual(10, len(c))
+        self.assertEqual(4, len(c.placements))
+        self.assertEqual(self.s.replace("\n", "\r\n"), c.to_csv(line_ending="\r\n"))
+
+    def test_to_and_from_instructions(self):
+        p = PlacementInstructions.from_string(self.s)
+        c = CompactPlacementInstructions.from_instructions(p)
+        self.assertEqual(p.to_csv(), c.to_csv())
+        self.assertEqual(p.to_csv(), c.to_instructions().to_csv())
+        instructions = list(c)
+        self.assertIsInstance(instructions[2], StackOffsetInstruction)
+        self.assertIsInstance(instructions[6], PartPlacementInstruction)
+        self.assertEqual("LED7", instructions[6].reference)
+
+    def test_strings_interned(self):
+        c = CompactPlacementInstructions.from_string(self.s)
+        self.assertIs(c.placements.comment[0], c.placements.comment[1])
+
+    def test_indices(self):
+        c = CompactPlacementInstructions.from_string(self.s)
+        self.assertEqual([0, 1], c.placements.indices(stack=1))
+        self.assertEqual([2], c.placements.indices(skip=True))
+        self.assertEqual([3], c.placements.indices(stack=2, skip=False))
+
+
+class TestPartPlacementColumns(TestCase):
+    def test_append(self):
+        columns = PartPlacementColumns()
+        self.assertEqual(0, columns.append(1, 2, 1, 103330, 9999, -45, 220))
+        self.assertEqual('1,2,1,1033.3,99.99,-45,2.2,0,,', columns.to_csv(0))
+        self.assertEqual('1,2,1,1033.3,99.99,-45,2.2,0,,', columns.instruction(0).to_csv())
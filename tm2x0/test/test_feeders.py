@@ -0,0 +1,73 @@
+from unittest import TestCase
+
+from tm2x0.feeders import FeederLayoutOptimizer
+from tm2x0.instructions import PlacementInstructions
+from tm2x0.machine import MachineProfile
+from tm2x0.partplacement import PartPlacement
+from tm2x0.placement import Placement
+from tm2x0.reel import Reel
+
+
+def busy_far_reel():
+    # Reel 1 has one part and reel 2 has five, all at the same spot, which stack 1's feeder is nearer.
+    placement = Placement()
+    placement.reels[1] = Reel(1, stack_x_offset=0, stack_y_offset=0, feed_spacing=4, comment="one")
+    placement.reels[2] = Reel(2, stack_x_offset=0.1, stack_y_offset=0, feed_spacing=2, comment="five")
+    placement.assign_part_to_reel(PartPlacement("R1", 0, 0), 1)
+    for n in range(5):
+        placement.assign_part_to_reel(PartPlacement("C{0}".format(n), 0, 0), 2)
+    return placement
+
+
+class TestFeederLayoutOptimizer(TestCase):
+    def setUp(self):
+        self.profile = MachineProfile(feeder_positions={1: (0, 10), 2: (0, 20), 3: (0, 5)})
+
+    def test_busiest_reel_nearest(self):
+        placement = busy_far_reel()
+        optimizer = FeederLayoutOptimizer(self.profile)
+        self.assertEqual({1: 2, 2: 1}, optimizer.arrange(placement))
+        self.assertEqual(5 * 10 + 20, optimizer.final_travel)
+        self.assertEqual(5 * 20 + 10, optimizer.initial_travel)
+        self.assertEqual("five", placement.reels[1].comment)
+        self.assertEqual(1, placement.reels[1].reel_number)
+        self.assertEqual(["C0", "C1", "C2", "C3", "C4"], [part.reference for part in placement.parts[1]])
+        self.assertEqual(set([1]), set(part.reel for part in placement.parts[1]))
+
+    def test_more_stacks(self):
+        placement = busy_far_reel()
+        mapping = FeederLayoutOptimizer(self.profile, stacks=[1, 2, 3]).arrange(placement)
+        self.assertEqual({1: 1, 2: 3}, dict((old, mapping.get(old, old)) for old in (1, 2)))
+
+    def test_already_arranged(self):
+        placement = busy_far_reel()
+        placement.renumber_reels({1: 2, 2: 1})
+        self.assertEqual({}, FeederLayoutOptimizer(self.profile).arrange(placement))
+
+    def test_tray_stays(self):
+        placement = busy_far_reel()
+        placement.assign_part_to_reel(PartPlacement("U1", 0, 0), 0)
+        self.assertEqual({1: 2, 2: 1}, FeederLayoutOptimizer(self.profile).optimize(placement))
+
+    def test_too_few_stacks(self):
+        with self.assertRaises(ValueError):
+            FeederLayoutOptimizer(self.profile, stacks=[1]).optimize(busy_far_reel())
+
+    def test_instructions_follow(self):
+        placement = busy_far_reel()
+        instructions = placement.generate_instructions()
+        mapping = FeederLayoutOptimizer(self.profile).arrange(placement)
+        instructions.renumber_stacks(mapping)
+        regenerated = placement.generate_instructions()
+
+        def rows(instructions):
+            # Parts are numbered in reel order, so only the rest of each row has to match.
+            return sorted(line.split(",", 1)[1] for line in instructions.to_csv().split("\n"))
+        self.assertEqual(rows(regenerated), rows(instructions))
+
+
+class TestRenumberReels(TestCase):
+    def test_collision(self):
+        placement = busy_far_reel()
+        with self.assertRaises(ValueError):
+            placement.renumber_reels({1: 2})
@@ -0,0 +1,69 @@
+from unittest import TestCase
+
+from tm2x0.heads import DualHeadScheduler, count_trips, allowed_heads
+from tm2x0.instructions import PartPlacementInstruction
+from tm2x0.partplacement import PartPlacement
+from tm2x0.placement import Placement
+from tm2x0.reel import Reel
+
+
+def parts_on_reels(*reel_numbers):
+    return [PartPlacement(reference="P{0}".format(i), x=i, y=0, reel=reel_number)
+            for i, reel_number in enumerate(reel_numbers)]
+
+
+class TestCountTrips(TestCase):
+    def test_count_trips(self):
+        self.assertEqual(0, count_trips([]))
+        self.assertEqual(3, count_trips([1, 1, 1]))
+        self.assertEqual(2, count_trips([1, 2, 1, 2]))
+        self.assertEqual(2, count_trips([1, 2, 2]))
+
+    def test_allowed_heads(self):
+        self.assertEqual((1, 2), allowed_heads(Reel(1)))
+        self.assertEqual((2,), allowed_heads(Reel(1, head="2")))
+
+
+class TestDualHeadScheduler(TestCase):
+    def test_pairs_everything(self):
+        parts = parts_on_reels(1, 1, 2, 2, 3)
+        scheduler = DualHeadScheduler()
+        scheduled = scheduler.schedule(parts, dict((n, Reel(n)) for n in (1, 2, 3)))
+        self.assertEqual(parts, [part for part, head in scheduled])
+        self.assertEqual([1, 2, 1, 2, 1], [head for part, head in scheduled])
+        self.assertEqual(5, scheduler.trips_before)
+        self.assertEqual(3, scheduler.trips)
+        self.assertEqual(2, scheduler.saved_trips)
+
+    def test_pinned_heads(self):
+        parts = parts_on_reels(1, 1, 2)
+        reels = {1: Reel(1, head=1), 2: Reel(2, head=2)}
+        scheduled = DualHeadScheduler().schedule(parts, reels)
+        # The second part from Reel 1 can't share a trip with the first, so the Reel 2 part is pulled forward.
+        self.assertEqual(["P0", "P2", "P1"], [part.reference for part, head in scheduled])
+        self.assertEqual([1, 2, 1], [head for part, head in scheduled])
+
+    def test_pinned_to_head_two(self):
+        parts = parts_on_reels(1, 2)
+        reels = {1: Reel(1, head=2), 2: Reel(2)}
+        self.assertEqual([2, 1], [head for part, head in DualHeadScheduler().schedule(parts, reels)])
+
+    def test_no_lookahead_past_shorter_parts(self):
+        parts = parts_on_reels(1, 1, 2)
+        reels = {1: Reel(1, head=1, height=1), 2: Reel(2, head=2, height=2)}
+        scheduler = DualHeadScheduler()
+        scheduled = scheduler.schedule(parts, reels)
+        self.assertEqual(["P0", "P1", "P2"], [part.reference for part, head in scheduled])
+        # P1 and P2 can still share a trip.
+        self.assertEqual(2, scheduler.trips)
+
+    def test_generate_instructions(self):
+        placement = Placement()
+        for part in parts_on_reels(1, 1, 1, 1):
+            placement.assign_part_to_reel(part, part.reel)
+        placement.reels[1].feed_spacing = 4
+        placement.reels[1].stack_x_offset = 0
+        placement.reels[1].stack_y_offset = 0
+        instructions = placement.generate_instructions(scheduler=DualHeadScheduler())
+        heads = [i.pickup_head for i in instructions if isinstance(i, PartPlacementInstruction)]
+        self.assertEqual([1, 2, 1, 2], heads)
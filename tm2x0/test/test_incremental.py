@@ -0,0 +1,83 @@
+from StringIO import StringIO
+from unittest import TestCase
+
+from tm2x0.batch import ReelMap
+from tm2x0.heads import DualHeadScheduler
+from tm2x0.instructions import PlacementInstructions, StackOffsetInstruction
+from tm2x0.kicad import KicadPartPositions
+from tm2x0.placement import Placement
+from tm2x0.test.test_batch import sample_reel_map
+from tm2x0.test.test_placementCLI import sample_kicad_pos
+
+
+class TestUpdateInstructions(TestCase):
+    def setUp(self):
+        self.placement = Placement()
+        ReelMap.from_file(StringIO(sample_reel_map)).assign(
+            self.placement, KicadPartPositions.from_string(sample_kicad_pos).instructions['Front'])
+        self.scheduler = None
+        self.instructions = self.placement.generate_instructions()
+
+    def assertMatchesRegeneration(self):
+        updated = self.placement.update_instructions(self.instructions, scheduler=self.scheduler)
+        # iter_instructions, unlike generate_instructions, leaves the instructions being updated alone.
+        regenerated = PlacementInstructions()
+        regenerated.instructions.extend(self.placement.iter_instructions(scheduler=self.scheduler))
+        self.assertEqual(regenerated.to_csv(), updated.to_csv())
+        return updated
+
+    def test_reel_changes_update_in_place(self):
+        rows = list(self.instructions.instructions)
+        self.placement.set_reel_attribute(2, "stack_x_offset", "0.12")
+        self.placement.set_reel_attribute(1, "feed_spacing", "8")
+        self.placement.set_reel_attribute(1, "height", "0.6")
+        self.placement.set_reel_attribute(3, "rotation", "90")
+        updated = self.assertMatchesRegeneration()
+        self.assertTrue(updated is self.instructions)
+        # Rows for reels that didn't change are the same objects.
+        unchanged = [row for row in rows if isinstance(row, StackOffsetInstruction) and row.stack == 1]
+        self.assertTrue(unchanged[0] in updated.instructions)
+
+    def test_part_changes(self):
+        part = self.placement.parts[1][0]
+        self.placement.set_part_attribute(part, "rotation", 45)
+        self.placement.set_part_attribute(part, "x", "10.5")
+        self.placement.set_part_attribute(part, "head", 2)
+        self.assertTrue(self.assertMatchesRegeneration() is self.instructions)
+
+    def test_nothing_changed(self):
+        self.assertTrue(self.assertMatchesRegeneration() is self.instructions)
+
+    def test_reassigning_regenerates(self):
+        part = self.placement.parts[1][0]
+        self.placement.unassign_part_from_reel(part, 1)
+        self.placement.assign_part_to_reel(part, 3)
+        self.assertFalse(self.assertMatchesRegeneration() is self.instructions)
+
+    def test_scheduled(self):
+        self.scheduler = DualHeadScheduler()
+        self.instructions = self.placement.generate_instructions(scheduler=self.scheduler)
+        self.placement.set_reel_attribute(1, "rotation", -90)
+        self.assertTrue(self.assertMatchesRegeneration() is self.instructions)
+        self.placement.set_reel_attribute(1, "comment", "Changed")
+        self.assertTrue(self.assertMatchesRegeneration() is self.instructions)
+        self.placement.set_reel_attribute(1, "height", "2")
+        self.assertFalse(self.assertMatchesRegeneration() is self.instructions)
+
+    def test_changes_made_directly(self):
+        self.placement.reels[1].comment = "Changed"
+        self.placement.parts[2][0].rotation = 45
+        updated = self.assertMatchesRegeneration()
+        self.assertTrue("Changed" in updated.to_csv())
+
+    def test_other_generation_keeps_changes(self):
+        self.placement.set_reel_attribute(1, "feed_spacing", "8")
+        # Generating for something else, like validating, mustn't lose track of the change.
+        list(self.placement.iter_instructions())
+        self.assertTrue(self.assertMatchesRegeneration() is self.instructions)
+
+    def test_older_instructions_regenerate(self):
+        older = self.instructions
+        self.instructions = self.placement.generate_instructions()
+        self.placement.reels[1].comment = "Changed"
+        self.assertFalse(self.placement.update_instructions(older) is older)
@@ -63,9 +63,33 @@ U1       PIC16F1823       SO14              135.3820   -64.5160     180.0    Bac
         kpp = KicadPartPositions.from_file(stringio)
 
 
+    def test_positions_in_hundredths(self):
+        kpp = KicadPartPositions.from_string(TestKicadPartPositions.sample_mm)
+        c1 = kpp.instructions['Front'][0]
+        self.assertEqual(14173, c1.x_hundredths)
+        self.assertEqual(-6452, c1.y_hundredths)
+        self.assertEqual(-90, c1.rotation)
+
     def test_original_file_stored_in_lines(self):
         kpp = KicadPartPositions.from_string(TestKicadPartPositions.sample_mm)
         orig_lines = '\n'.join(kpp.lines)
         self.assertEqual(TestKicadPartPositions.sample_mm, orig_lines)
 
-
+    def test_line_endings(self):
+        for line_ending in ("\n", "\r\n", "\r"):
+            kpp = KicadPartPositions.from_string(line_ending.join(TestKicadPartPositions.sample_mm.split("\n")))
+            self.assertEqual(["C1", "D1", "R1", "U1"], [part.reference for part in kpp.instructions['Front']])
+            self.assertEqual("mm", kpp.units)
+
+    def test_units_from_header_while_streaming(self):
+        kpp = KicadPartPositions.from_file(StringIO.StringIO(TestKicadPartPositions.sample_in))
+        self.assertEqual("in", kpp.units)
+        # 141.7320 in
+        self.assertEqual(359999, kpp.instructions['Front'][0].x_hundredths)
+
+    def test_without_lines(self):
+        kpp = KicadPartPositions.from_file(StringIO.StringIO(TestKicadPartPositions.sample_twosides_mm),
+                                           keep_lines=False)
+        self.assertEqual([], kpp.lines)
+        self.assertEqual(["R1", "U1"], [part.reference for part in kpp.instructions['Back']])
+        self.assertEqual(90, kpp.instructions['Back'][0].rotation)
@@ -0,0 +1,77 @@
+from unittest import TestCase
+import os
+import shutil
+import tempfile
+import time
+
+from tm2x0.library import ReelLibrary
+from tm2x0.partplacement import PartPlacement
+from tm2x0.placement import Placement
+from tm2x0.reel import Reel
+
+
+def part(reference, footprint, value, mpn=None):
+    return PartPlacement(reference=reference, x=0, y=0, footprint=footprint, value=value, mpn=mpn)
+
+
+class TestReelLibrary(TestCase):
+    def setUp(self):
+        self.library = ReelLibrary()
+        self.library.add("SM0805", feed_spacing="4", stack_x_offset="0.05", stack_y_offset="0", comment="0805")
+        self.library.add("SM0805", "LED", feed_spacing="4", height="0.8", rotation=180)
+        self.library.add("SO14", "PIC16F1823", mpn="PIC16F1823-I/SL", feed_spacing="8", head="2")
+
+    def test_most_specific_match(self):
+        self.assertEqual("0.8", self.library.lookup("SM0805", "LED")["height"])
+        self.assertEqual(180, self.library.lookup("SM0805", "LED")["rotation"])
+        self.assertEqual("0805", self.library.lookup("SM0805", "1K")["comment"])
+        self.assertEqual("2", self.library.lookup("SOIC-14", "?", mpn="PIC16F1823-I/SL")["head"])
+        self.assertEqual("8", self.library.lookup("SO14", "PIC16F1823")["feed_spacing"])
+        self.assertEqual(None, self.library.lookup("SO14", "LM358"))
+
+    def test_apply_library(self):
+        placement = Placement()
+        placement.assign_part_to_reel(part("R1", "SM0805", "1K"), 1)
+        placement.assign_part_to_reel(part("D1", "SM0805", "LED"), 2)
+        placement.assign_part_to_reel(part("U1", "QFN-32", "ATMEGA"), 3)
+        placement.reels[2].comment = "Green"
+        self.assertEqual([1, 2], placement.apply_library(self.library))
+        self.assertEqual("0.05", placement.reels[1].stack_x_offset)
+        self.assertEqual(180, placement.reels[2].rotation)
+        self.assertEqual("Green", placement.reels[2].comment)
+        self.assertEqual(None, placement.reels[3].feed_spacing)
+
+    def test_learn_and_persist(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "reels.sqlite")
+            placement = Placement(reels={5: Reel(5, stack_x_offset="0", stack_y_offset="0.1", feed_spacing="2",
+                                                 height="0.35", rotation="-90")})
+            placement.assign_part_to_reel(part("C1", "SM0402", "100n"), 5)
+            placement.assign_part_to_reel(part("C2", "SM0402", "100n"), 5)
+            library = ReelLibrary(path)
+            self.assertEqual(1, library.learn(placement))
+            library.close()
+
+            library = ReelLibrary(path)
+            self.assertEqual({"feed_spacing": "2", "stack_x_offset": "0", "stack_y_offset": "0.1",
+                              "height": "0.35", "rotation": -90}, library.lookup("SM0402", "100n"))
+            library.close()
+        finally:
+            shutil.rmtree(directory)
+
+    def test_lookups_use_indexes(self):
+        for index in range(5000):
+            self.library.add("FP{0}".format(index % 50), "V{0}".format(index), mpn="MPN{0}".format(index),
+                             feed_spacing="4")
+        for sql, arguments in (("SELECT * FROM reels WHERE mpn = ? LIMIT 1", ("MPN1",)),
+                               ("SELECT * FROM reels WHERE footprint = ? AND value = ? ORDER BY mpn != '' LIMIT 1",
+                                ("FP1", "V1"))):
+            plan = " ".join(str(row[-1]) for row in
+                            self.library.connection.execute("EXPLAIN QUERY PLAN " + sql, arguments))
+            self.assertIn("INDEX", plan)
+        start = time.time()
+        for index in range(2000):
+            self.assertEqual("4", self.library.lookup("FP1", "V{0}".format(index), mpn="MPN{0}".format(index))
+                             ["feed_spacing"])
+        self.assertLess(time.time() - start, 2)
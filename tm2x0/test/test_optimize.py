@@ -0,0 +1,89 @@
+from unittest import TestCase
+
+from tm2x0.instructions import PartPlacementInstruction
+from tm2x0.machine import MachineProfile
+from tm2x0.optimize import PlacementOrderOptimizer
+from tm2x0.partplacement import PartPlacement
+from tm2x0.placement import Placement
+from tm2x0.reel import Reel
+
+
+def zig_zag_parts():
+    # A row of parts along the x axis, listed alternately from each end.
+    parts = []
+    for i in range(10):
+        x = i * 10 if i % 2 == 0 else 100 - i * 10
+        parts.append(PartPlacement(reference="R{0}".format(i), x=x, y=0, reel=1))
+    return parts
+
+
+class TestPlacementOrderOptimizer(TestCase):
+    def test_straightens_zig_zag(self):
+        parts = zig_zag_parts()
+        optimizer = PlacementOrderOptimizer()
+        ordered = optimizer.optimize(parts, {1: Reel(1)})
+        self.assertEqual(sorted(parts, key=lambda p: p.reference), sorted(ordered, key=lambda p: p.reference))
+        xs = [part.x for part in ordered]
+        self.assertTrue(xs == sorted(xs) or xs == sorted(xs, reverse=True))
+        self.assertEqual(90, optimizer.final_distance)
+        self.assertTrue(optimizer.initial_distance > optimizer.final_distance)
+
+    def test_distance_includes_feeder_trips(self):
+        parts = [PartPlacement(reference="R1", x=0, y=10, reel=1),
+                 PartPlacement(reference="R2", x=0, y=20, reel=1)]
+        optimizer = PlacementOrderOptimizer(feeder_positions={1: (0, 0)})
+        # 10 to place R1, 10 back to the feeder, 20 to place R2.
+        self.assertEqual(40, optimizer.distance(parts))
+        self.assertEqual(50, optimizer.distance(list(reversed(parts))))
+
+    def test_feeder_nearest_first(self):
+        parts = [PartPlacement(reference="FAR", x=50, y=0, reel=1),
+                 PartPlacement(reference="NEAR", x=5, y=0, reel=1)]
+        optimizer = PlacementOrderOptimizer(feeder_positions={1: (0, 0)}, start=(0, 0))
+        ordered = optimizer.optimize(parts, {1: Reel(1)})
+        self.assertEqual(["NEAR", "FAR"], [part.reference for part in ordered])
+
+    def test_profile_feeders(self):
+        parts = [PartPlacement(reference="R1", x=0, y=10, reel=1),
+                 PartPlacement(reference="R2", x=0, y=20, reel=1)]
+        profile = MachineProfile(feeder_positions={1: (0, 0)})
+        optimizer = PlacementOrderOptimizer(profile=profile)
+        self.assertEqual(40, optimizer.distance(parts))
+        # Positions given directly win over the profile's.
+        optimizer = PlacementOrderOptimizer(feeder_positions={1: (0, 30)}, profile=profile)
+        self.assertEqual(40, optimizer.distance(list(reversed(parts))))
+
+    def test_respects_height(self):
+        parts = [PartPlacement(reference="TALL", x=0, y=0, reel=2),
+                 PartPlacement(reference="SHORT1", x=100, y=0, reel=1),
+                 PartPlacement(reference="SHORT2", x=50, y=0, reel=1)]
+        reels = {1: Reel(1, height="0.5"), 2: Reel(2, height=3)}
+        ordered = PlacementOrderOptimizer().optimize(parts, reels)
+        self.assertEqual("TALL", ordered[-1].reference)
+        ordered = PlacementOrderOptimizer(respect_height=False).optimize(parts, reels)
+        self.assertNotEqual("TALL", ordered[1].reference)
+
+    def test_no_time(self):
+        parts = zig_zag_parts()
+        ordered = PlacementOrderOptimizer(time_budget=0).optimize(parts, {1: Reel(1)})
+        self.assertEqual(len(parts), len(ordered))
+
+    def test_empty(self):
+        optimizer = PlacementOrderOptimizer()
+        self.assertEqual([], optimizer.optimize([], {}))
+        self.assertEqual(0, optimizer.final_distance)
+
+
+class TestGenerateOptimized(TestCase):
+    def test_generate_instructions(self):
+        placement = Placement()
+        for part in zig_zag_parts():
+            placement.assign_part_to_reel(part, 1)
+        placement.reels[1].feed_spacing = 4
+        placement.reels[1].stack_x_offset = 0
+        placement.reels[1].stack_y_offset = 0
+        instructions = placement.generate_instructions(optimizer=PlacementOrderOptimizer())
+        rows = [i for i in instructions if isinstance(i, PartPlacementInstruction)]
+        self.assertEqual(range(1, 11), [row.part_number for row in rows])
+        xs = [row.x for row in rows]
+        self.assertTrue(xs == sorted(xs) or xs == sorted(xs, reverse=True))
@@ -0,0 +1,75 @@
+from unittest import TestCase
+import time
+
+from tm2x0.instructions import PanelizedBoardInstruction, PartPlacementInstruction
+from tm2x0.panel import PanelLayout
+from tm2x0.partplacement import PartPlacement
+from tm2x0.placement import Placement
+from tm2x0.reel import Reel
+
+
+def board():
+    return [PartPlacement(reference="R1", x="10.5", y="2", rotation=0, reel=1),
+            PartPlacement(reference="C1", x="-3", y="4.25", rotation=-90, reel=1)]
+
+
+class TestPanelLayout(TestCase):
+    def test_serpentine_order(self):
+        layout = PanelLayout(2, 3, "50", "40.5")
+        self.assertEqual([(0, 0), (0, 1), (0, 2), (1, 2), (1, 1), (1, 0)],
+                         [(copy.row, copy.column) for copy in layout.copies()])
+        self.assertEqual((10000, 4050), (layout.copies()[3].x_hundredths, layout.copies()[3].y_hundredths))
+
+    def test_to_instructions_skips_bad_boards(self):
+        instructions = PanelLayout(1, 3, 50, 0, skip=[(0, 1)]).to_instructions()
+        self.assertTrue(all(isinstance(i, PanelizedBoardInstruction) for i in instructions))
+        self.assertEqual([False, True, False], [bool(i.skip) for i in instructions])
+        self.assertEqual(["65535,3,0,0,0,0,0,0,", "65535,3,5E+1,0,1,0,0,0,", "65535,3,1E+2,0,0,0,0,0,"],
+                         [i.to_csv() for i in instructions])
+
+    def test_rotated_copies_must_be_expanded(self):
+        layout = PanelLayout(1, 2, 50, 0, rotations={(0, 1): 180})
+        self.assertRaises(ValueError, layout.to_instructions)
+        self.assertRaises(ValueError, PanelLayout, 1, 2, 50, 0, rotations={(0, 1): 45})
+        self.assertRaises(ValueError, PanelLayout, 1, 2, 50, 0, skip=[(1, 0)])
+
+    def test_turned_over(self):
+        layout = PanelLayout(2, 3, 50, 40, skip=[(0, 0), (1, 1)]).turned_over()
+        self.assertEqual(set([(0, 2), (1, 1)]), layout.skip)
+        self.assertEqual((2, 3), (layout.rows, layout.columns))
+        self.assertRaises(ValueError, PanelLayout(1, 2, 50, 0, rotations={(0, 1): 90}).turned_over)
+
+    def test_expand(self):
+        layout = PanelLayout(1, 3, 50, 0, rotations={(0, 2): 90}, skip=[(0, 1)])
+        parts = layout.expand(board())
+        self.assertEqual(["R1-1", "C1-1", "R1-3", "C1-3"], [part.reference for part in parts])
+        self.assertEqual([(1050, 200), (-300, 425), (10000 - 200, 1050), (10000 - 425, -300)],
+                         [(part.x_hundredths, part.y_hundredths) for part in parts])
+        self.assertEqual([0, -90, 90, 0], [part.rotation for part in parts])
+
+    def test_expand_scales_linearly(self):
+        parts = [PartPlacement(reference="R{0}".format(n), x=n % 90, y=n % 70, reel=1) for n in range(1000)]
+        start = time.time()
+        self.assertEqual(100000, len(PanelLayout(10, 10, 100, 80).expand(parts)))
+        self.assertLess(time.time() - start, 5)
+
+
+class TestExpandedPlacement(TestCase):
+    def placement(self, expand_panel):
+        placement = Placement(panel=PanelLayout(2, 2, 50, 50, skip=[(1, 1)]), expand_panel=expand_panel)
+        placement.reels[1] = Reel(1, stack_x_offset=0, stack_y_offset=0, feed_spacing=4)
+        for part in board():
+            placement.assign_part_to_reel(part, 1)
+        return placement
+
+    def test_copies_left_to_machine(self):
+        instructions = list(self.placement(False).iter_instructions())
+        self.assertEqual(4, len([i for i in instructions if isinstance(i, PanelizedBoardInstruction)]))
+        self.assertEqual(2, len([i for i in instructions if isinstance(i, PartPlacementInstruction)]))
+
+    def test_expanded(self):
+        instructions = list(self.placement(True).iter_instructions())
+        self.assertEqual([], [i for i in instructions if isinstance(i, PanelizedBoardInstruction)])
+        parts = [i for i in instructions if isinstance(i, PartPlacementInstruction)]
+        self.assertEqual(range(1, 7), [part.part_number for part in parts])
+        self.assertEqual([1050, -300, 6050, 4700, 1050, -300], [part.x_hundredths for part in parts])
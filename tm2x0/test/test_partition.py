@@ -0,0 +1,98 @@
+from unittest import TestCase
+
+from tm2x0.instructions import PlacementInstructions, PartPlacementInstruction, SpeedInstruction, \
+    StackOffsetInstruction
+from tm2x0.machine import MachineModel, MachineProfile
+from tm2x0.partition import JobPartitioner
+from tm2x0.partplacement import PartPlacement
+from tm2x0.placement import Placement
+from tm2x0.reel import Reel
+
+
+def job(*counts):
+    """A placement with reels numbered from 1, each with the given number of parts."""
+    placement = Placement()
+    for reel_number, count in enumerate(counts, 1):
+        placement.reels[reel_number] = Reel(reel_number, stack_x_offset=0, stack_y_offset=0, feed_spacing=4,
+                                            comment="reel {0}".format(reel_number))
+        for n in range(count):
+            placement.assign_part_to_reel(PartPlacement("R{0}-{1}".format(reel_number, n), 10 + n, -10), reel_number)
+    return placement
+
+
+SMALL = MachineModel("Small", 2, (0, -280, 300, 0))
+
+
+class TestJobPartitioner(TestCase):
+    def test_balanced(self):
+        shares = JobPartitioner([SMALL, SMALL]).split(job(8, 4, 4))
+        self.assertEqual([[1], [1, 2]], [sorted(share.placement.reels) for share in shares])
+        self.assertEqual({3: 1}, shares[1].mapping)
+        self.assertEqual(["reel 3", "reel 2"], [shares[1].placement.reels[n].comment for n in (1, 2)])
+        self.assertTrue(abs(shares[0].seconds - shares[1].seconds) < 0.25 * shares[0].seconds)
+
+    def test_capacity(self):
+        shares = JobPartitioner([SMALL, SMALL]).split(job(1, 1, 1, 1))
+        self.assertEqual([2, 2], [len(share.placement.reels) for share in shares])
+        for share in shares:
+            self.assertTrue(all(SMALL.has_stack(n) for n in share.placement.reels))
+
+    def test_parts_kept(self):
+        placement = job(3, 2, 5)
+        shares = JobPartitioner([SMALL, SMALL]).split(placement)
+        references = sorted(part.reference for share in shares for parts in share.placement.parts.values()
+                            for part in parts)
+        self.assertEqual(sorted(part.reference for parts in placement.parts.values() for part in parts), references)
+        self.assertEqual([1, 2, 3], sorted(placement.reels))
+
+    def test_tray_needs_no_stack(self):
+        placement = job(1, 1)
+        placement.reels[0] = Reel(0, stack_x_offset=0, stack_y_offset=0, feed_spacing=0)
+        placement.assign_part_to_reel(PartPlacement("U1", 50, -50), 0)
+        shares = JobPartitioner([SMALL]).split(placement)
+        self.assertEqual([0, 1, 2], sorted(shares[0].placement.parts))
+
+    def test_too_many_reels(self):
+        with self.assertRaises(ValueError):
+            JobPartitioner([SMALL]).split(job(1, 1, 1))
+
+    def test_faster_machine_gets_more(self):
+        fast = MachineProfile(pick_time=0.01, place_time=0.01)
+        slow = MachineProfile(pick_time=2.0, place_time=2.0)
+        shares = JobPartitioner([SMALL, SMALL], [slow, fast]).split(job(4, 4, 4))
+        self.assertEqual(2, len(shares[1].placement.reels))
+
+    def test_filter_instructions_keeps_rows(self):
+        s = """65535,0,0,0,,
+0,50,0,0,0,0,0,0,
+65535,1,1,0,0,reel 1
+65535,2,1,4,
+65535,1,2,0,0,reel 2
+65535,2,2,4,
+65535,1,3,0,0,reel 3
+65535,2,3,4,
+1,1,3,30,-10,0,1,0,C1,
+2,1,1,10,-10,0,0.5,1,R1,
+3,1,1,11,-10,0,0.5,0,R2,
+4,1,2,20,-10,0,0.8,0,R3,
+5,1,1,12,-10,0,0.8,0,R4,
+6,1,3,31,-10,0,0.5,0,C2,"""
+        instructions = PlacementInstructions.from_string(s)
+        shares = JobPartitioner([SMALL, SMALL]).split(Placement.from_instructions(instructions))
+        self.assertEqual([[3], [1, 2]], [sorted(share.reel_numbers) for share in shares])
+        first, second = [share.filter_instructions(instructions) for share in shares]
+        self.assertEqual({3: 1}, shares[0].mapping)
+        self.assertEqual([(1, "C1", 1), (2, "C2", 1)],
+                         [(row.part_number, row.reference, row.stack) for row in first.instructions
+                          if isinstance(row, PartPlacementInstruction)])
+        self.assertEqual([(1, "reel 3")],
+                         [(row.stack, row.comment) for row in first.instructions
+                          if isinstance(row, StackOffsetInstruction)])
+        # The speed, order, heights and skipped row are kept, with parts numbered from 1.
+        self.assertTrue(isinstance(second.instructions[1], SpeedInstruction))
+        self.assertEqual([(1, "R1", 1, 50, True), (2, "R2", 1, 50, False), (3, "R3", 2, 80, False),
+                          (4, "R4", 1, 80, False)],
+                         [(row.part_number, row.reference, row.stack, row.height_hundredths, bool(row.skip))
+                          for row in second.instructions if isinstance(row, PartPlacementInstruction)])
+        # The whole job's rows are left alone.
+        self.assertEqual(PlacementInstructions.from_string(s).to_csv(), instructions.to_csv())
@@ -0,0 +1,63 @@
+from unittest import TestCase
+from decimal import Decimal
+import logging
+
+from testfixtures import LogCapture
+
+from tm2x0.instructions import PlacementInstructions
+from tm2x0.placement import Placement
+
+
+class TestFromInstructions(TestCase):
+    s = """65535,0,1.5,2,,
+65535,3,0,0,0,0,0,0,
+65535,3,60.25,0,0,0,0,0,
+65535,1,1,0.05,0,0805
+65535,2,1,4,
+65535,1,2,-0.04,-0.1,0603
+65535,2,2,2,
+1,1,1,141.73,-64.52,-90,0.5,0,R1,
+2,2,2,156.59,-77.98,90,1,0,C1,
+3,1,2,135.38,-64.52,0,1,1,C2,"""
+
+    def test_from_instructions(self):
+        placement = Placement.from_instructions(PlacementInstructions.from_string(self.s))
+        self.assertEqual((Decimal('1.5'), Decimal('2')), (placement.offset_x, placement.offset_y))
+        self.assertEqual([(0, 0), (Decimal("60.25"), 0)], placement.copies)
+        self.assertEqual([1, 2], sorted(placement.reels.keys()))
+        self.assertEqual("0805", placement.reels[1].comment)
+        self.assertEqual(Decimal('4'), placement.reels[1].feed_spacing)
+        self.assertEqual(Decimal('0.5'), placement.reels[1].height)
+        # The skipped part isn't carried over.
+        self.assertEqual(["C1"], [part.reference for part in placement.parts[2]])
+
+    def test_parts_in_hundredths(self):
+        placement = Placement.from_instructions(PlacementInstructions.from_string(self.s + """
+4,1,1,10,-10,0,0.8,0,R2,"""))
+        part = placement.parts[2][0]
+        self.assertEqual((15659, -7798, 90, 2), (part.x_hundredths, part.y_hundredths, part.rotation, part.head))
+        self.assertEqual(Decimal('1'), part.height)
+        # R1 and R2 disagree, so Reel 1 keeps its default height.
+        self.assertEqual([Decimal('0.5'), Decimal('0.8')], [part.height for part in placement.parts[1]])
+        self.assertEqual(0, placement.reels[1].height)
+
+    def test_round_trip(self):
+        placement = Placement.from_instructions(PlacementInstructions.from_string(self.s))
+        self.assertEqual("""65535,0,1.5,2,,
+65535,3,0,0,0,0,0,0,
+65535,3,60.25,0,0,0,0,0,
+65535,1,1,0.05,0,0805
+65535,2,1,4,
+65535,1,2,-0.04,-0.1,0603
+65535,2,2,2,
+1,1,1,141.73,-64.52,-90,0.5,0,R1,
+2,2,2,156.59,-77.98,90,1,0,C1,""", placement.generate_instructions().to_csv())
+
+    def test_generation_logs_are_aggregated(self):
+        placement = Placement.from_instructions(PlacementInstructions.from_string(self.s))
+        with LogCapture(level=logging.INFO) as logs:
+            placement.generate_instructions()
+        logs.check(('root', 'INFO', "Generating instructions."),
+                   ('root', 'INFO', "Adding 2 copies."),
+                   ('root', 'INFO', "Setting up 2 reels."),
+                   ('root', 'INFO', "Placing 2 parts."))
@@ -1,4 +1,9 @@
+from StringIO import StringIO
+import os
+import shutil
+import tempfile
 from unittest import TestCase
+from tm2x0.batch import ReelMap, fill_reel_defaults
 from tm2x0.kicad import KicadPartPositions
 from tm2x0.placement import Placement
 from tm2x0.placementcli import PlacementCLI
@@ -26,4 +31,60 @@ class TestPlacementCLI(TestCase):
 
     def test_assign_part_to_reel(self):
         #self.placement_cli._assign_part_to_reel()
-        pass
\ No newline at end of file
+        pass
+
+
+class TestExport(TestCase):
+    def setUp(self):
+        self.placement = Placement()
+        ReelMap.from_file(StringIO("reel,footprint\n1,SM0805-SS\n2,SM0805-SS-POL\n3,SO14\n")).assign(
+            self.placement, KicadPartPositions.from_string(sample_kicad_pos).instructions['Front'])
+        fill_reel_defaults(self.placement)
+        self.cli = PlacementCLI(placement=self.placement)
+
+    def test_export_keeps_instructions(self):
+        out = StringIO()
+        self.assertTrue(self.cli._write_instructions(out))
+        self.assertNotEqual(None, self.cli.instructions)
+        self.assertEqual(self.placement.generate_instructions().to_csv(), out.getvalue().strip())
+
+    def test_kept_instructions_updated(self):
+        self.assertTrue(self.cli._write_instructions(StringIO()))
+        kept = self.cli.instructions
+        self.placement.reels[1].comment = "Changed"
+        out = StringIO()
+        self.assertTrue(self.cli._write_instructions(out))
+        self.assertTrue(self.cli.instructions is kept)
+        self.assertTrue("Changed" in out.getvalue())
+
+    def test_preview_then_export_updates(self):
+        with captured_output() as (out, _):
+            self.assertTrue(self.cli.preview())
+        self.assertTrue("Reel 1" in out.getvalue())
+        kept = self.cli.instructions
+        self.placement.set_reel_attribute(1, "comment", "Changed")
+        out = StringIO()
+        self.assertTrue(self.cli._write_instructions(out))
+        self.assertTrue(self.cli.instructions is kept)
+        self.assertEqual(self.placement.generate_instructions().to_csv(), out.getvalue().strip())
+
+    def test_failed_export_keeps_old_file(self):
+        directory = tempfile.mkdtemp()
+        try:
+            self.cli.output_filename = os.path.join(directory, "out.csv")
+            with open(self.cli.output_filename, 'w') as f:
+                f.write("old")
+            self.placement.reels[1].height = "not a number"
+            with captured_output():
+                self.assertFalse(self.cli.export())
+            with open(self.cli.output_filename) as f:
+                self.assertEqual("old", f.read())
+            self.assertEqual(["out.csv"], os.listdir(directory))
+
+            self.placement.reels[1].height = "0"
+            self.assertTrue(self.cli.export())
+            with open(self.cli.output_filename) as f:
+                self.assertEqual(self.placement.generate_instructions().to_csv(), f.read())
+            self.assertEqual(["out.csv"], os.listdir(directory))
+        finally:
+            shutil.rmtree(directory)
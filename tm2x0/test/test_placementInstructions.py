@@ -1,7 +1,10 @@
 import logging
 from unittest import TestCase
 from decimal import Decimal
-from tm2x0.instructions import represent_decimal, Instruction, PlacementInstructions
+from tm2x0.instructions import represent_decimal, Instruction, PlacementInstructions, parse_line, Blank,\
+    iter_instructions, write_csv, Comment, \
+    SpeedInstruction, OriginOffsetInstruction, StackOffsetInstruction, FeedSpacingInstruction, \
+    PanelizedBoardInstruction, PartPlacementInstruction
 from testfixtures import log_capture, LogCapture
 from StringIO import StringIO
 
@@ -41,6 +44,36 @@ class TestWhatIWillDoForCoverage(TestCase):
             pi = PlacementInstructions.from_string("655535,69,69,69,69")
 
 
+class TestParseLine(TestCase):
+    def test_dispatch(self):
+        self.assertIsInstance(parse_line(''), Blank)
+        self.assertIsInstance(parse_line('%,Head,Stack'), Comment)
+        self.assertIsInstance(parse_line('0,100,0,0,0,0,0,0,'), SpeedInstruction)
+        self.assertIsInstance(parse_line('65535,0,0,0,,'), OriginOffsetInstruction)
+        self.assertIsInstance(parse_line('65535,1,1,-0.04,-0.1,0603'), StackOffsetInstruction)
+        self.assertIsInstance(parse_line('65535,2,1,4,'), FeedSpacingInstruction)
+        self.assertIsInstance(parse_line('65535,3,1,0,0,0,0,0,'), PanelizedBoardInstruction)
+        self.assertIsInstance(parse_line('1,1,1,4,22,-45,1,0,LED7,-LED-805'), PartPlacementInstruction)
+        self.assertIsInstance(parse_line('65534,1,1,4,22,-45,1,0,LED7,-LED-805'), PartPlacementInstruction)
+
+    def test_comment_keeps_commas(self):
+        self.assertEqual(',StackOffsetCommand,Stack', parse_line('%,StackOffsetCommand,Stack').comment)
+
+    def test_unknown_subflag(self):
+        with self.assertRaises(NotImplementedError):
+            parse_line('65535,4,0,0,,')
+
+    def test_negative_flag(self):
+        with self.assertRaises(NotImplementedError):
+            parse_line('-1,1,1,4,22,-45,1,0,,')
+
+    def test_matches_from_tokens(self):
+        for cls, line in ((StackOffsetInstruction, '65535,1,2,1.9,1.3,what up'),
+                          (PanelizedBoardInstruction, '65535,3,35,100.9,1,0,0,0,'),
+                          (PartPlacementInstruction, '15,2,234,123.3,1,0,1,0,U1,P18F4520')):
+            self.assertEqual(cls.from_tokens(line.split(',')).to_csv(), parse_line(line).to_csv())
+
+
 class TestPlacementInstructions(TestCase):
     def test_from_string_only_comments(self):
         s = """%This is the first comment.
@@ -145,3 +178,33 @@ PARSE ERROR NOT IN YOUR FAVOR"""
         f = StringIO(s)
         p = PlacementInstructions.from_file(f)
         self.assertEqual(p.get_copies(), [])
+
+
+class TestStreaming(TestCase):
+    s = """%,Head,Stack,X,Y,R,H,skip,Ref,Comment,
+65535,0,0,0,,
+65535,1,1,-0.04,-0.1,0603
+65535,2,1,4,
+
+1,1,1,4,22,-45,1,0,LED7,-LED-805
+2,2,1,4,19,-45,1,0,LED8,-LED-805"""
+
+    def test_iter_instructions_is_lazy(self):
+        f = StringIO(self.s + "\nPARSE ERROR NOT IN YOUR FAVOR")
+        instructions = iter_instructions(f)
+        # Nothing past the first line has been parsed yet, so the bad last line doesn't raise.
+        self.assertEqual(",Head,Stack,X,Y,R,H,skip,Ref,Comment,", next(instructions).comment)
+        self.assertIsInstance(next(instructions), OriginOffsetInstruction)
+        with self.assertRaises(ValueError):
+            list(instructions)
+
+    def test_write_csv_matches_to_csv(self):
+        out = StringIO()
+        write_csv(out, iter_instructions(StringIO(self.s)))
+        self.assertEqual(self.s, out.getvalue())
+        self.assertEqual(PlacementInstructions.from_string(self.s).to_csv(), out.getvalue())
+
+    def test_write_csv_line_ending(self):
+        out = StringIO()
+        write_csv(out, PlacementInstructions.from_string(self.s), line_ending="\r\n")
+        self.assertEqual(self.s.replace("\n", "\r\n"), out.getvalue())
@@ -0,0 +1,85 @@
+from StringIO import StringIO
+from unittest import TestCase
+import os
+import shutil
+import tempfile
+
+from tm2x0 import profiling
+from tm2x0.batch import ReelMap, convert, convert_many
+from tm2x0.test.test_batch import sample_reel_map
+from tm2x0.test.test_placementCLI import sample_kicad_pos
+
+
+class TestProfiler(TestCase):
+    def tearDown(self):
+        profiling.disable()
+
+    def test_disabled(self):
+        self.assertEqual(None, profiling.current())
+        with profiling.stage("parse"):
+            profiling.count("parts", 3)
+        items = [1, 2]
+        self.assertTrue(profiling.iterate("generate", items) is items)
+
+    def test_stages_and_counters(self):
+        profiler = profiling.enable()
+        with profiling.stage("export"):
+            with profiling.stage("parse"):
+                pass
+            list(profiling.iterate("generate", [1, 2, 3]))
+        with profiling.stage("parse"):
+            profiling.count("parts", 3)
+        profiling.count("parts")
+        self.assertEqual(2, profiler.stages["parse"][1])
+        self.assertEqual(4, profiler.stages["generate"][1])
+        self.assertEqual(1, profiler.stages["export"][1])
+        self.assertEqual({"parts": 4}, profiler.counters)
+        self.assertEqual(["export", "parse", "generate"], [name for name, _ in profiler.data()["stages"]])
+
+    def test_nested_stages_not_counted_twice(self):
+        times = iter([0.0, 10.0, 12.0, 15.0])
+        profiler = profiling.Profiler(clock=lambda: next(times))
+        with profiler.stage("outer"):
+            with profiler.stage("inner"):
+                pass
+        self.assertEqual([2.0, 1], profiler.stages["inner"])
+        self.assertEqual([13.0, 1], profiler.stages["outer"])
+
+    def test_merge(self):
+        worker = profiling.Profiler()
+        worker.add("parse", 1.5)
+        worker.count("parts", 2)
+        profiler = profiling.Profiler()
+        profiler.add("parse", 0.5)
+        profiler.merge(worker.data())
+        self.assertEqual([2.0, 2], profiler.stages["parse"])
+        self.assertEqual({"parts": 2}, profiler.counters)
+
+
+class TestProfiledConversion(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        for name in ("a.pos", "b.pos"):
+            with open(os.path.join(self.directory, name), 'w') as f:
+                f.write(sample_kicad_pos)
+        self.reel_map = ReelMap.from_file(StringIO(sample_reel_map))
+
+    def tearDown(self):
+        profiling.disable()
+        shutil.rmtree(self.directory)
+
+    def test_convert(self):
+        profiler = profiling.enable()
+        convert(os.path.join(self.directory, "a.pos"), self.reel_map,
+                output_filename=os.path.join(self.directory, "a.csv"))
+        for name in ("kicad_parse", "assign", "generate", "csv_export"):
+            self.assertTrue(name in profiler.stages, name)
+        self.assertEqual(4, profiler.counters["parts"])
+        self.assertTrue("total" in profiler.report())
+
+    def test_convert_many_merges_workers(self):
+        profiler = profiling.enable()
+        kicad_files = [os.path.join(self.directory, name) for name in ("a.pos", "b.pos")]
+        convert_many(kicad_files, self.reel_map, processes=2)
+        self.assertEqual(2, profiler.stages["kicad_parse"][1])
+        self.assertEqual(8, profiler.counters["parts"])
@@ -0,0 +1,74 @@
+from unittest import TestCase
+
+from tm2x0.instructions import PlacementInstructions
+from tm2x0.machine import MachineProfile
+from tm2x0.simulate import CycleTimeModel, simulate, move_time
+
+
+class TestMoveTime(TestCase):
+    def test_reaches_top_speed(self):
+        # 0.1 s speeding up over 25 mm, 0.1 s slowing down over 25 mm, and 50 mm at 500 mm/s in between.
+        self.assertAlmostEqual(0.3, move_time(100, 0, 500, 5000))
+
+    def test_short_move(self):
+        self.assertAlmostEqual(0.2, move_time(0, -50, 500, 5000))
+        self.assertAlmostEqual(0.0, move_time(0, 0, 500, 5000))
+
+    def test_axes_move_together(self):
+        self.assertEqual(move_time(100, 0, 500, 5000), move_time(100, 60, 500, 5000))
+
+
+class TestSimulate(TestCase):
+    profile = MachineProfile(feeder_positions={1: (0, 0), 2: (0, 0)},
+                             home=(0, 0),
+                             speed=500.0,
+                             acceleration=5000.0,
+                             rotation_speed=90.0,
+                             pick_time=0.25,
+                             place_time=0.25)
+
+    s = """65535,0,0,0,,
+65535,3,0,0,0,0,0,0,
+65535,3,50,0,0,0,0,0,
+65535,3,100,0,1,0,0,0,
+1,1,1,100,0,90,0,0,,
+2,1,2,100,0,0,0,0,,
+3,1,2,100,0,0,0,1,,"""
+
+    def test_single_head(self):
+        cycle_time = simulate(PlacementInstructions.from_string(self.s), self.profile)
+        # Two trips out to 100 mm and back, the last one not coming back.
+        self.assertAlmostEqual(0.9, cycle_time.travel)
+        self.assertAlmostEqual(1.0, cycle_time.rotation)
+        self.assertAlmostEqual(1.0, cycle_time.pick)
+        self.assertEqual(2, cycle_time.trips)
+        self.assertAlmostEqual(2.9, cycle_time.board)
+        self.assertEqual(2, cycle_time.boards)
+        self.assertAlmostEqual(5.8, cycle_time.panel)
+
+    def test_dual_head(self):
+        model = CycleTimeModel(PlacementInstructions.from_string(self.s), self.profile)
+        cycle_time = model.evaluate(heads=[1, 2])
+        # Both picked at the feeder, then one trip out to the board.
+        self.assertAlmostEqual(0.3, cycle_time.travel)
+        self.assertEqual(1, cycle_time.trips)
+        self.assertEqual(cycle_time.travel, model.evaluate(heads=[1, 2]).travel)
+
+    def test_speed(self):
+        slow = simulate(PlacementInstructions.from_string("0,50,0,0,0,0,0,0,\n" + self.s), self.profile)
+        fast = simulate(PlacementInstructions.from_string(self.s), self.profile)
+        self.assertTrue(slow.travel > fast.travel)
+        self.assertEqual(slow.pick, fast.pick)
+
+    def test_zero_speed(self):
+        instructions = PlacementInstructions.from_string("0,0,0,0,0,0,0,0,\n" + self.s)
+        self.assertRaises(ValueError, CycleTimeModel, instructions, self.profile)
+
+    def test_order(self):
+        model = CycleTimeModel(PlacementInstructions.from_string(self.s), self.profile)
+        self.assertAlmostEqual(model.evaluate().travel, model.evaluate(order=[1, 0]).travel)
+
+    def test_default_feeders(self):
+        profile = MachineProfile(feeder_origin=(-20, 0), feeder_pitch=(0, 10))
+        self.assertEqual((-20, 30), profile.feeder_position(3))
+        self.assertEqual({0: (-20, 0), 1: (-20, 10)}, profile.all_feeder_positions([0, 1]))
@@ -0,0 +1,64 @@
+from math import hypot
+from unittest import TestCase
+import random
+
+from tm2x0.partplacement import PartPlacement
+from tm2x0.spatial import GridIndex
+
+
+class TestGridIndex(TestCase):
+    def setUp(self):
+        generator = random.Random(3)
+        self.xs = [generator.randint(0, 5000) for _ in range(300)]
+        self.ys = [generator.randint(-3000, 0) for _ in range(300)]
+        self.index = GridIndex(self.xs, self.ys)
+
+    def test_within(self):
+        expected = [i for i in range(300) if 1000 <= self.xs[i] <= 2500 and -2000 <= self.ys[i] <= -500]
+        self.assertEqual(expected, self.index.within(1000, -2000, 2500, -500))
+        self.assertEqual([], self.index.within(6000, 0, 7000, 100))
+
+    def test_within_distance(self):
+        expected = [i for i in range(300) if hypot(self.xs[i] - 2500, self.ys[i] + 1500) <= 700]
+        self.assertEqual(expected, self.index.within_distance(2500, -1500, 700))
+
+    def test_nearest(self):
+        for x, y in ((0, 0), (2500, -1500), (-4000, 9000)):
+            expected = min(hypot(self.xs[i] - x, self.ys[i] - y) for i in range(300))
+            self.assertEqual(expected, self.index.nearest(x, y)[0])
+
+    def test_remove_and_insert(self):
+        _, i = self.index.nearest(100, -100)
+        self.index.remove(i)
+        self.assertEqual(299, len(self.index))
+        self.assertNotEqual(i, self.index.nearest(100, -100)[1])
+        self.index.insert(i)
+        self.assertEqual(i, self.index.nearest(100, -100)[1])
+
+    def test_pairs_within(self):
+        expected = [(i, j) for i in range(300) for j in range(i + 1, 300)
+                    if hypot(self.xs[i] - self.xs[j], self.ys[i] - self.ys[j]) <= 150]
+        self.assertEqual(expected, self.index.pairs_within(150))
+
+    def test_points_in_a_line(self):
+        xs = range(0, 100000, 50)
+        ys = [0] * len(xs)
+        index = GridIndex(xs, ys)
+        # Cells sized by area would be the 1 hundredth minimum, and far too many for nearest().
+        self.assertTrue(index.cell > 2000)
+        self.assertEqual((20000.0, 1000), index.nearest(50000, -20000))
+        self.assertEqual([(i, i + 1) for i in range(len(xs) - 1)], index.pairs_within(50))
+
+    def test_empty(self):
+        index = GridIndex([], [])
+        self.assertEqual(None, index.nearest(0, 0))
+        self.assertEqual([], index.within(0, 0, 10, 10))
+        self.assertEqual([], index.pairs_within(10))
+
+    def test_coincident_parts(self):
+        parts = [PartPlacement(reference="R1", x=10, y=5),
+                 PartPlacement(reference="R2", x=20, y=5),
+                 PartPlacement(reference="R3", x=10, y=5)]
+        index = GridIndex.from_parts(parts)
+        self.assertEqual([(0, 2)], index.pairs_within(0))
+        self.assertEqual(["R2"], [parts[i].reference for i in index.within(1500, 0, 2500, 1000)])
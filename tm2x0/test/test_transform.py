@@ -0,0 +1,93 @@
+from unittest import TestCase, skipIf
+import random
+
+from tm2x0.kicad import KicadPartPositions
+from tm2x0.test.test_kicadPartPositions import TestKicadPartPositions
+from tm2x0.transform import BoardTransform, normalize_rotation
+from tm2x0 import vectorized
+from tm2x0.vectorized import VectorizedBoardTransform
+
+
+def summary(parts):
+    return [(part.reference, part.value, part.footprint, part.x_hundredths, part.y_hundredths, part.rotation)
+            for part in parts]
+
+
+def random_rows(count, seed=1):
+    generator = random.Random(seed)
+    rows = []
+    for index in range(count):
+        rows.append(["R{0}".format(index), "1K", "SM0805",
+                     "{0:.4f}".format(generator.uniform(-300, 300)),
+                     # Plenty of exact ties at the third decimal place.
+                     "{0:.3f}5".format(generator.randint(-300000, 300000) / 1000.0),
+                     "{0:.1f}".format(generator.choice([0, 45, 90, 180, 270, 359.5, 12.5])),
+                     "Front"])
+    return rows
+
+
+class TestBoardTransform(TestCase):
+    def test_normalize_rotation(self):
+        self.assertEqual([180, -90, 0, 90, 180, -179], [normalize_rotation(r) for r in (-180, 270, 360, -270, 540, 181)])
+
+    def test_origin_and_mirror(self):
+        transform = BoardTransform(origin=("100", "-50"), mirror=True)
+        self.assertEqual((-4173, -1452), transform.position("141.7320", "-64.5160"))
+        # KiCad 270 is -90 on the front, and 180 - -90 once flipped over.
+        self.assertEqual(-90, transform.rotation("270.0"))
+        self.assertEqual(180, transform.rotation("180.0"))
+
+    def test_turned_over(self):
+        back = BoardTransform(origin=("100", "-50")).turned_over("60")
+        # 141.732 is 41.732 mm from the origin, so 60 - 41.732 once the board's turned over.
+        self.assertEqual((1827, -1452), back.position("141.7320", "-64.5160"))
+        self.assertEqual(-90, back.rotation("270.0"))
+        self.assertEqual(False, back.turned_over("60").mirror)
+
+    def test_copies(self):
+        transform = BoardTransform(copies=[(0, 0), ("50.5", 0)])
+        parts = transform.parts(random_rows(3))
+        self.assertEqual(6, len(parts))
+        self.assertEqual([part.x_hundredths + 5050 for part in parts[:3]], [part.x_hundredths for part in parts[3:]])
+
+    def test_copies_while_parsing(self):
+        kpp = KicadPartPositions.from_string(TestKicadPartPositions.sample_mm,
+                                             transform=BoardTransform(copies=[(0, 0), (0, 100)]))
+        self.assertEqual(["C1", "D1", "R1", "U1"] * 2, [part.reference for part in kpp.instructions['Front']])
+
+    def test_back_transform(self):
+        transform = BoardTransform(origin=("100", "-50"))
+        kpp = KicadPartPositions.from_string(TestKicadPartPositions.sample_twosides_mm, transform=transform,
+                                             back_transform=transform.turned_over("60"))
+        self.assertEqual([(4173, -1452), (5659, -2798)],
+                         [(part.x_hundredths, part.y_hundredths) for part in kpp.instructions['Front']])
+        self.assertEqual([(1522, -1452), (2462, -1452)],
+                         [(part.x_hundredths, part.y_hundredths) for part in kpp.instructions['Back']])
+
+
+@skipIf(vectorized.numpy is None, "NumPy isn't installed")
+class TestVectorizedBoardTransform(TestCase):
+    def assertSameAsScalar(self, rows, **kwargs):
+        self.assertEqual(summary(BoardTransform(**kwargs).parts(rows)),
+                         summary(VectorizedBoardTransform(**kwargs).parts(rows)))
+
+    def test_same_as_scalar(self):
+        rows = random_rows(2000)
+        self.assertSameAsScalar(rows)
+        self.assertSameAsScalar(rows, units="in")
+        self.assertSameAsScalar(rows, origin=("12.345", "-6.78"), mirror=True,
+                                copies=[(x * 40, y * 30) for x in range(4) for y in range(5)])
+
+    def test_extra_decimal_places(self):
+        rows = [["R1", "1K", "SM0805", "1.234567", "-0.000051", "90", "Front"]]
+        self.assertSameAsScalar(rows)
+        self.assertSameAsScalar(rows, units="in")
+
+    def test_from_file(self):
+        for sample in (TestKicadPartPositions.sample_mm, TestKicadPartPositions.sample_in,
+                       TestKicadPartPositions.sample_twosides_mm):
+            scalar = KicadPartPositions.from_string(sample)
+            vector = KicadPartPositions.from_string(sample, vectorize=True)
+            self.assertEqual(sorted(scalar.instructions.keys()), sorted(vector.instructions.keys()))
+            for side in scalar.instructions:
+                self.assertEqual(summary(scalar.instructions[side]), summary(vector.instructions[side]))
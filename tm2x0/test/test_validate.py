@@ -0,0 +1,96 @@
+from unittest import TestCase
+
+from tm2x0.instructions import PlacementInstructions
+from tm2x0.machine import MACHINE_MODELS
+from tm2x0.partplacement import PartPlacement
+from tm2x0.placement import Placement
+from tm2x0.reel import Reel
+from tm2x0.validate import validate, footprint_extents, COINCIDENT, OVERLAP, INVALID_STACK, \
+    MISSING_STACK_OFFSET, MISSING_FEED_SPACING, OUT_OF_BED
+
+
+def kinds(problems):
+    return [problem.kind for problem in problems]
+
+
+class TestValidate(TestCase):
+    def test_clean_job(self):
+        s = """65535,0,0,0,,
+65535,1,1,0.05,0,0805
+65535,2,1,4,
+1,1,1,10,-10,0,0.5,0,R1,
+2,1,1,20,-10,0,0.5,0,R2,"""
+        self.assertEqual([], validate(PlacementInstructions.from_string(s), MACHINE_MODELS["TM240A"]))
+
+    def test_stacks(self):
+        s = """65535,0,0,0,,
+65535,1,1,0.05,0,0805
+1,1,1,10,-10,0,0.5,0,R1,
+2,1,99,20,-10,0,0.5,0,R2,"""
+        problems = validate(PlacementInstructions.from_string(s), MACHINE_MODELS["TM240A"])
+        self.assertEqual([MISSING_FEED_SPACING, INVALID_STACK], kinds(problems))
+        self.assertEqual("Reel 1 has parts (R1) but no feed spacing", str(problems[0]))
+        # Without a machine, any stack number from 0 up is allowed.
+        problems = validate(PlacementInstructions.from_string(s))
+        self.assertEqual([MISSING_FEED_SPACING, MISSING_STACK_OFFSET, MISSING_FEED_SPACING], kinds(problems))
+
+    def test_out_of_bed(self):
+        s = """65535,0,250,0,,
+65535,1,1,0.05,0,0805
+65535,2,1,4,
+1,1,1,10,-10,0,0.5,0,R1,
+2,1,1,60,-10,0,0.5,0,R2,"""
+        problems = validate(PlacementInstructions.from_string(s), MACHINE_MODELS["TM240A"])
+        self.assertEqual([OUT_OF_BED], kinds(problems))
+        self.assertEqual("R2 at (310 mm, -10 mm) is outside the TM240A's bed", str(problems[0]))
+
+    def test_coincident_across_panel_copies(self):
+        # The second copy is only 10 mm along, so R1 on it lands on R2 on the first.
+        s = """65535,0,0,0,,
+65535,3,0,0,0,0,0,0,
+65535,3,10,0,0,0,0,0,
+65535,3,20,0,1,0,0,0,
+65535,1,1,0.05,0,0805
+65535,2,1,4,
+1,1,1,10,-10,0,0.5,0,R1,
+2,1,1,20,-10,0,0.5,0,R2,"""
+        problems = validate(PlacementInstructions.from_string(s))
+        self.assertEqual([COINCIDENT], kinds(problems))
+        self.assertEqual("R2 on copy 1, R1 on copy 2 are all placed at (20 mm, -10 mm)", str(problems[0]))
+
+    def test_overlap_uses_footprints(self):
+        placement = Placement(reels={1: Reel(1, stack_x_offset=0, stack_y_offset=0, feed_spacing=4, height=0.5)})
+        placement.assign_part_to_reel(PartPlacement("R1", 10, -10, footprint="SM0805"), 1)
+        placement.assign_part_to_reel(PartPlacement("R2", 11.5, -10, footprint="SM0805"), 1)
+        # Turned, R3 is 1.25 mm wide, so it clears R2.
+        placement.assign_part_to_reel(PartPlacement("R3", 13.2, -10, rotation=90, footprint="SM0805"), 1)
+        placement.assign_part_to_reel(PartPlacement("U1", 11.5, -10.5, footprint="Mystery"), 1)
+        problems = validate(placement)
+        self.assertEqual([OVERLAP], kinds(problems))
+        self.assertEqual("R1 overlaps R2", str(problems[0]))
+
+    def test_overlap_from_csv_uses_stack_comments(self):
+        # The part rows have no comments, so footprints come from their stacks'.
+        s = """65535,0,0,0,,
+65535,1,1,0.05,0,10k SM0805
+65535,1,2,0.05,0,Mystery
+65535,2,1,4,
+65535,2,2,4,
+1,1,1,10,-10,0,0.5,0,R1,
+2,1,1,11.5,-10,0,0.5,0,R2,
+3,1,1,13.2,-10,90,0.5,0,R3,
+4,1,2,11.5,-10.5,0,0.5,0,U1,"""
+        problems = validate(PlacementInstructions.from_string(s))
+        self.assertEqual([OVERLAP], kinds(problems))
+        self.assertEqual("R1 overlaps R2", str(problems[0]))
+
+    def test_footprint_extents(self):
+        self.assertEqual((2.0, 1.25), footprint_extents("SM0805-SS"))
+        self.assertEqual((2.9, 1.3), footprint_extents("SOT-23"))
+        self.assertEqual((6.5, 3.5), footprint_extents("SOT-223-3_TabPin2"))
+        # KiCad names the metric size after the imperial one.
+        self.assertEqual((0.6, 0.3), footprint_extents("C_0201_0603Metric"))
+        self.assertEqual((1.6, 0.8), footprint_extents("R_0603_1608Metric"))
+        self.assertEqual((1.0, 0.5), footprint_extents("Capacitor_SMD:C_0402_1005Metric"))
+        self.assertEqual(None, footprint_extents("QFN32"))
+        self.assertEqual(None, footprint_extents(None))
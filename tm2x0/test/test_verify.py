@@ -0,0 +1,78 @@
+from StringIO import StringIO
+from unittest import TestCase
+
+from tm2x0.batch import ReelMap, fill_reel_defaults
+from tm2x0.instructions import PlacementInstructions, PartPlacementInstruction
+from tm2x0.kicad import KicadPartPositions
+from tm2x0.panel import PanelLayout
+from tm2x0.placement import Placement
+from tm2x0.test.test_batch import sample_reel_map
+from tm2x0.test.test_kicadPartPositions import TestKicadPartPositions
+from tm2x0.test.test_placementCLI import sample_kicad_pos
+from tm2x0.verify import verify, rotation_difference, MISSING, UNEXPECTED, WRONG_SIDE, SKIPPED, NO_REFERENCE, \
+    POSITION, ROTATION, WRONG_REEL, DUPLICATE
+
+
+class TestVerify(TestCase):
+    def setUp(self):
+        self.reel_map = ReelMap.from_file(StringIO(sample_reel_map))
+        self.parts = KicadPartPositions.from_string(sample_kicad_pos).instructions['Front']
+
+    def generate(self, panel=None):
+        placement = Placement(panel=panel, expand_panel=panel is not None)
+        self.assertEqual([], self.reel_map.assign(placement, self.parts))
+        fill_reel_defaults(placement)
+        return placement.generate_instructions()
+
+    def rows(self, instructions):
+        return dict((row.reference, row) for row in instructions if isinstance(row, PartPlacementInstruction))
+
+    def kinds(self, instructions, **kwargs):
+        return sorted(problem.kind for problem in verify(instructions, self.parts, self.reel_map, **kwargs))
+
+    def test_generated_instructions_check_out(self):
+        instructions = self.generate()
+        self.assertEqual([], self.kinds(instructions))
+        # R2 is at -90 degrees, but its reel is turned 90, which the check has to allow for.
+        self.assertEqual(0, self.rows(instructions)["R2"].rotation)
+
+    def test_through_csv(self):
+        instructions = PlacementInstructions.from_string(self.generate().to_csv())
+        self.assertEqual([], self.kinds(instructions))
+
+    def test_mismatches(self):
+        instructions = self.generate()
+        rows = self.rows(instructions)
+        rows["R1"].x_hundredths += 5
+        rows["R2"].rotation += 90
+        rows["R3"].stack = 2
+        rows["D1"].skip = True
+        self.assertEqual([POSITION, ROTATION, SKIPPED, WRONG_REEL], self.kinds(instructions))
+        self.assertEqual([SKIPPED, WRONG_REEL], self.kinds(instructions, tolerance="0.05", rotation_tolerance=90))
+
+    def test_missing_and_extra_rows(self):
+        instructions = self.generate()
+        rows = self.rows(instructions)
+        rows["R1"].reference = "R9"
+        rows["R2"].reference = "R3"
+        rows["D1"].reference = ""
+        kinds = self.kinds(instructions)
+        self.assertEqual([DUPLICATE, MISSING, MISSING, MISSING, NO_REFERENCE, UNEXPECTED], kinds)
+
+    def test_other_side(self):
+        instructions = self.generate()
+        self.rows(instructions)["R1"].reference = "U1"
+        back = KicadPartPositions.from_string(TestKicadPartPositions.sample_twosides_mm).instructions['Back']
+        self.assertEqual([MISSING, WRONG_SIDE], self.kinds(instructions, other_side=back))
+
+    def test_expanded_panel(self):
+        panel = PanelLayout(2, 3, "30", "40", skip=[(0, 1)], rotations={(1, 2): 180})
+        instructions = self.generate(panel)
+        self.assertEqual(20, len(self.rows(instructions)))
+        self.assertEqual([], self.kinds(instructions, panel=panel))
+        self.assertEqual([MISSING] * 4, self.kinds(instructions, panel=PanelLayout(2, 3, "30", "40",
+                                                                                   rotations={(1, 2): 180})))
+
+    def test_rotation_difference(self):
+        self.assertEqual([0, 90, 180, 10], [rotation_difference(a, b) for a, b in
+                                            ((270, -90), (0, 90), (180, 0), (-175, 175))])
@@ -0,0 +1,99 @@
+"""Turning rows of a KiCad .pos file into PartPlacements.
+
+A BoardTransform converts the positions to hundredths of a millimetre, moves them so the board
+origin is at (0, 0), mirrors back side boards, turns KiCad's clockwise rotation into the
+machine's counterclockwise rotation between -180 and 180, and repeats the board for each panel
+copy.  tm2x0.vectorized does the same thing with NumPy arrays, with the same results."""
+
+from decimal import Decimal
+
+from tm2x0.fixedpoint import to_hundredths
+from tm2x0.partplacement import PartPlacement
+
+INCH = Decimal("25.4")
+
+
+def normalize_rotation(rotation):
+    """Brings a rotation in degrees into (-180, 180]."""
+    rotation %= 360
+    if rotation > 180:
+        rotation -= 360
+    return rotation
+
+
+def kicad_rotation(token, mirror=False):
+    # KiCad rotation is clockwise, from 0 to 360.
+    #PartPlacement rotation is counterclockwise, from -180 to 180.
+    #Kicad rotation is from "normal orientation"
+    #PartPlacement rotation is from how it comes on the reel!
+    #We're going to assume that Kicad rotation refers to rotation from reel norm.
+    rotation = int(180 - float(token))
+    if mirror:
+        # Flipping the board over left to right turns an angle a into 180 - a.
+        rotation = 180 - rotation
+    return normalize_rotation(rotation)
+
+
+class BoardTransform():
+    """How to place one side of a KiCad board on the machine.
+
+    units is "mm" or "in" (None is mm).  origin is the KiCad position, in mm, that becomes
+    (0, 0).  mirror flips the board over left to right, around the origin, for parts on the
+    back.  copies is a list of (x, y) offsets in mm, one per board on the panel; by default
+    there's one board, where it is."""
+
+    def __init__(self, units="mm", origin=(0, 0), mirror=False, copies=None):
+        self.units = units
+        self.origin = origin
+        self.mirror = mirror
+        self.copies = copies
+
+    def turned_over(self, board_width):
+        """The transform for the other side of the same board, flipped left to right so that the
+        edge board_width mm to the right of the origin ends up at the origin."""
+        origin = (Decimal(str(self.origin[0])) + Decimal(str(board_width)), self.origin[1])
+        return self.__class__(units=self.units, origin=origin, mirror=not self.mirror, copies=self.copies)
+
+    def to_hundredths(self, token):
+        if self.units == "in":
+            return to_hundredths(Decimal(token) * INCH)
+        return to_hundredths(token)
+
+    def origin_hundredths(self):
+        return to_hundredths(self.origin[0]), to_hundredths(self.origin[1])
+
+    def copy_offsets(self):
+        """The panel copies as offsets in hundredths of a millimetre."""
+        if not self.copies:
+            return [(0, 0)]
+        return [(to_hundredths(x), to_hundredths(y)) for x, y in self.copies]
+
+    def position(self, x_token, y_token):
+        """The board position of a part, in hundredths of a millimetre, before any panel copy offset."""
+        origin_x, origin_y = self.origin_hundredths()
+        x = self.to_hundredths(x_token) - origin_x
+        y = self.to_hundredths(y_token) - origin_y
+        if self.mirror:
+            x = -x
+        return x, y
+
+    def rotation(self, token):
+        return kicad_rotation(token, self.mirror)
+
+    def parts(self, rows):
+        """Returns a PartPlacement for every row on every copy, all of the first copy, then the second and so on.
+
+        Each row is the whitespace separated tokens of a part line: reference, value, footprint, x,
+        y, rotation and side."""
+        positions = [self.position(row[3], row[4]) for row in rows]
+        rotations = [self.rotation(row[5]) for row in rows]
+        out = []
+        for copy_x, copy_y in self.copy_offsets():
+            for row, (x, y), rotation in zip(rows, positions, rotations):
+                out.append(PartPlacement.from_hundredths(reference=row[0],
+                                                         value=row[1],
+                                                         footprint=row[2],
+                                                         x=x + copy_x,
+                                                         y=y + copy_y,
+                                                         rotation=rotation))
+        return out
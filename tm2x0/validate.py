@@ -0,0 +1,237 @@
+"""Checking a job for mistakes before it goes to the machine.
+
+validate() looks for:
+
+    parts placed on top of each other, on the same board or on neighbouring panel copies
+    parts whose footprints overlap, for footprints with a known size
+    parts on stacks the machine doesn't have
+    stacks with parts but no stack offset or feed spacing rows
+    parts outside the area the machine can place in
+
+Every part is checked on every copy of the board that isn't skipped.  Positions are hashed
+to find parts in the same place and bucketed in a GridIndex to find overlapping ones, so big
+panels don't take quadratic time."""
+
+from math import hypot
+
+from tm2x0.fixedpoint import to_hundredths
+from tm2x0.instructions import PlacementInstructions, OriginOffsetInstruction, PanelizedBoardInstruction, \
+    StackOffsetInstruction, FeedSpacingInstruction, PartPlacementInstruction, describe_stack
+from tm2x0.spatial import GridIndex
+
+COINCIDENT = "coincident"
+OVERLAP = "overlap"
+INVALID_STACK = "invalid stack"
+MISSING_STACK_OFFSET = "missing stack offset"
+MISSING_FEED_SPACING = "missing feed spacing"
+OUT_OF_BED = "out of bed"
+
+# Footprint body sizes, (length, width) in mm, by a name found in the footprint, ignoring case,
+# dashes and underscores.  The match that starts earliest in the footprint wins, and the longest
+# of those, so KiCad's C_0201_0603Metric is an 0201 and SOT-223 isn't a SOT-23.
+FOOTPRINT_EXTENTS = (("SOT223", (6.5, 3.5)),
+                     ("SOT23", (2.9, 1.3)),
+                     ("SOIC8", (4.9, 3.9)),
+                     ("SO8", (4.9, 3.9)),
+                     ("SOIC14", (8.65, 3.9)),
+                     ("SO14", (8.65, 3.9)),
+                     ("2512", (6.4, 3.2)),
+                     ("1210", (3.2, 2.5)),
+                     ("1206", (3.2, 1.6)),
+                     ("0805", (2.0, 1.25)),
+                     ("0603", (1.6, 0.8)),
+                     ("0402", (1.0, 0.5)),
+                     ("0201", (0.6, 0.3)),
+)
+
+
+class Problem():
+    def __init__(self, kind, message):
+        self.kind = kind
+        self.message = message
+
+    def __str__(self):
+        return self.message
+
+    def __repr__(self):
+        return "<Problem {0}: {1}>".format(self.kind, self.message)
+
+
+def footprint_extents(footprint):
+    """The (length, width) in mm of a footprint's body, or None if it isn't known."""
+    if not footprint:
+        return None
+    name = str(footprint).upper().replace("-", "").replace("_", "")
+    best = None
+    for pattern, extents in FOOTPRINT_EXTENTS:
+        position = name.find(pattern)
+        if position >= 0 and (best is None or (position, -len(pattern)) < best[0]):
+            best = ((position, -len(pattern)), extents)
+    return best[1] if best is not None else None
+
+
+def half_extents(footprint, rotation):
+    """Half the width and height, in hundredths of a millimetre, of the box a part covers once
+    it's rotated, or None if its footprint's size isn't known."""
+    extents = footprint_extents(footprint)
+    if extents is None:
+        return None
+    length, width = to_hundredths(extents[0]), to_hundredths(extents[1])
+    if rotation % 180 == 0:
+        return length / 2.0, width / 2.0
+    if rotation % 90 == 0:
+        return width / 2.0, length / 2.0
+    # At any other angle, the box around the circle the part sweeps is big enough.
+    radius = hypot(length, width) / 2.0
+    return radius, radius
+
+
+def _mm(hundredths):
+    return "{0:g}".format(hundredths / 100.0)
+
+
+class _Job():
+    """The rows of a job that matter for validation, with every part placed on every copy."""
+
+    def __init__(self, instructions, parts=None):
+        origin = (0, 0)
+        copies = []
+        rows = []
+        self.stack_offsets = set()
+        self.feed_spacings = set()
+        stack_comments = {}
+        for instruction in instructions:
+            if isinstance(instruction, PartPlacementInstruction):
+                if not instruction.skip:
+                    rows.append(instruction)
+            elif isinstance(instruction, StackOffsetInstruction):
+                self.stack_offsets.add(instruction.stack)
+                stack_comments[instruction.stack] = instruction.comment
+            elif isinstance(instruction, FeedSpacingInstruction):
+                self.feed_spacings.add(instruction.stack)
+            elif isinstance(instruction, PanelizedBoardInstruction):
+                if not instruction.skip:
+                    copies.append((instruction.x_hundredths, instruction.y_hundredths))
+            elif isinstance(instruction, OriginOffsetInstruction):
+                origin = (instruction.x_hundredths, instruction.y_hundredths)
+        if not copies:
+            copies = [(0, 0)]
+        self.rows = rows
+
+        self.names = []
+        half = []
+        for row in rows:
+            part = parts[row.part_number - 1] if parts is not None else None
+            if part is not None:
+                self.names.append(part.reference or "Part #{0}".format(row.part_number))
+                half.append(half_extents(part.footprint, part.rotation))
+            else:
+                self.names.append(row.reference or "Part #{0}".format(row.part_number))
+                # Without the parts, the comments are the only hint of the footprint: the row's
+                # own, or else its stack's, which names the footprint for reels set up from a reel
+                # map ("0805", or "value footprint").  The row's rotation includes the reel's,
+                # which is usually a multiple of 90 degrees anyway.
+                extents = half_extents(row.comment, row.rotation)
+                if extents is None:
+                    extents = half_extents(stack_comments.get(row.stack), row.rotation)
+                half.append(extents)
+
+        # Each part on each copy, copy by copy.
+        self.xs = []
+        self.ys = []
+        self.half = []
+        self.row_index = []
+        self.copy_number = []
+        for copy_number, (copy_x, copy_y) in enumerate(copies, 1):
+            for index, row in enumerate(rows):
+                self.xs.append(origin[0] + copy_x + row.x_hundredths)
+                self.ys.append(origin[1] + copy_y + row.y_hundredths)
+                self.half.append(half[index])
+                self.row_index.append(index)
+                self.copy_number.append(copy_number)
+        self.copies = len(copies)
+
+    def name(self, point):
+        name = self.names[self.row_index[point]]
+        if self.copies > 1:
+            return "{0} on copy {1}".format(name, self.copy_number[point])
+        return name
+
+
+def _check_stacks(job, model):
+    out = []
+    stacks = {}
+    for index, row in enumerate(job.rows):
+        stacks.setdefault(row.stack, []).append(job.names[index])
+    for stack in sorted(stacks):
+        names = ", ".join(stacks[stack])
+        if stack < 0 or (model is not None and not model.has_stack(stack)):
+            limit = " on a {0}, which has stacks 0 to {1}".format(model.name, model.stacks) if model else ""
+            out.append(Problem(INVALID_STACK, "There's no stack {0}{1}, for {2}".format(stack, limit, names)))
+            continue
+        if stack not in job.stack_offsets:
+            out.append(Problem(MISSING_STACK_OFFSET, "{0} has parts ({1}) but no stack offset".format(
+                describe_stack(stack), names)))
+        if stack not in job.feed_spacings:
+            out.append(Problem(MISSING_FEED_SPACING, "{0} has parts ({1}) but no feed spacing".format(
+                describe_stack(stack), names)))
+    return out
+
+
+def _check_bed(job, model):
+    out = []
+    min_x, min_y, max_x, max_y = [to_hundredths(limit) for limit in model.bed]
+    for point in range(len(job.xs)):
+        x, y = job.xs[point], job.ys[point]
+        if not (min_x <= x <= max_x and min_y <= y <= max_y):
+            out.append(Problem(OUT_OF_BED, "{0} at ({1} mm, {2} mm) is outside the {3}'s bed".format(
+                job.name(point), _mm(x), _mm(y), model.name)))
+    return out
+
+
+def _check_coincident(job):
+    out = []
+    positions = {}
+    for point in range(len(job.xs)):
+        positions.setdefault((job.xs[point], job.ys[point]), []).append(point)
+    for (x, y), points in sorted(positions.items(), key=lambda item: item[1][0]):
+        if len(points) > 1:
+            out.append(Problem(COINCIDENT, "{0} are all placed at ({1} mm, {2} mm)".format(
+                ", ".join(job.name(point) for point in points), _mm(x), _mm(y))))
+    return out
+
+
+def _check_overlap(job):
+    out = []
+    sized = [point for point in range(len(job.xs)) if job.half[point] is not None]
+    if len(sized) < 2:
+        return out
+    # No two parts further apart than the biggest two boxes' diagonals can overlap.
+    reach = 2 * max(hypot(*job.half[point]) for point in sized)
+    index = GridIndex(job.xs, job.ys, sized)
+    for a, b in index.pairs_within(reach):
+        if job.xs[a] == job.xs[b] and job.ys[a] == job.ys[b]:
+            # Already reported as coincident.
+            continue
+        (ax, ay), (bx, by) = job.half[a], job.half[b]
+        if abs(job.xs[a] - job.xs[b]) < ax + bx and abs(job.ys[a] - job.ys[b]) < ay + by:
+            out.append(Problem(OVERLAP, "{0} overlaps {1}".format(job.name(a), job.name(b))))
+    return out
+
+
+def validate(instructions, model=None):
+    """Returns a list of Problems with instructions, a PlacementInstructions or anything else
+    that iterates over instructions, or a Placement, whose instructions are generated first.
+    With model, a MachineModel, stack numbers and positions are checked against the machine."""
+    parts = None
+    if not isinstance(instructions, PlacementInstructions) and hasattr(instructions, 'generate_instructions'):
+        placement = instructions
+        instructions = placement.generate_instructions()
+        parts = placement.generated_parts
+    job = _Job(instructions, parts)
+    out = _check_stacks(job, model)
+    if model is not None:
+        out.extend(_check_bed(job, model))
+    out.extend(_check_coincident(job))
+    out.extend(_check_overlap(job))
+    return out
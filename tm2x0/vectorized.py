@@ -0,0 +1,87 @@
+"""BoardTransform on NumPy arrays, for big boards and panels.
+
+NumPy is optional.  Without it, VectorizedBoardTransform falls back to the plain BoardTransform.
+
+Positions are read as integer ten-thousandths of the file's unit, which is as precise as KiCad
+writes them, and rounded to hundredths of a millimetre with integer arithmetic, so the results
+match the scalar path exactly.  Rows with more decimal places than that go through the scalar
+path instead."""
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from tm2x0.partplacement import PartPlacement
+from tm2x0.transform import BoardTransform
+
+# KiCad positions are read in units of 10^-4 of the file's unit.  An inch of those is
+# 254000 units of 10^-5 mm.
+SCALE = 10000
+INCH_FACTOR = 254
+INCH_DIVISOR = 1000
+MM_DIVISOR = 100
+
+
+def round_half_even_divide(n, divisor):
+    """n / divisor for an integer array, rounded half to even like Decimal.quantize."""
+    quotient = n // divisor
+    remainder = n - quotient * divisor
+    up = (2 * remainder > divisor) | ((2 * remainder == divisor) & (quotient % 2 == 1))
+    return quotient + up
+
+
+class VectorizedBoardTransform(BoardTransform):
+    @classmethod
+    def from_transform(cls, transform):
+        return cls(units=transform.units, origin=transform.origin, mirror=transform.mirror,
+                   copies=transform.copies)
+
+    def to_hundredths_array(self, tokens):
+        """Returns an array of hundredths, and a mask of the tokens it couldn't convert exactly."""
+        values = numpy.array(tokens, dtype=numpy.float64) * SCALE
+        scaled = numpy.round(values)
+        inexact = numpy.abs(values - scaled) > 1e-3
+        n = scaled.astype(numpy.int64)
+        if self.units == "in":
+            return round_half_even_divide(n * INCH_FACTOR, INCH_DIVISOR), inexact
+        return round_half_even_divide(n, MM_DIVISOR), inexact
+
+    def arrays(self, rows):
+        """Returns x, y and rotation arrays for rows, with a row of parts for each copy on the panel.
+        x and y are in hundredths of a millimetre."""
+        origin_x, origin_y = self.origin_hundredths()
+        xs, inexact_x = self.to_hundredths_array([row[3] for row in rows])
+        ys, inexact_y = self.to_hundredths_array([row[4] for row in rows])
+        for index in numpy.flatnonzero(inexact_x | inexact_y):
+            xs[index] = BoardTransform.to_hundredths(self, rows[index][3])
+            ys[index] = BoardTransform.to_hundredths(self, rows[index][4])
+        xs -= origin_x
+        ys -= origin_y
+        if self.mirror:
+            xs = -xs
+
+        rotations = numpy.trunc(180 - numpy.array([row[5] for row in rows], dtype=numpy.float64))
+        rotations = rotations.astype(numpy.int64)
+        if self.mirror:
+            rotations = 180 - rotations
+        rotations %= 360
+        rotations[rotations > 180] -= 360
+
+        offsets = numpy.array(self.copy_offsets(), dtype=numpy.int64)
+        return offsets[:, 0:1] + xs, offsets[:, 1:2] + ys, numpy.tile(rotations, (len(offsets), 1))
+
+    def parts(self, rows):
+        if numpy is None or not rows:
+            return BoardTransform.parts(self, rows)
+        all_x, all_y, all_rotations = self.arrays(rows)
+        # Only one copy's rotations are needed, since they're the same on every copy.
+        rotations = all_rotations[0].tolist()
+
+        out = []
+        append = out.append
+        from_hundredths = PartPlacement.from_hundredths
+        for copy_x, copy_y in zip(all_x.tolist(), all_y.tolist()):
+            for row, x, y, rotation in zip(rows, copy_x, copy_y, rotations):
+                append(from_hundredths(row[0], x, y, rotation, footprint=row[2], value=row[1]))
+        return out
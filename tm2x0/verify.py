@@ -0,0 +1,123 @@
+"""Checking a machine CSV file against the KiCad .pos file it was made from.
+
+verify() works out where each part on one side of the board should end up, from its position
+in the .pos file and its reel's rotation in the reel map, and finds the CSV row with the same
+reference.  Parts and rows are both put in dicts by reference, so matching them is a pass over
+each, however big the panel.  It reports:
+
+    parts with no row, or with more than one
+    rows for parts on the other side of the board, or for no part at all
+    skipped rows
+    parts placed too far from where they should be, or turned the wrong way
+    parts on a different reel from the one the reel map gives
+
+Each row needs its part's reference, so files written before generated instructions carried
+references can't be checked."""
+
+from tm2x0.fixedpoint import to_hundredths
+from tm2x0.instructions import PartPlacementInstruction
+from tm2x0.validate import Problem
+
+MISSING = "missing"
+DUPLICATE = "duplicate"
+UNEXPECTED = "unexpected"
+WRONG_SIDE = "wrong side"
+SKIPPED = "skipped"
+NO_REFERENCE = "no reference"
+POSITION = "position"
+ROTATION = "rotation"
+WRONG_REEL = "wrong reel"
+
+
+def _mm(hundredths):
+    return "{0:g}".format(hundredths / 100.0)
+
+
+def rotation_difference(a, b):
+    """How many degrees apart two rotations are, between 0 and 180."""
+    difference = (a - b) % 360
+    return min(difference, 360 - difference)
+
+
+def parts_by_reference(parts, panel=None):
+    """parts in a dict by reference, on every copy of panel if it's given, the way the expanded
+    panel names them.  Also returns the references seen more than once."""
+    if panel is not None:
+        parts = panel.expand(parts)
+    out = {}
+    repeated = set()
+    for part in parts:
+        if part.reference in out:
+            repeated.add(part.reference)
+        out[part.reference] = part
+    return out, repeated
+
+
+def verify(instructions, parts, reel_map=None, other_side=(), panel=None, tolerance="0.01", rotation_tolerance=0):
+    """Returns a list of Problems with how instructions place parts, the PartPlacements for one
+    side of the board as KicadPartPositions reads them.
+
+    reel_map, a ReelMap, gives the reel each part should be on and that reel's rotation; parts
+    it doesn't cover can be on any reel, and are expected to come off it unrotated.  other_side
+    is the parts on the other side, so rows for them can be told apart from rows for nothing.
+    panel is the PanelLayout the instructions were expanded onto, if they were.  Positions can
+    be off by up to tolerance mm, and rotations by up to rotation_tolerance degrees."""
+    tolerance = to_hundredths(tolerance)
+    expected, repeated = parts_by_reference(parts, panel)
+    other, _ = parts_by_reference(other_side, panel)
+
+    rows = {}
+    unreferenced = 0
+    for instruction in instructions:
+        if not isinstance(instruction, PartPlacementInstruction):
+            continue
+        if not instruction.reference:
+            unreferenced += 1
+            continue
+        rows.setdefault(instruction.reference, []).append(instruction)
+
+    problems = []
+    if unreferenced:
+        problems.append(Problem(NO_REFERENCE, "{0} rows have no reference, so they can't be checked".format(
+            unreferenced)))
+    for reference in sorted(repeated):
+        problems.append(Problem(DUPLICATE, "{0} is in the .pos file more than once".format(reference)))
+
+    for reference in sorted(rows):
+        if reference in expected:
+            continue
+        if reference in other:
+            problems.append(Problem(WRONG_SIDE, "{0} is on the other side of the board".format(reference)))
+        else:
+            problems.append(Problem(UNEXPECTED, "{0} isn't in the .pos file".format(reference)))
+
+    for reference in sorted(expected):
+        part = expected[reference]
+        matches = rows.get(reference)
+        if not matches:
+            problems.append(Problem(MISSING, "{0} has no row".format(reference)))
+            continue
+        if len(matches) > 1:
+            problems.append(Problem(DUPLICATE, "{0} has {1} rows".format(reference, len(matches))))
+        row = matches[0]
+        if row.skip:
+            problems.append(Problem(SKIPPED, "{0} is skipped".format(reference)))
+
+        dx = row.x_hundredths - part.x_hundredths
+        dy = row.y_hundredths - part.y_hundredths
+        if abs(dx) > tolerance or abs(dy) > tolerance:
+            problems.append(Problem(POSITION, "{0} is placed at ({1}, {2}) mm instead of ({3}, {4}) mm".format(
+                reference, _mm(row.x_hundredths), _mm(row.y_hundredths),
+                _mm(part.x_hundredths), _mm(part.y_hundredths))))
+
+        reel_number = reel_map.reel_for(part) if reel_map is not None else None
+        rotation = part.rotation
+        if reel_number is not None:
+            rotation += int(reel_map.reels[reel_number].rotation or 0)
+            if row.stack != reel_number:
+                problems.append(Problem(WRONG_REEL, "{0} is on Reel {1} instead of Reel {2}".format(
+                    reference, row.stack, reel_number)))
+        if rotation_difference(row.rotation, rotation) > rotation_tolerance:
+            problems.append(Problem(ROTATION, "{0} is rotated {1} degrees instead of {2}".format(
+                reference, row.rotation, rotation)))
+    return problems
@@ -0,0 +1,118 @@
+from tm2x0.batch import ReelMap
+from tm2x0.instructions import PlacementInstructions
+from tm2x0.kicad import KicadPartPositions
+from tm2x0.kicad_import import panel_layout
+from tm2x0.transform import BoardTransform
+from tm2x0.verify import verify
+
+import sys
+import argparse
+import logging
+import time
+
+
+def parse_command_line(argv):
+    parser = argparse.ArgumentParser(description="Checks that a machine CSV file places every part in a KiCad "
+                                                 ".pos file where it should, and nothing else")
+    parser.add_argument("--kicad-file",
+                        required=True,
+                        help=".pos file from KiCad the CSV file was made from")
+    parser.add_argument("--placement-file",
+                        required=True,
+                        help="Machine CSV file to check")
+    parser.add_argument("--side",
+                        choices=["front", "back"],
+                        default="front",
+                        help="The side the CSV file is for.  Defaults to front.")
+    parser.add_argument("--board-width",
+                        help="For a back side written with --board-width, the width of the board in mm, "
+                             "so the back, and the panel, can be turned over the same way")
+    parser.add_argument("--reel-map",
+                        help="Reel map the CSV file was made with, to check reels and reel rotations.  "
+                             "Without it, parts can be on any reel, and reels are taken to be unrotated.")
+    parser.add_argument("--panel",
+                        help="With --expand-panel, the ROWSxCOLUMNS panel the CSV file was expanded onto")
+    parser.add_argument("--panel-pitch",
+                        help="X,Y distance in mm between copies on the panel")
+    parser.add_argument("--panel-skip",
+                        action="append",
+                        default=[],
+                        help="ROW,COLUMN of a bad board that was skipped, counting from 1.  "
+                             "Can be given more than once.")
+    parser.add_argument("--panel-rotate",
+                        action="append",
+                        default=[],
+                        help="ROW,COLUMN,DEGREES a copy was turned.  Can be given more than once.")
+    parser.add_argument("--expand-panel",
+                        action="store_true",
+                        help="The CSV file has a row for every part on every copy of the panel")
+    parser.add_argument("--tolerance",
+                        default="0.01",
+                        help="How far in mm a part can be from where it should be.  Defaults to 0.01 mm.")
+    parser.add_argument("--rotation-tolerance",
+                        type=int,
+                        default=0,
+                        help="How many degrees a part can be turned from how it should be.  Defaults to 0.")
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument("--quiet",
+                           dest="log_level",
+                           action="store_const",
+                           const=logging.WARNING,
+                           default=logging.INFO,
+                           help="Only log warnings and errors")
+    verbosity.add_argument("--verbose",
+                           dest="log_level",
+                           action="store_const",
+                           const=logging.DEBUG,
+                           help="Log debugging details too")
+    arguments = parser.parse_args(argv[1:])
+    if arguments.board_width and arguments.side != "back":
+        parser.error("--board-width is only for --side back")
+    arguments.panel_layout = panel_layout(parser, arguments)
+    if arguments.board_width and arguments.panel_layout is not None:
+        try:
+            arguments.panel_layout = arguments.panel_layout.turned_over()
+        except ValueError, e:
+            parser.error(str(e))
+    return arguments
+
+
+def main():
+    logging.basicConfig(stream=sys.stderr, level=logging.DEBUG,
+                        format='(%(levelname)s): %(message)s')
+    try:
+        arguments = parse_command_line(sys.argv)
+        logging.getLogger().setLevel(arguments.log_level)
+        start = time.time()
+        reel_map = None
+        if arguments.reel_map:
+            with open(arguments.reel_map) as f:
+                reel_map = ReelMap.from_file(f)
+        transform = BoardTransform()
+        back_transform = transform.turned_over(arguments.board_width) if arguments.board_width else transform
+        with open(arguments.kicad_file, 'rU') as f:
+            kicad_parts = KicadPartPositions.from_file(f, keep_lines=False, transform=transform,
+                                                       back_transform=back_transform)
+        with open(arguments.placement_file) as f:
+            instructions = PlacementInstructions.from_file(f)
+
+        side, other_side = ("Front", "Back") if arguments.side == "front" else ("Back", "Front")
+        problems = verify(instructions,
+                          kicad_parts.instructions.get(side, []),
+                          reel_map=reel_map,
+                          other_side=kicad_parts.instructions.get(other_side, []),
+                          panel=arguments.panel_layout if arguments.expand_panel else None,
+                          tolerance=arguments.tolerance,
+                          rotation_tolerance=arguments.rotation_tolerance)
+        for problem in problems:
+            print problem
+        logging.info("Checked {0} against {1} in {2:.2f} s: {3} problems".format(
+            arguments.placement_file, arguments.kicad_file, time.time() - start, len(problems)))
+        if problems:
+            sys.exit(1)
+    finally:
+        logging.shutdown()
+
+
+if __name__ == "__main__":
+    main()